@@ -2,6 +2,7 @@
 Chart of Accounts Management with bulk upload and tenant customization.
 """
 import pandas as pd
+from collections import Counter
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
@@ -17,25 +18,26 @@ class ChartOfAccountsRepository(BaseRepository):
     
     def bulk_upsert(self, records: List[Dict[str, Any]], key_field: str = "account_code") -> Dict[str, int]:
         """Bulk upsert accounts by account_code."""
-        current_data = self.load_data()
-        existing_map = {record.get(key_field): record for record in current_data}
+        # Read the cached records directly; only the ones being updated are copied
+        existing_map = {record.get(key_field): record for record in self._load_cached()}
         
         created = updated = 0
+        now = datetime.now().isoformat()
         
         for record in records:
             key_value = record.get(key_field)
             if not key_value:
                 continue
                 
-            record['last_updated'] = datetime.now().isoformat()
+            record['last_updated'] = now
             
             if key_value in existing_map:
                 # Update existing
-                existing_map[key_value].update(record)
+                existing_map[key_value] = {**existing_map[key_value], **record}
                 updated += 1
             else:
                 # Create new
-                record['created_at'] = datetime.now().isoformat()
+                record['created_at'] = now
                 existing_map[key_value] = record
                 created += 1
         
@@ -47,11 +49,7 @@ class ChartOfAccountsRepository(BaseRepository):
     
     def find_by_key(self, key_field: str, key_value: Any) -> Optional[Dict[str, Any]]:
         """Find account by key field."""
-        data = self.load_data()
-        for record in data:
-            if record.get(key_field) == key_value:
-                return record
-        return None
+        return self._find_record(key_field, key_value)
 
 class ChartOfAccountsManager:
     """Chart of Accounts management with bulk operations and tenant customization."""
@@ -147,7 +145,8 @@ class ChartOfAccountsManager:
             file_path=file_path,
             mappings=mappings,
             mode=mode,
-            transform_fn=transform_accounts_data
+            transform_fn=transform_accounts_data,
+            return_records=True
         )
         
         if not upload_result.success:
@@ -157,13 +156,8 @@ class ChartOfAccountsManager:
                 'accounts_stats': None
             }
         
-        # Load staged data and commit to repository
-        staging_file = self.upload_manager.staging_dir / f"{self.tenant_id}_chart_of_accounts_{upload_result.batch_id}.json"
-        with open(staging_file, 'r') as f:
-            import json
-            staged_data = json.load(f)
-        
-        accounts_data = staged_data['data']
+        # Staged rows come back with the result; the staging file is only the audit copy
+        accounts_data = upload_result.staged_records
         
         # Bulk upsert to repository
         repo_result = self.repository.bulk_upsert(accounts_data)
@@ -177,7 +171,7 @@ class ChartOfAccountsManager:
     
     def get_account_stats(self) -> Dict[str, Any]:
         """Get chart of accounts statistics."""
-        accounts = self.repository.load_data()
+        accounts = self.repository.load_data(copy=False)
         
         if not accounts:
             return {
@@ -190,10 +184,7 @@ class ChartOfAccountsManager:
         active_accounts = [a for a in accounts if a.get('is_active', True)]
         
         # Type breakdown
-        type_counts = {}
-        for account in accounts:
-            acc_type = account.get('account_type', 'unknown')
-            type_counts[acc_type] = type_counts.get(acc_type, 0) + 1
+        type_counts = dict(Counter(account.get('account_type', 'unknown') for account in accounts))
         
         # Count custom accounts (not in default chart)
         custom_count = len([a for a in accounts if a.get('account_code') not in CHART_OF_ACCOUNTS])
@@ -207,7 +198,7 @@ class ChartOfAccountsManager:
     
     def export_accounts(self, file_path: str, active_only: bool = False) -> bool:
         """Export chart of accounts to Excel file."""
-        accounts = self.repository.load_data()
+        accounts = self.repository.load_data(copy=False)
         
         if active_only:
             accounts = [a for a in accounts if a.get('is_active', True)]
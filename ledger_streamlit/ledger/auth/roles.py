@@ -1,4 +1,4 @@
-import os, json, hashlib, uuid, datetime, pathlib, random, string
+import os, json, hashlib, hmac, uuid, datetime, pathlib, random, string, threading
 BASE = pathlib.Path(__file__).resolve().parents[2] / "data"
 BASE.mkdir(parents=True, exist_ok=True)
 
@@ -11,8 +11,15 @@ def _data_path(name: str):
 def _read(name: str):
     with open(_data_path(name),"r",encoding="utf-8") as f: return json.load(f)
 
+# Serialises writers (incl. background saves); each file is swapped in whole so a
+# concurrent reader never sees a half-written JSON document
+_WRITE_LOCK = threading.Lock()
+
 def _write(name: str, obj):
-    with open(_data_path(name),"w",encoding="utf-8") as f: json.dump(obj,f,indent=2,default=str)
+    p = _data_path(name); tmp = p.with_suffix(".json.tmp")
+    with _WRITE_LOCK:
+        with open(tmp,"w",encoding="utf-8") as f: json.dump(obj,f,indent=2,default=str)
+        os.replace(tmp, p)
 
 def _hash_password(pw: str, salt: bytes | None = None) -> str: 
     if salt is None: 
@@ -22,7 +29,7 @@ def _hash_password(pw: str, salt: bytes | None = None) -> str:
 
 def _verify_password(stored_password: str, provided_password: str) -> bool:
     salt, pwdhash = stored_password.split(':')
-    return stored_password == _hash_password(provided_password, bytes.fromhex(salt))
+    return hmac.compare_digest(stored_password, _hash_password(provided_password, bytes.fromhex(salt)))
 def _random_password(): return "".join(random.choice(string.ascii_letters+string.digits) for _ in range(12))
 def _now(): return datetime.datetime.utcnow().isoformat()+"Z"
 
@@ -46,9 +53,26 @@ class RoleManager:
         if "superadmin" not in self.roles:
             self.roles["superadmin"]={"id":"superadmin","tenant_id":None,"name":"superadmin","permissions":["*"],"created_at":_now(),"created_by":"system"}
             _write("roles",self.roles)
+        self._users_by_email=None
 
     def save(self):
         _write("tenants",self.tenants); _write("users",self.users); _write("roles",self.roles)
+        self._users_by_email=None
+
+    def save_users(self):
+        # dict() copy is atomic under the GIL, so a concurrent signup can't break the dump
+        _write("users",dict(self.users))
+
+    def save_users_in_background(self):
+        """Write users.json on a worker thread, for callers that shouldn't wait on disk (login)."""
+        t=threading.Thread(target=self.save_users,name="roles-save-users"); t.start(); return t
+
+    def find_user_by_email(self,email):
+        # email -> user index, built on first lookup and dropped on save(); first match wins
+        if self._users_by_email is None:
+            self._users_by_email={}
+            for u in self.users.values(): self._users_by_email.setdefault(u.get("email"),u)
+        return self._users_by_email.get(email)
 
     def create_tenant_with_admin(self,tenant_name,admin_email,admin_password=None,industry="generic"):
         tid=str(uuid.uuid4()); self.tenants[tid]={"id":tid,"name":tenant_name,"industry":industry,"created_at":_now()}
@@ -3,6 +3,7 @@ Audit logging for upload operations and data changes.
 Tracks all import activities with detailed metrics and error logging.
 """
 import json
+from collections import Counter
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 from datetime import datetime
@@ -175,11 +176,7 @@ class AuditLogger:
     
     def _get_entity_breakdown(self, history: List[Dict[str, Any]]) -> Dict[str, int]:
         """Get breakdown of uploads by entity type."""
-        breakdown = {}
-        for entry in history:
-            entity_type = entry.get('entity_type', 'unknown')
-            breakdown[entity_type] = breakdown.get(entity_type, 0) + 1
-        return breakdown
+        return dict(Counter(entry.get('entity_type', 'unknown') for entry in history))
     
     def get_change_history(self, entity_type: str, entity_id: str) -> List[Dict[str, Any]]:
         """Get change history for specific entity."""
@@ -5,10 +5,18 @@ Provides consistent interface for all entity data management.
 import json
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Union, Iterable
 from datetime import datetime
 from abc import ABC, abstractmethod
 
+def _copy_json(obj: Any) -> Any:
+    """Deep copy of parsed JSON: new dicts and lists, shared immutable scalars."""
+    if isinstance(obj, dict):
+        return {k: _copy_json(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_copy_json(v) for v in obj]
+    return obj
+
 class BaseRepository(ABC):
     """Base repository with common data persistence patterns."""
     
@@ -21,6 +29,10 @@ class BaseRepository(ABC):
         self.entity_dir = self.data_dir / entity_type
         self.archive_dir = self.entity_dir / "archive"
         
+        # Parsed data file, reused while its (mtime_ns, size) stamp is unchanged
+        self._cached_data: Optional[List[Dict[str, Any]]] = None
+        self._file_mtime = None
+        
         for dir_path in [self.entity_dir, self.archive_dir]:
             dir_path.mkdir(parents=True, exist_ok=True)
     
@@ -33,17 +45,49 @@ class BaseRepository(ABC):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         return self.archive_dir / f"{self.tenant_id}_{self.entity_type}_{timestamp}.json"
     
-    def load_data(self) -> List[Dict[str, Any]]:
-        """Load current data from JSON file."""
-        data_file = self._get_data_file()
-        if not data_file.exists():
-            return []
-        
+    def file_stamp(self):
+        """(mtime_ns, size) of the data file, or None when it doesn't exist.
+        Changes whenever the data is saved; callers key derived caches on it."""
         try:
-            with open(data_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
+            st = self._get_data_file().stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+    
+    def _load_cached(self) -> Any:
+        """Parsed data file, re-read only when its stamp changes. Not a copy."""
+        stamp = self.file_stamp()
+        if stamp is None:
             return []
+        
+        if self._cached_data is None or stamp != self._file_mtime:
+            try:
+                with open(self._get_data_file(), 'r') as f:
+                    self._cached_data = json.load(f)
+            except (json.JSONDecodeError, FileNotFoundError):
+                self._cached_data = None
+                return []
+            self._file_mtime = stamp
+        return self._cached_data
+    
+    def load_data(self, *, copy: bool = True) -> List[Dict[str, Any]]:
+        """Load current data from JSON file.
+        
+        Records are deep copies that callers may edit (nested lists included,
+        e.g. a payroll run's employees). copy=False returns the cached records
+        themselves, in a new list, for callers that only read them.
+        """
+        data = self._load_cached()
+        if not isinstance(data, list):
+            return data
+        if not copy:
+            return list(data)
+        return _copy_json(data)
+    
+    def load_columns(self, columns: Dict[str, Any]) -> Dict[str, List[Any]]:
+        """Project fields out of every record; ``columns`` maps field name to its default when missing."""
+        data = self._load_cached()
+        return {col: [_copy_json(r.get(col, default)) for r in data] for col, default in columns.items()}
     
     def save_data(self, data: List[Dict[str, Any]], create_backup: bool = True) -> bool:
         """Save data to JSON file with optional backup."""
@@ -53,6 +97,7 @@ class BaseRepository(ABC):
                 self._create_backup()
             
             # Save new data
+            self._cached_data = None
             data_file = self._get_data_file()
             with open(data_file, 'w') as f:
                 json.dump(data, f, indent=2, default=str)
@@ -66,7 +111,7 @@ class BaseRepository(ABC):
     def _create_backup(self) -> bool:
         """Create timestamped backup of current data."""
         try:
-            current_data = self.load_data()
+            current_data = self.load_data(copy=False)
             if current_data:
                 archive_file = self._get_archive_file()
                 with open(archive_file, 'w') as f:
@@ -78,7 +123,7 @@ class BaseRepository(ABC):
     def export_to_excel(self, file_path: Union[str, Path]) -> bool:
         """Export current data to Excel file."""
         try:
-            data = self.load_data()
+            data = self.load_data(copy=False)
             if not data:
                 return False
             
@@ -89,9 +134,16 @@ class BaseRepository(ABC):
         except Exception:
             return False
     
+    def _find_record(self, key_field: str, key_value: Any) -> Optional[Dict[str, Any]]:
+        """Copy of the first record whose key_field equals key_value, or None."""
+        for record in self._load_cached():
+            if record.get(key_field) == key_value:
+                return _copy_json(record)
+        return None
+    
     def get_count(self) -> int:
         """Get total record count."""
-        return len(self.load_data())
+        return len(self._load_cached())
     
     @abstractmethod
     def bulk_upsert(self, records: List[Dict[str, Any]], key_field: str) -> Dict[str, int]:
@@ -111,25 +163,26 @@ class VendorsRepository(BaseRepository):
     
     def bulk_upsert(self, records: List[Dict[str, Any]], key_field: str = "vendor_code") -> Dict[str, int]:
         """Bulk upsert vendors by vendor_code."""
-        current_data = self.load_data()
-        existing_map = {record.get(key_field): record for record in current_data}
+        # Read the cached records directly; only the ones being updated are copied
+        existing_map = {record.get(key_field): record for record in self._load_cached()}
         
         created = updated = 0
+        now = datetime.now().isoformat()
         
         for record in records:
             key_value = record.get(key_field)
             if not key_value:
                 continue
                 
-            record['last_updated'] = datetime.now().isoformat()
+            record['last_updated'] = now
             
             if key_value in existing_map:
                 # Update existing
-                existing_map[key_value].update(record)
+                existing_map[key_value] = {**existing_map[key_value], **record}
                 updated += 1
             else:
                 # Create new
-                record['created_at'] = datetime.now().isoformat()
+                record['created_at'] = now
                 existing_map[key_value] = record
                 created += 1
         
@@ -141,15 +194,11 @@ class VendorsRepository(BaseRepository):
     
     def find_by_key(self, key_field: str, key_value: Any) -> Optional[Dict[str, Any]]:
         """Find vendor by key field."""
-        data = self.load_data()
-        for record in data:
-            if record.get(key_field) == key_value:
-                return record
-        return None
+        return self._find_record(key_field, key_value)
     
     def search_by_name(self, name_pattern: str) -> List[Dict[str, Any]]:
         """Search vendors by name pattern."""
-        data = self.load_data()
+        data = self.load_data(copy=False)
         pattern = name_pattern.lower()
         return [
             record for record in data 
@@ -158,7 +207,7 @@ class VendorsRepository(BaseRepository):
     
     def get_active_vendors(self) -> List[Dict[str, Any]]:
         """Get all active vendors."""
-        data = self.load_data()
+        data = self.load_data(copy=False)
         return [record for record in data if record.get('is_active', True)]
 
 class EmployeesRepository(BaseRepository):
@@ -169,25 +218,26 @@ class EmployeesRepository(BaseRepository):
     
     def bulk_upsert(self, records: List[Dict[str, Any]], key_field: str = "employee_id") -> Dict[str, int]:
         """Bulk upsert employees by employee_id."""
-        current_data = self.load_data()
-        existing_map = {record.get(key_field): record for record in current_data}
+        # Read the cached records directly; only the ones being updated are copied
+        existing_map = {record.get(key_field): record for record in self._load_cached()}
         
         created = updated = 0
+        now = datetime.now().isoformat()
         
         for record in records:
             key_value = record.get(key_field)
             if not key_value:
                 continue
                 
-            record['last_updated'] = datetime.now().isoformat()
+            record['last_updated'] = now
             
             if key_value in existing_map:
                 # Update existing
-                existing_map[key_value].update(record)
+                existing_map[key_value] = {**existing_map[key_value], **record}
                 updated += 1
             else:
                 # Create new
-                record['created_at'] = datetime.now().isoformat()
+                record['created_at'] = now
                 existing_map[key_value] = record
                 created += 1
         
@@ -199,15 +249,11 @@ class EmployeesRepository(BaseRepository):
     
     def find_by_key(self, key_field: str, key_value: Any) -> Optional[Dict[str, Any]]:
         """Find employee by key field."""
-        data = self.load_data()
-        for record in data:
-            if record.get(key_field) == key_value:
-                return record
-        return None
+        return self._find_record(key_field, key_value)
     
     def get_active_employees(self) -> List[Dict[str, Any]]:
         """Get all active employees."""
-        data = self.load_data()
+        data = self.load_data(copy=False)
         return [record for record in data if record.get('is_active', True)]
     
     def get_payroll_data(self, employee_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
@@ -243,12 +289,13 @@ class TransactionsRepository(BaseRepository):
     def __init__(self, tenant_id: str):
         super().__init__(tenant_id, "transactions")
     
-    def bulk_upsert(self, records: List[Dict[str, Any]], key_field: str = "transaction_id") -> Dict[str, int]:
+    def bulk_upsert(self, records: Iterable[Dict[str, Any]], key_field: str = "transaction_id") -> Dict[str, int]:
         """Bulk upsert transactions by transaction_id."""
-        current_data = self.load_data()
-        existing_map = {record.get(key_field): record for record in current_data if record.get(key_field)}
+        # Read the cached records directly; only the ones being updated are copied
+        existing_map = {record.get(key_field): record for record in self._load_cached() if record.get(key_field)}
         
         created = updated = 0
+        now = datetime.now().isoformat()
         
         for record in records:
             key_value = record.get(key_field)
@@ -256,18 +303,18 @@ class TransactionsRepository(BaseRepository):
             # Generate transaction_id if not provided
             if not key_value:
                 from uuid import uuid4
-                key_value = f"TXN_{datetime.now().strftime('%Y%m%d')}_{str(uuid4())[:8]}"
+                key_value = f"TXN_{now[:10].replace('-', '')}_{str(uuid4())[:8]}"
                 record[key_field] = key_value
                 
-            record['last_updated'] = datetime.now().isoformat()
+            record['last_updated'] = now
             
             if key_value in existing_map:
                 # Update existing
-                existing_map[key_value].update(record)
+                existing_map[key_value] = {**existing_map[key_value], **record}
                 updated += 1
             else:
                 # Create new
-                record['created_at'] = datetime.now().isoformat()
+                record['created_at'] = now
                 record['status'] = record.get('status', 'pending')
                 existing_map[key_value] = record
                 created += 1
@@ -280,20 +327,16 @@ class TransactionsRepository(BaseRepository):
     
     def find_by_key(self, key_field: str, key_value: Any) -> Optional[Dict[str, Any]]:
         """Find transaction by key field."""
-        data = self.load_data()
-        for record in data:
-            if record.get(key_field) == key_value:
-                return record
-        return None
+        return self._find_record(key_field, key_value)
     
     def get_pending_transactions(self) -> List[Dict[str, Any]]:
         """Get all pending transactions."""
-        data = self.load_data()
+        data = self.load_data(copy=False)
         return [record for record in data if record.get('status') == 'pending']
     
     def get_transactions_by_date_range(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
         """Get transactions within date range."""
-        data = self.load_data()
+        data = self.load_data(copy=False)
         return [
             record for record in data 
             if start_date <= record.get('date', '') <= end_date
@@ -307,7 +350,8 @@ class PayrollRunsRepository(BaseRepository):
     
     def bulk_upsert(self, records: List[Dict[str, Any]], key_field: str = "payroll_period") -> Dict[str, int]:
         """Bulk upsert payroll runs by period."""
-        current_data = self.load_data()
+        # Runs are regrouped into new dicts and lists, so the cache is only read
+        current_data = self.load_data(copy=False)
         
         # Group by payroll period
         existing_runs = {}
@@ -319,6 +363,7 @@ class PayrollRunsRepository(BaseRepository):
                 existing_runs[period]['employees'].extend(record.get('employees', []))
         
         created = updated = 0
+        now = datetime.now().isoformat()
         
         # Process new records
         new_runs = {}
@@ -332,8 +377,8 @@ class PayrollRunsRepository(BaseRepository):
                     'payroll_period': period,
                     'employees': [],
                     'status': 'pending',
-                    'created_at': datetime.now().isoformat(),
-                    'last_updated': datetime.now().isoformat()
+                    'created_at': now,
+                    'last_updated': now
                 }
             
             new_runs[period]['employees'].append(record)
@@ -343,7 +388,7 @@ class PayrollRunsRepository(BaseRepository):
             if period in existing_runs:
                 # Update existing run
                 existing_runs[period]['employees'] = run_data['employees']
-                existing_runs[period]['last_updated'] = datetime.now().isoformat()
+                existing_runs[period]['last_updated'] = now
                 updated += 1
             else:
                 # Create new run
@@ -358,11 +403,7 @@ class PayrollRunsRepository(BaseRepository):
     
     def find_by_key(self, key_field: str, key_value: Any) -> Optional[Dict[str, Any]]:
         """Find payroll run by key field."""
-        data = self.load_data()
-        for record in data:
-            if record.get(key_field) == key_value:
-                return record
-        return None
+        return self._find_record(key_field, key_value)
     
     def get_run_by_period(self, period: str) -> Optional[Dict[str, Any]]:
         """Get payroll run by period (YYYY-MM)."""
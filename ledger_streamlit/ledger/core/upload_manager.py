@@ -5,14 +5,41 @@ Provides consistent pipeline: load -> map -> validate -> transform -> upsert.
 import pandas as pd
 import json
 import hashlib
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Callable, Union
-from dataclasses import dataclass, asdict
-from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable, Union, Iterator
+from dataclasses import dataclass, asdict, field, replace
+from datetime import date, datetime
 import uuid
 
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
 from .schemas import SchemaRegistry
 from .audit import AuditLogger
+from .utils import read_json, EXCEL_ENGINE
+
+# Rows per slice when a caller asks process_upload to work in batches
+UPLOAD_BATCH_ROWS = 50_000
+
+# Audit staging copies written off the upload path (process_upload with return_records)
+_STAGING_POOL: Optional[ThreadPoolExecutor] = None
+
+def _staging_pool() -> ThreadPoolExecutor:
+    global _STAGING_POOL
+    if _STAGING_POOL is None:
+        _STAGING_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="staging")
+    return _STAGING_POOL
 
 @dataclass
 class UploadResult:
@@ -27,9 +54,13 @@ class UploadResult:
     row_errors: List[Dict[str, Any]]
     file_hash: str
     timestamp: str
+    staged_records: Optional[List[Dict[str, Any]]] = field(default=None, repr=False)
     
     def to_dict(self):
-        return asdict(self)
+        # staged records are for in-process consumers, not part of the report
+        d = asdict(replace(self, staged_records=None))
+        d.pop('staged_records')
+        return d
 
 @dataclass
 class ColumnMapping:
@@ -38,6 +69,15 @@ class ColumnMapping:
     target_field: str
     transform: Optional[str] = None  # 'upper', 'lower', 'strip', 'date', 'number'
 
+def _is_temporal(col: pd.Series) -> bool:
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return True
+    # date32 columns arrive as object columns of datetime.date
+    if col.dtype == object:
+        first = col.first_valid_index()
+        return first is not None and isinstance(col[first], date)
+    return False
+
 class UploadManager:
     """
     Unified upload manager handling CSV/Excel/JSON files with validation,
@@ -57,6 +97,9 @@ class UploadManager:
         
         for dir_path in [self.staging_dir, self.entity_dir]:
             dir_path.mkdir(parents=True, exist_ok=True)
+        
+        # Background staging writes by batch_id, kept until they succeed
+        self._staging_writes: Dict[str, Future] = {}
     
     def get_schema(self) -> Dict[str, Any]:
         """Get JSON schema for the entity type."""
@@ -93,6 +136,21 @@ class UploadManager:
         template_df = pd.DataFrame([sample_data])
         return template_df.reindex(columns=columns)  # Ensure column order
     
+    @staticmethod
+    def _read_csv(file_path: Path) -> pd.DataFrame:
+        # Arrow's multithreaded parser; the C engine still handles files it
+        # rejects (ragged rows, odd quoting) and installs without pyarrow.
+        try:
+            df = pd.read_csv(file_path, engine='pyarrow')
+        except (ImportError, ValueError):
+            return pd.read_csv(file_path, low_memory=False)
+        # Arrow infers ISO dates/timestamps, the C engine leaves them as text
+        # for the schema's string-based date checks: take those columns' text
+        temporal = [c for c in df.columns if _is_temporal(df[c])]
+        if temporal:
+            df[temporal] = pd.read_csv(file_path, usecols=temporal, dtype=str, low_memory=False)[temporal]
+        return df
+    
     def load_file(self, file_path: Union[str, Path]) -> pd.DataFrame:
         """Load data from CSV, Excel, or JSON file."""
         file_path = Path(file_path)
@@ -104,9 +162,9 @@ class UploadManager:
         
         try:
             if file_ext == '.csv':
-                df = pd.read_csv(file_path)
+                df = self._read_csv(file_path)
             elif file_ext in ['.xlsx', '.xls']:
-                df = pd.read_excel(file_path)
+                df = pd.read_excel(file_path, engine=EXCEL_ENGINE)
             elif file_ext == '.json':
                 with open(file_path, 'r') as f:
                     data = json.load(f)
@@ -215,16 +273,91 @@ class UploadManager:
         
         return row_errors, warnings
     
+    def _prepare_batch(
+        self, df: pd.DataFrame, mappings: List[ColumnMapping], transform_fn: Optional[Callable]
+    ) -> tuple[List[Dict[str, Any]], List[Dict], List[str]]:
+        """Map, transform and validate one slice. Returns (valid records, row_errors, warnings)."""
+        mapped_df = self.map_columns(df, mappings)
+        
+        # Apply custom transformation if provided
+        if transform_fn:
+            mapped_df = transform_fn(mapped_df)
+        
+        row_errors, warnings = self.validate_data(mapped_df)
+        
+        # Filter out error rows for staging
+        error_indices = [err['row'] - 1 for err in row_errors]
+        return mapped_df.drop(index=error_indices).to_dict('records'), row_errors, warnings
+    
+    def _write_staging(self, staging_file: Path, staging_data: Dict[str, Any]):
+        """Stage as Parquet, batch details in the schema metadata; JSON when the rows aren't tabular."""
+        if PARQUET_AVAILABLE and staging_data['data']:
+            meta = {k: v for k, v in staging_data.items() if k != 'data'}
+            try:
+                # via pandas so NaN in text columns becomes null rather than a type clash
+                table = pa.Table.from_pandas(pd.DataFrame.from_records(staging_data['data']), preserve_index=False)
+                table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'staging': json.dumps(meta, default=str)})
+                pq.write_table(table, staging_file.with_suffix('.parquet'))
+                return
+            except (pa.ArrowException, TypeError, ValueError):
+                pass  # mixed-type columns: keep them as JSON
+        with open(staging_file, 'w') as f:
+            json.dump(staging_data, f, indent=2, default=str)
+    
+    def _staging_written(self, batch_id: str, future: Future) -> None:
+        """Done callback of a background staging write: record failures in the audit trail."""
+        if future.cancelled() or future.exception() is None:
+            self._staging_writes.pop(batch_id, None)
+            return
+        error = future.exception()
+        print(f"Warning: Could not write staging copy of batch {batch_id}: {error}")
+        self.audit_logger.log_data_change(
+            entity_type=self.entity_type,
+            operation='staging_failed',
+            entity_id=batch_id,
+            changes={'error': str(error)}
+        )
+    
+    def iter_staged_records(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the rows of a staged batch. Parquet staging is read one row group
+        at a time; JSON staging is parsed incrementally when ijson is installed.
+        """
+        pending = self._staging_writes.get(batch_id)
+        if pending is not None:
+            pending.result()  # still being written in the background, or failed: raise its error
+        staging_file = self.staging_dir / f"{self.tenant_id}_{self.entity_type}_{batch_id}.json"
+        parquet_file = staging_file.with_suffix('.parquet')
+        if PARQUET_AVAILABLE and parquet_file.exists():
+            for batch in pq.ParquetFile(parquet_file).iter_batches():
+                yield from batch.to_pylist()
+        elif IJSON_AVAILABLE:
+            with open(staging_file, 'rb') as f:
+                yield from ijson.items(f, 'data.item', use_float=True)
+        else:
+            yield from read_json(staging_file)['data']
+    
     def process_upload(
         self, 
         file_path: Union[str, Path],
         mappings: List[ColumnMapping],
         mode: str = 'append',  # 'append', 'upsert', 'replace'
-        transform_fn: Optional[Callable] = None
+        transform_fn: Optional[Callable] = None,
+        return_records: bool = False,
+        batch_size: Optional[int] = None
     ) -> UploadResult:
         """
         Complete upload pipeline: load -> map -> validate -> transform -> stage.
         Returns detailed result with metrics and errors.
+        
+        With return_records=True the staged rows are also returned on
+        UploadResult.staged_records, and the staging file (kept for audit)
+        is written in a background thread; a failed write is logged to the
+        audit trail and raised by iter_staged_records for that batch.
+        
+        With batch_size set, map/transform/validate run over slices of that many
+        rows, so their intermediate copies only ever cover one slice. Only pass
+        it when transform_fn is row-local (no IDs generated across the file).
         """
         
         batch_id = str(uuid.uuid4())
@@ -265,24 +398,26 @@ class UploadManager:
                     timestamp=timestamp
                 )
             
-            # Apply column mappings
-            mapped_df = self.map_columns(df, mappings)
-            
-            # Apply custom transformation if provided
-            if transform_fn:
-                mapped_df = transform_fn(mapped_df)
+            # Map, transform and validate, one slice at a time when batched
+            step = batch_size or total_rows
+            valid_records = []
+            row_errors = []
+            warnings = []
+            for start in range(0, total_rows, step):
+                records, batch_errors, batch_warnings = self._prepare_batch(
+                    df.iloc[start:start + step], mappings, transform_fn
+                )
+                valid_records.extend(records)
+                row_errors.extend(batch_errors)
+                warnings.extend(w for w in batch_warnings if w not in warnings)
+            del df
             
-            # Validate data
-            row_errors, warnings = self.validate_data(mapped_df)
             error_rows = len(row_errors)
             processed_rows = total_rows - error_rows
             
             # Save to staging if any rows are valid
+            staged_records = None
             if processed_rows > 0:
-                # Filter out error rows for staging
-                error_indices = [err['row'] - 1 for err in row_errors]
-                valid_df = mapped_df.drop(index=error_indices)
-                
                 # Save to staging
                 staging_file = self.staging_dir / f"{self.tenant_id}_{self.entity_type}_{batch_id}.json"
                 staging_data = {
@@ -292,11 +427,17 @@ class UploadManager:
                     'mode': mode,
                     'timestamp': timestamp,
                     'file_hash': file_hash,
-                    'data': valid_df.to_dict('records')
+                    'data': valid_records
                 }
                 
-                with open(staging_file, 'w') as f:
-                    json.dump(staging_data, f, indent=2, default=str)
+                if return_records:
+                    # callers mutate their rows while the audit copy is being written
+                    staged_records = [dict(r) for r in staging_data['data']]
+                    future = _staging_pool().submit(self._write_staging, staging_file, staging_data)
+                    self._staging_writes[batch_id] = future
+                    future.add_done_callback(lambda f, batch_id=batch_id: self._staging_written(batch_id, f))
+                else:
+                    self._write_staging(staging_file, staging_data)
             
             # Log upload attempt
             self.audit_logger.log_upload(
@@ -320,7 +461,8 @@ class UploadManager:
                 errors=[],
                 row_errors=row_errors,
                 file_hash=file_hash,
-                timestamp=timestamp
+                timestamp=timestamp,
+                staged_records=staged_records
             )
             
         except Exception as e:
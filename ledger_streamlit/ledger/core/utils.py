@@ -8,7 +8,22 @@ import time
 import hmac
 import hashlib
 import secrets
-from typing import Any, Dict
+import tempfile
+from typing import Any, Dict, Iterable, Iterator
+
+try:
+    import orjson
+    # numpy values, naive datetimes as UTC, non-str dict keys
+    _ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+except ImportError:
+    orjson = None
+
+# pandas read_excel engine: calamine when installed, else pandas' default
+try:
+    import python_calamine  # noqa: F401  (used through pandas' 'calamine' engine)
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = None  # pandas default (openpyxl / xlrd)
 
 try:
     from ledger.core.config import settings
@@ -22,13 +37,77 @@ except Exception:
 def mkdir_safe(path: str):
     Path(path).mkdir(parents=True, exist_ok=True)
 
-def atomic_write_json(path: str, obj: Any):
+def atomic_write_bytes(path, data: bytes):
+    """Write data to path through a uniquely named temp file in the same
+    directory, then rename it over path; concurrent writers never share a temp file."""
     p = Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
-    tmp = p.with_suffix(".tmp")
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2, default=str)
-    os.replace(str(tmp), str(p))
+    fd, tmp = tempfile.mkstemp(dir=p.parent, prefix=p.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, p)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def atomic_write_json(path, obj: Any, *, indent: bool = True):
+    atomic_write_bytes(path, dumps_json(obj, indent=indent).encode("utf-8"))
+
+def read_json(path) -> Any:
+    """Parse a JSON file, through orjson when it is installed."""
+    if orjson is not None:
+        raw = Path(path).read_bytes()
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # json.dump writes NaN/Infinity tokens, which orjson rejects
+            return json.loads(raw)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def write_json(path, obj: Any, *, indent: bool = True):
+    """Write obj as JSON, through orjson when it is installed (numpy/datetime aware)."""
+    if orjson is not None:
+        opts = _ORJSON_OPTS
+        if indent:
+            opts |= orjson.OPT_INDENT_2
+        Path(path).write_bytes(orjson.dumps(obj, default=str, option=opts))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2 if indent else None, default=str)
+
+def dumps_json(obj: Any, *, indent: bool = True) -> str:
+    """Serialize obj to a JSON string, through orjson when it is installed."""
+    if orjson is not None:
+        opts = _ORJSON_OPTS
+        if indent:
+            opts |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=str, option=opts).decode()
+    return json.dumps(obj, indent=2 if indent else None, default=str)
+
+def write_ndjson(path, rows: Iterable[Any]):
+    """Stream rows to path as newline-delimited JSON, one compact object per line."""
+    if orjson is not None:
+        with open(path, "wb") as f:
+            for row in rows:
+                f.write(orjson.dumps(row, default=str, option=_ORJSON_OPTS))
+                f.write(b"\n")
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, default=str))
+            f.write("\n")
+
+def iter_ndjson(path) -> Iterator[Any]:
+    loads = orjson.loads if orjson is not None else json.loads
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
 
 def setup_logging(tenant_id: str = "system", *, log_level: str = None):
     logger_name = f"{settings.APP_NAME}.{tenant_id}"
@@ -69,7 +148,14 @@ def audit_log(tenant_id: str, actor: str, action: str, obj_type: str, obj_id: st
         f.write(json.dumps(entry, default=str) + "\n")
     return True
 
-def hash_password(password: str, *, salt: bytes = None, iterations: int = 180000) -> str:
+# PBKDF2 work factor for new hashes; stored hashes carry their own count, so
+# raising this never invalidates existing passwords
+PBKDF2_ITERATIONS = 180000
+
+def hash_password(password: str, *, salt: bytes = None, iterations: int = None) -> str:
+    # one pbkdf2_hmac call: every round runs inside OpenSSL
+    if iterations is None:
+        iterations = PBKDF2_ITERATIONS
     if salt is None:
         salt = secrets.token_bytes(16)
     dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
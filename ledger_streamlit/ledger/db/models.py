@@ -4,6 +4,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
+import math
 from ledger.db.session import Base
 
 # association table for user roles
@@ -27,7 +28,7 @@ class Tenant(Base):
 class User(Base):
     __tablename__ = "users"
     id = Column(String, primary_key=True)
-    tenant_id = Column(String, ForeignKey("tenants.id"), nullable=True)
+    tenant_id = Column(String, ForeignKey("tenants.id"), nullable=True, index=True)
     email = Column(String, nullable=False, index=True)
     password_hash = Column(String, nullable=False)
     is_superadmin = Column(Boolean, default=False)
@@ -39,7 +40,7 @@ class User(Base):
 class Role(Base):
     __tablename__ = "roles"
     id = Column(String, primary_key=True)
-    tenant_id = Column(String, ForeignKey("tenants.id"), nullable=True)
+    tenant_id = Column(String, ForeignKey("tenants.id"), nullable=True, index=True)
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
     permissions = Column(JSON, default=[])
@@ -103,7 +104,7 @@ class Transaction(Base):
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
     id = Column(String, primary_key=True)
-    tenant_id = Column(String, ForeignKey("tenants.id"), nullable=False)
+    tenant_id = Column(String, ForeignKey("tenants.id"), nullable=False, index=True)
     entry_date = Column(DateTime, default=datetime.utcnow)
     description = Column(String, nullable=True)
     lines = Column(JSON, default=[])  # list of {account, debit, credit}
@@ -111,6 +112,6 @@ class JournalEntry(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     def is_balanced(self):
-        total_debit = sum([l.get("debit", 0) for l in (self.lines or [])])
-        total_credit = sum([l.get("credit", 0) for l in (self.lines or [])])
-        return abs(total_debit - total_credit) < 1e-6
+        # one pass, exactly rounded: long entries don't drift past the tolerance
+        net = math.fsum(l.get("debit", 0) - l.get("credit", 0) for l in (self.lines or []))
+        return abs(net) < 1e-6
@@ -1,5 +1,5 @@
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base
 import os
 
@@ -9,6 +9,17 @@ DB_URL = os.environ.get("DB_URL", "sqlite:///./data/ledger.db")
 connect_args = {"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
 
 engine = create_engine(DB_URL, echo=False, future=True, connect_args=connect_args)
+
+if DB_URL.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_conn, _record):
+        # WAL lets readers run alongside the writer; with WAL, synchronous=NORMAL
+        # syncs at checkpoints rather than on every commit
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.close()
+
 SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False))
 Base = declarative_base()
 
@@ -16,3 +27,19 @@ def init_db():
     # Import models here so they are registered on Base
     import ledger.db.models as _models  # noqa: F401
     Base.metadata.create_all(bind=engine)
+
+def bulk_create(objs, session=None):
+    """Add objs (any mix of models) and commit them in one transaction.
+    A session opened here is closed again; a passed-in one is left open."""
+    owns = session is None
+    db = SessionLocal() if owns else session
+    try:
+        db.add_all(objs)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if owns:
+            db.close()
+    return objs
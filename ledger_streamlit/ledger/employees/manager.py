@@ -2,6 +2,7 @@
 Employee Management with bulk upload, payroll integration, and master data management.
 """
 import pandas as pd
+from collections import Counter
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
@@ -63,7 +64,7 @@ class EmployeeManager:
             if 'employee_id' in df.columns:
                 missing_ids = df['employee_id'].isna() | (df['employee_id'] == '')
                 if missing_ids.any():
-                    existing_employees = self.repository.load_data()
+                    existing_employees = self.repository.load_data(copy=False)
                     existing_ids = {emp.get('employee_id') for emp in existing_employees}
                     
                     counter = len(existing_employees) + 1
@@ -107,7 +108,8 @@ class EmployeeManager:
             file_path=file_path,
             mappings=mappings,
             mode=mode,
-            transform_fn=transform_employee_data
+            transform_fn=transform_employee_data,
+            return_records=True
         )
         
         if not upload_result.success:
@@ -118,13 +120,8 @@ class EmployeeManager:
                 'payroll_preview': None
             }
         
-        # Load staged data and commit to repository
-        staging_file = self.upload_manager.staging_dir / f"{self.tenant_id}_employees_{upload_result.batch_id}.json"
-        with open(staging_file, 'r') as f:
-            import json
-            staged_data = json.load(f)
-        
-        employees_data = staged_data['data']
+        # Staged rows come back with the result; the staging file is only the audit copy
+        employees_data = upload_result.staged_records
         
         # Bulk upsert to repository
         repo_result = self.repository.bulk_upsert(employees_data)
@@ -197,7 +194,7 @@ class EmployeeManager:
     
     def get_employee_stats(self) -> Dict[str, Any]:
         """Get employee statistics and analytics."""
-        employees = self.repository.load_data()
+        employees = self.repository.load_data(copy=False)
         
         if not employees:
             return {
@@ -212,16 +209,10 @@ class EmployeeManager:
         active_employees = [e for e in employees if e.get('is_active', True)]
         
         # Department breakdown
-        dept_counts = {}
-        for emp in employees:
-            dept = emp.get('department', 'Unknown')
-            dept_counts[dept] = dept_counts.get(dept, 0) + 1
+        dept_counts = dict(Counter(emp.get('department', 'Unknown') for emp in employees))
         
         # Position breakdown
-        pos_counts = {}
-        for emp in employees:
-            pos = emp.get('position', 'Unknown')
-            pos_counts[pos] = pos_counts.get(pos, 0) + 1
+        pos_counts = dict(Counter(emp.get('position', 'Unknown') for emp in employees))
         
         # Salary analysis
         salaries = []
@@ -260,7 +251,7 @@ class EmployeeManager:
     
     def search_employees(self, query: str, active_only: bool = True, limit: int = 50) -> List[Dict[str, Any]]:
         """Search employees by name, ID, or department."""
-        employees = self.repository.load_data()
+        employees = self.repository.load_data(copy=False)
         
         if active_only:
             employees = [e for e in employees if e.get('is_active', True)]
@@ -289,7 +280,7 @@ class EmployeeManager:
     
     def export_employees(self, file_path: str, active_only: bool = False) -> bool:
         """Export employees to Excel file."""
-        employees = self.repository.load_data()
+        employees = self.repository.load_data(copy=False)
         
         if active_only:
             employees = [e for e in employees if e.get('is_active', True)]
@@ -1,7 +1,8 @@
 
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from .parser import IngestionParser
 from .ocr import OCRIngestion
@@ -29,3 +30,39 @@ class IngestionEngine:
             return {"mode":"ocr","parsed":res["parsed"],"file":str(STAGING_DIR/f"{self.tenant_id}_ocr.json")}
         else:
             raise ValueError(f"Unsupported file type: {ext}")
+
+    def _read(self, file_path: str) -> Dict[str, Any]:
+        ext = Path(file_path).suffix.lower()
+        if ext in [".csv",".xls",".xlsx",".json"]:
+            return {"mode":"structured","records":self.parser.parse_file(file_path)}
+        elif ext in [".pdf",".png",".jpg",".jpeg",".tiff"]:
+            return {"mode":"ocr","out":self.ocr.read_file(file_path)}
+        raise ValueError(f"Unsupported file type: {ext}")
+
+    def ingest_many(self, file_paths: List[str], max_workers: int = 8) -> List[Dict[str, Any]]:
+        """
+        Ingest a batch of files, one result per path in the same order.
+
+        Parsing and OCR run on a thread pool; staging happens afterwards in
+        path order, so the files never race on the tenant's staging files.
+        Structured records from the whole batch are staged together. A file
+        that fails gives {"mode":"error","error":...} instead of aborting
+        the batch.
+        """
+        if not file_paths: return []
+        def read(path):
+            try: return self._read(path)
+            except Exception as e: return {"mode":"error","error":str(e)}
+        with ThreadPoolExecutor(max_workers=min(max_workers,len(file_paths))) as pool:
+            reads = list(pool.map(read, file_paths))
+        staged = [rec for r in reads if r["mode"]=="structured" for rec in r["records"]]
+        staging = self.parser.save_to_staging(staged) if staged else None
+        results = []
+        for r in reads:
+            if r["mode"]=="structured":
+                results.append({"mode":"structured","count":len(r["records"]),"file":str(staging) if staging else None})
+            elif r["mode"]=="ocr":
+                results.append({"mode":"ocr","parsed":r["out"]["parsed"],"file":str(self.ocr.save_to_staging(r["out"]))})
+            else:
+                results.append(r)
+        return results
@@ -1,9 +1,13 @@
 
-import re, json
+import re
+import hashlib
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Any
 from datetime import datetime
 
+from ledger.core.utils import write_json, atomic_write_bytes
+
 try:
     import pytesseract
     from PIL import Image
@@ -15,18 +19,81 @@ except ImportError:
     pdf2image = None
     OCR_AVAILABLE = False
 
+try:
+    import re2 as _regex
+except ImportError:
+    _regex = re
+
 STAGING_DIR = Path(__file__).resolve().parents[2] / "data" / "staging"
 STAGING_DIR.mkdir(parents=True, exist_ok=True)
 
+# Tesseract output cached on disk by file content, so re-processing the same
+# scans skips OCR; bump OCR_CACHE_VERSION when the extraction itself changes
+OCR_CACHE_DIR = STAGING_DIR.parent / "ocr_cache"
+OCR_CACHE_VERSION = 1
+
+def _text_cache_path(file_path: str) -> Path:
+    h=hashlib.blake2b(digest_size=16)
+    with open(file_path,"rb") as f:
+        for chunk in iter(lambda: f.read(1<<20), b""): h.update(chunk)
+    return OCR_CACHE_DIR/f"v{OCR_CACHE_VERSION}_{h.hexdigest()}.txt"
+
+# Compiled once; RE2 (when installed) matches in linear time, so long
+# multi-page OCR dumps can't trigger catastrophic backtracking
+_RE_VENDOR = _regex.compile(r"(?i)invoice\s+from[:\s]+([A-Za-z0-9 &]+)")
+_RE_INVOICE_NO = _regex.compile(r"(?i)invoice\s*(no|#)[:\s]+(\w+)")
+_RE_DATE = _regex.compile(r"(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})")
+_RE_TOTAL = _regex.compile(r"(?i)total[:\s]+([\d,]+(\.\d{1,2})?)")
+
+@lru_cache(maxsize=4096)
+def _parse_invoice_text(text: str) -> Dict[str, Any]:
+    # memoized on the text: re-processing the same documents skips the regexes
+    out={"vendor":None,"date":None,"invoice_no":None,"total":None,"currency":"KES"}
+    # Vendor
+    m=_RE_VENDOR.search(text)
+    if m: out["vendor"]=m.group(1).strip()
+    else:
+        lines=text.splitlines()
+        if lines: out["vendor"]=lines[0].strip()
+
+    # Invoice No
+    m=_RE_INVOICE_NO.search(text)
+    if m: out["invoice_no"]=m.group(2)
+
+    # Date
+    m=_RE_DATE.search(text)
+    if m:
+        try:
+            out["date"]=datetime.strptime(m.group(1),"%d/%m/%Y").strftime("%Y-%m-%d")
+        except:
+            try: out["date"]=datetime.strptime(m.group(1),"%d-%m-%Y").strftime("%Y-%m-%d")
+            except: out["date"]=m.group(1)
+
+    # Total
+    m=_RE_TOTAL.search(text)
+    if m:
+        amt=m.group(1).replace(",","")
+        try: out["total"]=float(amt)
+        except: pass
+    return out
+
 class OCRIngestion:
     def __init__(self, tenant_id: str):
         self.tenant_id = tenant_id
 
     def extract_text(self, file_path: str) -> str:
-        """Extract text from PDF or image using Tesseract."""
+        """Extract text from PDF or image using Tesseract (cached per file content)."""
         if not OCR_AVAILABLE:
             # fallback: simulate
             return open(file_path,"r",encoding="utf-8").read()
+        cached=_text_cache_path(file_path)
+        if cached.exists():
+            return cached.read_text(encoding="utf-8")
+        text=self._run_ocr(file_path)
+        atomic_write_bytes(cached,text.encode("utf-8"))
+        return text
+
+    def _run_ocr(self, file_path: str) -> str:
         suffix=Path(file_path).suffix.lower()
         if suffix in [".png",".jpg",".jpeg",".tiff"]:
             if Image is None:
@@ -46,39 +113,19 @@ class OCRIngestion:
 
     def parse_invoice_text(self, text: str) -> Dict[str, Any]:
         """Parse key fields from invoice text using regex heuristics (Kenyan style)."""
-        out={"vendor":None,"date":None,"invoice_no":None,"total":None,"currency":"KES"}
-        # Vendor
-        m=re.search(r"(?i)invoice\s+from[:\s]+([A-Za-z0-9 &]+)",text)
-        if m: out["vendor"]=m.group(1).strip()
-        else:
-            lines=text.splitlines()
-            if lines: out["vendor"]=lines[0].strip()
-
-        # Invoice No
-        m=re.search(r"(?i)invoice\s*(no|#)[:\s]+(\w+)",text)
-        if m: out["invoice_no"]=m.group(2)
-
-        # Date
-        m=re.search(r"(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})",text)
-        if m:
-            try:
-                out["date"]=datetime.strptime(m.group(1),"%d/%m/%Y").strftime("%Y-%m-%d")
-            except:
-                try: out["date"]=datetime.strptime(m.group(1),"%d-%m-%Y").strftime("%Y-%m-%d")
-                except: out["date"]=m.group(1)
-
-        # Total
-        m=re.search(r"(?i)total[:\s]+([\d,]+(\.\d{1,2})?)",text)
-        if m:
-            amt=m.group(1).replace(",","")
-            try: out["total"]=float(amt)
-            except: pass
-        return out
+        return dict(_parse_invoice_text(text))  # callers get their own copy of the cached result
 
-    def process_file(self, file_path: str) -> Dict[str, Any]:
+    def read_file(self, file_path: str) -> Dict[str, Any]:
+        """OCR and parse a document without staging it."""
         text=self.extract_text(file_path)
-        parsed=self.parse_invoice_text(text)
-        out={"tenant_id":self.tenant_id,"raw_text":text,"parsed":parsed}
+        return {"tenant_id":self.tenant_id,"raw_text":text,"parsed":self.parse_invoice_text(text)}
+
+    def save_to_staging(self, out: Dict[str, Any]) -> Path:
         outpath=STAGING_DIR/f"{self.tenant_id}_ocr.json"
-        with open(outpath,"w",encoding="utf-8") as f: json.dump(out,f,indent=2)
+        write_json(outpath,out)
+        return outpath
+
+    def process_file(self, file_path: str) -> Dict[str, Any]:
+        out=self.read_file(file_path)
+        self.save_to_staging(out)
         return out
@@ -1,13 +1,64 @@
 
+import numpy as np
 import pandas as pd
-import re, json
+import re
+import hashlib
 from pathlib import Path
 from typing import List, Dict, Any
 from datetime import datetime
 
+from ledger.core.utils import read_json, write_json, atomic_write_json, EXCEL_ENGINE
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    PYARROW_AVAILABLE=True
+except ImportError:
+    PYARROW_AVAILABLE=False
+
 STAGING_DIR = Path(__file__).resolve().parents[2] / "data" / "staging"
 STAGING_DIR.mkdir(parents=True, exist_ok=True)
 
+# Parsed records cached on disk by file content, so re-uploading the same
+# bank export skips parsing; bump PARSER_VERSION when the record shape changes
+PARSE_CACHE_DIR = STAGING_DIR.parent / "parse_cache"
+PARSER_VERSION = 2
+
+def _parse_cache_path(tenant_id: str, file_path: str) -> Path:
+    h=hashlib.blake2b(Path(file_path).suffix.lower().encode(),digest_size=16)
+    with open(file_path,"rb") as f:
+        for chunk in iter(lambda: f.read(1<<20), b""): h.update(chunk)
+    return PARSE_CACHE_DIR/tenant_id/f"v{PARSER_VERSION}_{h.hexdigest()}.json"
+
+def _read_csv(file_path: str) -> pd.DataFrame:
+    # Arrow parses and infers types on all cores; pandas is the fallback
+    if PYARROW_AVAILABLE:
+        try:
+            # empty cells are nulls, as with pandas
+            opts=pacsv.ConvertOptions(strings_can_be_null=True)
+            return pacsv.read_csv(file_path,convert_options=opts).to_pandas()
+        except pa.ArrowException:
+            pass  # ragged rows, odd quoting: the C engine copes
+    return pd.read_csv(file_path)
+
+# header keywords per record field, checked in this order
+_FIELD_KEYWORDS = [
+    ("date", ["date","txn","time"]),
+    ("amount", ["amount","kes","debit","credit"]),
+    ("vendor", ["vendor","payee","name","beneficiary","from","to"]),
+    ("description", ["desc","narration","details","particulars"]),
+    ("reference", ["ref","cheque","id","transaction no"]),
+]
+
+def _field_for(col_l: str):
+    return next((f for f,keys in _FIELD_KEYWORDS if any(k in col_l for k in keys)),None)
+
+def _map_unique(col: pd.Series, fn) -> np.ndarray:
+    # bank exports repeat dates and payees: normalize each distinct value once
+    codes,uniques=pd.factorize(col)
+    out=np.array([fn(v) for v in uniques.tolist()]+[None],dtype=object)
+    return out[codes]  # nulls are code -1, the trailing None
+
 class IngestionParser:
     def __init__(self, tenant_id: str):
         self.tenant_id = tenant_id
@@ -38,45 +89,58 @@ class IngestionParser:
         except: return None
 
     def parse_file(self, file_path: str) -> List[Dict[str, Any]]:
-        """Parse CSV, Excel, or JSON into normalized transaction dicts."""
+        """Parse CSV, Excel, or JSON into normalized transaction dicts (cached per file content)."""
         ext = Path(file_path).suffix.lower()
+        if ext in [".json"]:
+            return read_json(file_path)
+        if ext not in [".csv",".xls",".xlsx"]:
+            raise ValueError(f"Unsupported file type: {ext}")
+        cached = _parse_cache_path(self.tenant_id, file_path)
+        if cached.exists():
+            return read_json(cached)
+        records = self._parse_table(file_path, ext)
+        atomic_write_json(cached, records, indent=False)
+        return records
+
+    def _parse_table(self, file_path: str, ext: str) -> List[Dict[str, Any]]:
         if ext in [".csv"]:
-            df = pd.read_csv(file_path)
-        elif ext in [".xls",".xlsx"]:
-            df = pd.read_excel(file_path)
-        elif ext in [".json"]:
-            return json.load(open(file_path,"r"))
+            df = _read_csv(file_path)
         else:
-            raise ValueError(f"Unsupported file type: {ext}")
+            df = pd.read_excel(file_path, engine=EXCEL_ENGINE)
         df = df.rename(columns={c.lower().strip():c for c in df.columns})
-        records=[]
-        for _, row in df.iterrows():
-            rec={
-              "date": None,
-              "vendor": None,
-              "amount": None,
-              "description": None,
-              "reference": None,
-              "currency": "KES"
-            }
-            # detect fields
-            for col,val in row.items():
-                col_l=col.lower()
-                if any(k in col_l for k in ["date","txn","time"]):
-                    rec["date"]=self._normalize_date(val)
-                elif any(k in col_l for k in ["amount","kes","debit","credit"]):
-                    rec["amount"]=self._normalize_amount(val)
-                elif any(k in col_l for k in ["vendor","payee","name","beneficiary","from","to"]):
-                    rec["vendor"]=str(val).strip() if not pd.isna(val) else None
-                elif any(k in col_l for k in ["desc","narration","details","particulars"]):
-                    rec["description"]=str(val).strip() if not pd.isna(val) else None
-                elif any(k in col_l for k in ["ref","cheque","id","transaction no"]):
-                    rec["reference"]=str(val).strip() if not pd.isna(val) else None
-            if rec["date"] or rec["amount"]:
-                records.append(rec)
-        return records
+        # detect fields by header; a later column for the same field wins
+        fields={}
+        for i,col in enumerate(df.columns):
+            field=_field_for(col.lower())
+            if field: fields[field]=i
+        none=np.full(len(df),None,dtype=object)
+        cols={f:self._normalize_column(f,df.iloc[:,i]) for f,i in fields.items()}
+        return [{"date":d,"vendor":v,"amount":a,"description":x,"reference":r,"currency":"KES"}
+                for d,v,a,x,r in zip(*(cols.get(f,none) for f in ("date","vendor","amount","description","reference")))
+                if d or a]
+
+    def _normalize_column(self, field: str, col: pd.Series) -> np.ndarray:
+        if field=="amount":
+            return self._normalize_amounts(col)
+        if field=="date":
+            return _map_unique(col,self._normalize_date)
+        return _map_unique(col,lambda v: str(v).strip())
+
+    def _normalize_amounts(self, col: pd.Series) -> np.ndarray:
+        """Column-wise _normalize_amount; columns it can't cast go value by value."""
+        if pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+            nums=col.astype("float64")
+        elif isinstance(col.dtype,pd.StringDtype):
+            cleaned=col.str.replace(",","",regex=False).str.replace("KES","",regex=False).str.strip()
+            try: nums=cleaned.astype("float64")
+            except (TypeError, ValueError): return _map_unique(col,self._normalize_amount)
+        else:
+            return _map_unique(col,self._normalize_amount)
+        out=np.array(nums.tolist(),dtype=object)
+        out[col.isna().to_numpy()]=None
+        return out
 
     def save_to_staging(self, records: List[Dict[str, Any]]):
         path=STAGING_DIR/f"{self.tenant_id}_staging.json"
-        with open(path,"w",encoding="utf-8") as f: json.dump(records,f,indent=2)
+        write_json(path,records)
         return str(path)
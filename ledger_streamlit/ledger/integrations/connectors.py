@@ -1,12 +1,53 @@
 
-import json
+import threading
 import pandas as pd
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Optional
+from requests.adapters import HTTPAdapter
+
+from ledger.core.utils import write_json, EXCEL_ENGINE
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE=True
+except ImportError:
+    PARQUET_AVAILABLE=False
 
 STAGING_DIR = Path(__file__).resolve().parents[2] / "data" / "staging"
 STAGING_DIR.mkdir(parents=True, exist_ok=True)
 
+# One pooled session for API fetches, so repeated and concurrent requests to the
+# same host reuse kept-alive connections instead of reconnecting each time
+API_POOL_SIZE=16
+_SESSION: Optional[requests.Session]=None
+_SESSION_LOCK=threading.Lock()
+
+def _session() -> requests.Session:
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            s=requests.Session()
+            adapter=HTTPAdapter(pool_connections=API_POOL_SIZE,pool_maxsize=API_POOL_SIZE)
+            s.mount("http://",adapter); s.mount("https://",adapter)
+            _SESSION=s
+    return _SESSION
+
+def write_staging(tenant_id: str, records) -> Path:
+    """Stage connector records as zstd Parquet; JSON when pyarrow is missing or the records aren't tabular."""
+    if PARQUET_AVAILABLE and isinstance(records,list) and records:
+        out=STAGING_DIR/f"{tenant_id}_staging.parquet"
+        try:
+            pq.write_table(pa.Table.from_pylist(records),out,compression="zstd")
+            return out
+        except (pa.ArrowException, TypeError, KeyError):
+            pass  # mixed-type or non-dict rows: keep them as JSON
+    out=STAGING_DIR/f"{tenant_id}_staging.json"
+    write_json(out,records)
+    return out
+
 class QuickBooksConnector:
     def __init__(self, tenant_id: str):
         self.tenant_id=tenant_id
@@ -22,9 +63,7 @@ class QuickBooksConnector:
         return [{"date":"2025-09-12","amount":10000.0,"vendor":"QuickBooks Vendor","reference":"QB123"}]
 
     def save_to_staging(self, records: list) -> Path:
-        out=STAGING_DIR/f"{self.tenant_id}_staging.json"
-        with open(out,"w",encoding="utf-8") as f: json.dump(records,f,indent=2)
-        return out
+        return write_staging(self.tenant_id,records)
 
 class ExcelConnector:
     def __init__(self, tenant_id: str):
@@ -34,12 +73,14 @@ class ExcelConnector:
         """Test Excel file access."""
         return True
 
+    def load_frame(self, path: str) -> pd.DataFrame:
+        """Read an Excel or CSV file, stage its rows and return the frame."""
+        df=pd.read_csv(path) if Path(path).suffix.lower()==".csv" else pd.read_excel(path,engine=EXCEL_ENGINE)
+        write_staging(self.tenant_id,df.to_dict(orient="records"))
+        return df
+
     def load_excel(self, path: str) -> list:
-        df=pd.read_excel(path)
-        records=df.to_dict(orient="records")
-        out=STAGING_DIR/f"{self.tenant_id}_staging.json"
-        with open(out,"w",encoding="utf-8") as f: json.dump(records,f,indent=2)
-        return records
+        return self.load_frame(path).to_dict(orient="records")
 
 class APIConnector:
     def __init__(self, tenant_id: str):
@@ -49,13 +90,25 @@ class APIConnector:
         """Test API endpoint connectivity."""
         return True
 
-    def fetch_from_api(self, url: str) -> list:
+    @staticmethod
+    def _get_json(url: str):
         try:
-            r=requests.get(url,timeout=10)
+            r=_session().get(url,timeout=10)
             r.raise_for_status()
-            data=r.json()
+            return r.json()
         except Exception as e:
             raise RuntimeError(f"API fetch failed: {e}")
-        out=STAGING_DIR/f"{self.tenant_id}_staging.json"
-        with open(out,"w",encoding="utf-8") as f: json.dump(data,f,indent=2)
+
+    def fetch_from_api(self, url: str) -> list:
+        data=self._get_json(url)
+        write_staging(self.tenant_id,data)
+        return data
+
+    def fetch_pages(self, urls: List[str], max_workers: int=8) -> list:
+        """Fetch several endpoints (e.g. the pages of one listing) concurrently
+        and stage their records together, in url order."""
+        with ThreadPoolExecutor(max_workers=max(1,min(max_workers,len(urls)))) as pool:
+            pages=list(pool.map(self._get_json,urls))
+        data=[rec for page in pages for rec in (page if isinstance(page,list) else [page])]
+        write_staging(self.tenant_id,data)
         return data
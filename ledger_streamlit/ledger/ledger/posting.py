@@ -1,8 +1,12 @@
 
-import json
+import threading
+import time
+from collections import defaultdict
 from pathlib import Path
 from typing import List, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
+
+from ledger.core.utils import read_json, write_json
 
 DATA_DIR = Path(__file__).resolve().parents[2] / "data"
 LEDGER_DIR = DATA_DIR / "ledger"
@@ -23,48 +27,96 @@ CHART_OF_ACCOUNTS = {
     "5200": "Expenses:Fleet",
 }
 
+# created_at stamps are millisecond-resolution; bulk posting produces many
+# entries per millisecond, so the formatted string is reused until it ticks.
+_last_ms=-1
+_last_stamp=""
+
+def _utc_stamp() -> str:
+    global _last_ms,_last_stamp
+    ms=time.time_ns()//1_000_000
+    if ms!=_last_ms:
+        dt=datetime.fromtimestamp(ms/1000,tz=timezone.utc).replace(tzinfo=None)
+        _last_ms,_last_stamp=ms,dt.isoformat(timespec="milliseconds")+"Z"
+    return _last_stamp
+
+# Parsed journals shared by every LedgerPosting (Streamlit builds new ones on
+# each rerun): path -> ((mtime_ns, size), entries); any write changes the stamp
+_JOURNALS: Dict[str, tuple] = {}
+_JOURNALS_LOCK=threading.Lock()
+
 class LedgerPosting:
     def __init__(self, tenant_id: str):
         self.tenant_id = tenant_id
         self.file = LEDGER_DIR / f"{tenant_id}_journal.json"
         if not self.file.exists():
-            with open(self.file,"w",encoding="utf-8") as f: json.dump([],f)
+            write_json(self.file,[],indent=False)
+
+    @staticmethod
+    def read_journal(path: Path) -> List[Dict[str, Any]]:
+        """Journal entries, parsed again only when the file's stamp changes.
+        The list is the caller's own; the entry dicts are shared, so don't modify them."""
+        st=Path(path).stat()
+        stamp=(st.st_mtime_ns,st.st_size)
+        with _JOURNALS_LOCK:
+            cached=_JOURNALS.get(str(path))
+        if cached is not None and cached[0]==stamp:
+            return list(cached[1])
+        journal=read_json(path)
+        with _JOURNALS_LOCK:
+            _JOURNALS[str(path)]=(stamp,journal)
+        return list(journal)
 
     def load_journal(self) -> List[Dict[str, Any]]:
-        return json.load(open(self.file,"r",encoding="utf-8"))
+        return self.read_journal(self.file)
 
-    def post_entry(self, date: str, description: str, debit_acct: str, credit_acct: str, amount: float, ref: str=None) -> Dict[str,Any]:
-        entry={
+    def _make_entry(self, date: str, description: str, debit_acct: str, credit_acct: str, amount: float, ref: str=None) -> Dict[str,Any]:
+        return {
             "date":date,
             "description":description,
             "debit_acct":debit_acct,
             "credit_acct":credit_acct,
             "amount":amount,
             "ref":ref,
-            "created_at":datetime.utcnow().isoformat()+"Z"
+            "created_at":_utc_stamp()
         }
+
+    def _append_entries(self, entries: List[Dict[str,Any]]):
         journal=self.load_journal()
-        journal.append(entry)
-        with open(self.file,"w",encoding="utf-8") as f: json.dump(journal,f,indent=2)
+        journal.extend(entries)
+        write_json(self.file,journal)
+
+    def post_entry(self, date: str, description: str, debit_acct: str, credit_acct: str, amount: float, ref: str=None) -> Dict[str,Any]:
+        entry=self._make_entry(date,description,debit_acct,credit_acct,amount,ref)
+        self._append_entries([entry])
         return entry
 
+    def post_entries_bulk(self, entries: List[Dict[str,Any]]) -> List[Dict[str,Any]]:
+        """Post several entries (post_entry keyword dicts) with a single journal write."""
+        posted=[self._make_entry(**e) for e in entries]
+        if posted: self._append_entries(posted)
+        return posted
+
     def post_from_reconciliation(self, recon_file: Path) -> List[Dict[str,Any]]:
         if not Path(recon_file).exists():
             raise FileNotFoundError("Reconciliation file not found")
-        report=json.load(open(recon_file,"r",encoding="utf-8"))
+        from ledger.reconcile.engine import load_recon
+        report=load_recon(recon_file)
         posted=[]
+        today=datetime.utcnow().strftime("%Y-%m-%d")
         for m in report.get("matches",[]):
             if not m.get("match"): continue
             rec=m["staging"]
-            date=rec.get("date") or datetime.utcnow().strftime("%Y-%m-%d")
+            date=rec.get("date") or today
             amt=rec.get("amount") or 0.0
             vendor=rec.get("vendor_normalized") or rec.get("vendor")
             desc=f"Payment to {vendor}"
             # Simple rule: Payments reduce bank, increase expense
             debit="5000"  # Expenses:General
             credit="1000" # Assets:Cash/Bank
-            entry=self.post_entry(date,desc,debit,credit,amt,ref=rec.get("reference"))
-            posted.append(entry)
+            posted.append(self._make_entry(date,desc,debit,credit,amt,ref=rec.get("reference")))
+        # one journal rewrite for the whole batch rather than one per match
+        if posted: self._append_entries(posted)
         return posted
     
     def get_chart_of_accounts(self) -> Dict[str, str]:
@@ -73,27 +125,13 @@ class LedgerPosting:
     
     def get_trial_balance(self) -> Dict[str, float]:
         """Calculate trial balance from journal entries"""
-        journal = self.load_journal()
-        balances = {}
-        
-        for entry in journal:
-            debit_acct = entry.get("debit_acct", "")
-            credit_acct = entry.get("credit_acct", "")
+        balances = defaultdict(float)
+        for entry in self.load_journal():
             amount = float(entry.get("amount", 0))
-            
-            # Debit increases asset/expense accounts, decreases liability/equity/revenue
-            if debit_acct in balances:
-                balances[debit_acct] += amount
-            else:
-                balances[debit_acct] = amount
-                
-            # Credit decreases asset/expense accounts, increases liability/equity/revenue  
-            if credit_acct in balances:
-                balances[credit_acct] -= amount
-            else:
-                balances[credit_acct] = -amount
-                
-        return balances
+            # Debit increases asset/expense accounts, credit increases liability/equity/revenue
+            balances[entry.get("debit_acct", "")] += amount
+            balances[entry.get("credit_acct", "")] -= amount
+        return dict(balances)
     
     def get_balance_by_account_type(self, account_type: str) -> float:
         """Get total balance for account type (Assets, Liabilities, Equity, Revenue, Expenses)"""
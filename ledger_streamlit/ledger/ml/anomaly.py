@@ -1,5 +1,5 @@
 
-import math
+import hashlib
 import joblib
 import numpy as np
 from pathlib import Path
@@ -8,34 +8,73 @@ from typing import List, Dict, Any
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 
+try:
+    import numexpr as ne
+    NUMEXPR_AVAILABLE=True
+except Exception:
+    NUMEXPR_AVAILABLE=False
+
 MODELS_DIR = Path(__file__).resolve().parents[2] / "data" / "models"
 MODELS_DIR.mkdir(parents=True, exist_ok=True)
 
+# Part of the fit key: bump when _features changes so saved forests refit
+FEATURES_VERSION = 1
+
+def _fit_key(X: np.ndarray, contamination: float) -> str:
+    h = hashlib.blake2b(f"v{FEATURES_VERSION}:{contamination!r}:".encode(), digest_size=16)
+    h.update(np.ascontiguousarray(X).tobytes())
+    return h.hexdigest()
+
+def _signed_log1p(amt: np.ndarray, out: np.ndarray) -> np.ndarray:
+    # sign(amt)*log1p(|amt|), written straight into out
+    if NUMEXPR_AVAILABLE:
+        return ne.evaluate("where(amt>=0, log1p(abs(amt)), -log1p(abs(amt)))", local_dict={"amt":amt}, out=out)
+    np.abs(amt, out=out)
+    np.log1p(out, out=out)
+    return np.copysign(out, amt, out=out)
+
 def _features(transactions: List[Dict[str, Any]]):
-    X = []
-    for t in transactions:
-        amt = float(t.get("amount",0))
-        log_amt = math.log1p(abs(amt)) * (1 if amt>=0 else -1)
-        dom = int(t.get("date_dom",1))
-        vendor_len = len(t.get("vendor",""))
-        X.append([log_amt, dom, vendor_len])
-    return np.array(X)
+    n = len(transactions)
+    X = np.empty((n,3), dtype=np.float64)
+    amt = np.fromiter((float(t.get("amount",0)) for t in transactions), dtype=np.float64, count=n)
+    log_amt = np.empty(n, dtype=np.float64)
+    X[:,0] = _signed_log1p(amt, log_amt)
+    X[:,1] = np.fromiter((int(t.get("date_dom",1)) for t in transactions), dtype=np.int64, count=n)
+    X[:,2] = np.fromiter((len(t.get("vendor","")) for t in transactions), dtype=np.int64, count=n)
+    return X
+
+def _tree_input(Xs: np.ndarray) -> np.ndarray:
+    # sklearn's trees work in float32; convert once rather than in each of
+    # fit / score_samples / predict
+    return np.ascontiguousarray(Xs, dtype=np.float32)
 
 class AnomalyDetector:
     def __init__(self, tenant_id: str):
         self.tenant_id = tenant_id
         self.model_path = MODELS_DIR / f"anomaly_{tenant_id}.joblib"
         self.scaler_path = MODELS_DIR / f"anomaly_{tenant_id}_scaler.joblib"
+        self.key_path = MODELS_DIR / f"anomaly_{tenant_id}.key"
         self.model=None; self.scaler=None
 
     def train(self, transactions: List[Dict[str, Any]], contamination:float=0.01):
         X = _features(transactions)
+        key = _fit_key(X, contamination)
+        # same features and contamination as the saved forest: load, don't refit
+        if self.key_path.exists() and self.key_path.read_text() == key:
+            try:
+                self.load()
+                return {"model":str(self.model_path)}
+            except (OSError, EOFError):
+                pass
         self.scaler = StandardScaler().fit(X)
-        Xs = self.scaler.transform(X)
-        self.model = IsolationForest(contamination=contamination, random_state=42)
+        Xs = _tree_input(self.scaler.transform(X))
+        # trees are independent: build them on all cores (same forest for a fixed random_state)
+        self.model = IsolationForest(contamination=contamination, random_state=42, n_jobs=-1)
         self.model.fit(Xs)
         joblib.dump(self.model, self.model_path)
         joblib.dump(self.scaler, self.scaler_path)
+        # written last: a partial save leaves a stale key and forces a refit
+        self.key_path.write_text(key)
         return {"model":str(self.model_path)}
 
     def load(self):
@@ -46,7 +85,7 @@ class AnomalyDetector:
     def score(self, transactions: List[Dict[str, Any]]):
         if self.model is None: self.load()
         X = _features(transactions)
-        Xs = self.scaler.transform(X)
+        Xs = _tree_input(self.scaler.transform(X))
         scores = self.model.score_samples(Xs)
         preds = self.model.predict(Xs)
         return [{"id":t.get("id"),"score":float(s),"is_anomaly":(int(p)==-1)}
@@ -22,7 +22,7 @@ class ClassifierWrapper:
         mode=_backend()
         if mode=="xgboost":
             import xgboost as xgb
-            self.model=xgb.XGBClassifier(use_label_encoder=False, eval_metric='logloss')
+            self.model=xgb.XGBClassifier(use_label_encoder=False, eval_metric='logloss', tree_method='hist')
         elif mode=="lightgbm":
             import lightgbm as lgb
             self.model=lgb.LGBMClassifier()
@@ -36,8 +36,9 @@ class ClassifierWrapper:
     def load(self):
         self.model=joblib.load(self.model_path); return True
 
-    def predict(self,X):
+    def predict(self,X,with_proba:bool=False):
+        # arrays are returned as-is; core.utils.write_json serialises numpy directly
         if self.model is None: self.load()
         preds=self.model.predict(X)
-        probs=self.model.predict_proba(X).tolist() if hasattr(self.model,"predict_proba") else None
-        return {"predictions":preds.tolist() if hasattr(preds,"tolist") else list(preds),"probabilities":probs}
+        probs=self.model.predict_proba(X) if with_proba and hasattr(self.model,"predict_proba") else None
+        return {"predictions":preds,"probabilities":probs}
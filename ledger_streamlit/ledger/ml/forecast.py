@@ -1,8 +1,13 @@
 
+import hashlib
+import threading
 import pandas as pd
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Callable
 
 try:
     from prophet import Prophet
@@ -18,36 +23,63 @@ except ImportError:
 
 from ledger.ledger.posting import LedgerPosting
 
+@lru_cache(maxsize=32)
+def _monthly_totals(journal_file: str, mtime_ns: int, size: int) -> pd.DataFrame:
+    # keyed on the journal's mtime/size so any post_entry invalidates the entry
+    journal=LedgerPosting.read_journal(Path(journal_file))
+    if not journal: return pd.DataFrame(columns=["date","amount","type"])
+    df=pd.DataFrame(journal)
+    df["date"]=pd.to_datetime(df["date"])
+    # classify revenue vs expense by account codes
+    df["type"]=np.where(df["credit_acct"].str.startswith("4"),"Revenue",
+                np.where(df["debit_acct"].str.startswith("5"),"Expense","Other"))
+    agg=df.groupby([pd.Grouper(key="date",freq="M"),"type"])["amount"].sum().reset_index()
+    return agg
+
+# Fitted models keyed by a digest of the training data, shared across
+# ForecastEngine instances (Streamlit builds a new one on every rerun).
+_FIT_CACHE: "OrderedDict[tuple,Any]"=OrderedDict()
+_FIT_CACHE_SIZE=16
+_FIT_LOCK=threading.Lock()
+
+def _data_key(backend: str, *arrays) -> tuple:
+    h=hashlib.blake2b(digest_size=16)
+    for a in arrays: h.update(np.ascontiguousarray(a).tobytes())
+    return (backend,h.hexdigest())
+
+def _cached_fit(key: tuple, fit: Callable[[],Any]):
+    with _FIT_LOCK:
+        model=_FIT_CACHE.get(key)
+        if model is not None:
+            _FIT_CACHE.move_to_end(key)
+            return model
+    model=fit()
+    with _FIT_LOCK:
+        _FIT_CACHE[key]=model
+        while len(_FIT_CACHE)>_FIT_CACHE_SIZE: _FIT_CACHE.popitem(last=False)
+    return model
+
 class ForecastEngine:
     def __init__(self, tenant_id: str):
         self.tenant_id=tenant_id
         self.lp=LedgerPosting(tenant_id)
 
     def load_monthly(self) -> pd.DataFrame:
-        journal=self.lp.load_journal()
-        if not journal: return pd.DataFrame(columns=["date","amount","type"])
-        df=pd.DataFrame(journal)
-        df["date"]=pd.to_datetime(df["date"])
-        # classify revenue vs expense by account codes
-        df["type"]=np.where(df["credit_acct"].str.startswith("4"),"Revenue",
-                    np.where(df["debit_acct"].str.startswith("5"),"Expense","Other"))
-        agg=df.groupby([pd.Grouper(key="date",freq="M"),"type"])["amount"].sum().reset_index()
-        return agg
+        st=self.lp.file.stat()
+        return _monthly_totals(str(self.lp.file),st.st_mtime_ns,st.st_size).copy()
 
     def forecast(self, series: pd.DataFrame, periods:int=12) -> pd.DataFrame:
         if series.empty: return pd.DataFrame()
         df=series.rename(columns={"date":"ds","amount":"y"})
+        ds=df["ds"].to_numpy(dtype="datetime64[ns]"); y=df["y"].to_numpy(dtype=np.float64)
         if PROPHET_AVAILABLE:
-            m=Prophet()
-            m.fit(df)
+            m=_cached_fit(_data_key("prophet",ds,y),lambda: Prophet().fit(df))
             future=m.make_future_dataframe(periods=periods,freq="M")
             fcst=m.predict(future)
             return fcst[["ds","yhat","yhat_lower","yhat_upper"]]
         elif XGB_AVAILABLE:
             df["t"]=range(len(df))
-            X=df[["t"]]; y=df["y"]
-            model=XGBRegressor(n_estimators=100)
-            model.fit(X,y)
+            model=_cached_fit(_data_key("xgb",ds,y),lambda: XGBRegressor(n_estimators=100).fit(df[["t"]],df["y"]))
             future=pd.DataFrame({"t":range(len(df),len(df)+periods)})
             preds=model.predict(future)
             future["yhat"]=preds
@@ -59,11 +91,33 @@ class ForecastEngine:
             dates=pd.date_range(df["ds"].iloc[-1],periods=periods+1,freq="M")[1:]
             return pd.DataFrame({"ds":dates,"yhat":[last]*periods})
 
-    def forecast_revenue_expenses(self, periods:int=12) -> Dict[str,pd.DataFrame]:
-        data=self.load_monthly()
+    def _forecast_xgb_joint(self, series: Dict[str,pd.DataFrame], periods:int) -> Dict[str,pd.DataFrame]:
+        # one regressor over all series, told apart by a series-index feature
+        frames=[]
+        for k,(name,s) in enumerate(series.items()):
+            df=s.rename(columns={"date":"ds","amount":"y"}).reset_index(drop=True)
+            df["t"]=range(len(df)); df["series"]=k
+            frames.append(df)
+        train=pd.concat(frames,ignore_index=True)
+        key=_data_key("xgb-joint",train["ds"].to_numpy(dtype="datetime64[ns]"),
+                      train["series"].to_numpy(dtype=np.int64),train["y"].to_numpy(dtype=np.float64))
+        model=_cached_fit(key,lambda: XGBRegressor(n_estimators=100).fit(train[["t","series"]],train["y"]))
         results={}
-        for t in ["Revenue","Expense"]:
-            series=data[data["type"]==t][["date","amount"]]
-            if not series.empty:
-                results[t]=self.forecast(series,periods)
+        for k,(name,df) in enumerate(zip(series,frames)):
+            future=pd.DataFrame({"t":range(len(df),len(df)+periods),"series":k})
+            future["yhat"]=model.predict(future[["t","series"]])
+            future["ds"]=pd.date_range(df["ds"].iloc[-1],periods=periods+1,freq="M")[1:]
+            results[name]=future[["ds","yhat"]]
         return results
+
+    def forecast_revenue_expenses(self, periods:int=12) -> Dict[str,pd.DataFrame]:
+        data=self.load_monthly()
+        series={t:data[data["type"]==t][["date","amount"]] for t in ["Revenue","Expense"]}
+        series={t:s for t,s in series.items() if not s.empty}
+        if not series: return {}
+        if not PROPHET_AVAILABLE and XGB_AVAILABLE:
+            return self._forecast_xgb_joint(series,periods)
+        # Prophet spends its time inside Stan, so the fits can overlap in threads
+        with ThreadPoolExecutor(max_workers=len(series)) as ex:
+            futures={t:ex.submit(self.forecast,s,periods) for t,s in series.items()}
+        return {t:f.result() for t,f in futures.items()}
@@ -1,16 +1,33 @@
 
-import json
+import hashlib
+import threading
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from typing import Tuple
 from sklearn.ensemble import IsolationForest
 
 from ledger.ledger.posting import LedgerPosting
+from ledger.core.utils import write_json
 
 DATA_DIR = Path(__file__).resolve().parents[2] / "data"
 FRAUD_DIR = DATA_DIR / "fraud"
 FRAUD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Refit the forest only once entries appended since the last fit reach this
+# share of the rows it was fit on; smaller appends are scored by the current one
+REFIT_MIN_DELTA = 0.10
+
+# (tenant_id, contamination) -> (rows fit on, digest of those amounts, forest),
+# least recently used first; only the last _MODELS_SIZE forests are kept
+_MODELS: "OrderedDict[tuple, Tuple[int, str, IsolationForest]]" = OrderedDict()
+_MODELS_SIZE = 8
+_MODELS_LOCK = threading.Lock()
+
+def _digest(X: np.ndarray) -> str:
+    return hashlib.blake2b(np.ascontiguousarray(X).tobytes(), digest_size=16).hexdigest()
+
 class FraudDetector:
     def __init__(self, tenant_id: str):
         self.tenant_id=tenant_id
@@ -19,13 +36,30 @@ class FraudDetector:
     def detect(self, contamination: float=0.05) -> pd.DataFrame:
         journal=self.lp.load_journal()
         if not journal: return pd.DataFrame()
-        df=pd.DataFrame(journal)
-        if df.empty: return df
-        X=df[["amount"]].values
-        clf=IsolationForest(contamination=contamination,random_state=42)
-        df["anomaly"]=clf.fit_predict(X)
-        df["anomaly"]=df["anomaly"].map({-1:"Suspicious",1:"Normal"})
-        frauds=df[df["anomaly"]=="Suspicious"]
+        # fit on the raw amount column; the DataFrame is only built for the caller
+        X=np.fromiter((float(e.get("amount",0)) for e in journal),dtype=np.float64,count=len(journal)).reshape(-1,1)
+        preds=self._model(X,contamination).predict(X)
+        suspicious=[journal[i] for i in np.flatnonzero(preds==-1)]
         out=FRAUD_DIR/f"{self.tenant_id}_fraud.json"
-        frauds.to_json(out,orient="records",indent=2,date_format="iso")
+        write_json(out,suspicious)
+        df=pd.DataFrame(journal)
+        df["anomaly"]=np.where(preds==-1,"Suspicious","Normal")
         return df
+
+    def _model(self, X: np.ndarray, contamination: float) -> IsolationForest:
+        """The tenant's fitted forest, refit when the journal was rewritten or has grown enough."""
+        key=(self.tenant_id,contamination)
+        with _MODELS_LOCK:
+            cached=_MODELS.get(key)
+            if cached is not None: _MODELS.move_to_end(key)
+        if cached is not None:
+            n_fit,digest,clf=cached
+            # an append-only journal keeps the fitted rows as its prefix
+            if n_fit<=len(X)<n_fit*(1+REFIT_MIN_DELTA) and _digest(X[:n_fit])==digest:
+                return clf
+        clf=IsolationForest(contamination=contamination,random_state=42,n_jobs=-1).fit(X)
+        with _MODELS_LOCK:
+            _MODELS[key]=(len(X),_digest(X),clf)
+            _MODELS.move_to_end(key)
+            while len(_MODELS)>_MODELS_SIZE: _MODELS.popitem(last=False)
+        return clf
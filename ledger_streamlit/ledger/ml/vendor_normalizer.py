@@ -1,13 +1,17 @@
 
-import os, json, uuid
+import io, os, json, uuid
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 from dataclasses import dataclass, asdict
-from fuzzywuzzy import fuzz
+import numpy as np
+from scipy import sparse
+from rapidfuzz import fuzz, process, utils as rf_utils
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.neighbors import NearestNeighbors
 import joblib
 
+from ledger.core.utils import atomic_write_bytes
+
 MODELS_DIR = Path(__file__).resolve().parents[2] / "data" / "models"
 VENDORS_DIR = Path(__file__).resolve().parents[2] / "data" / "vendors"
 MODELS_DIR.mkdir(parents=True, exist_ok=True)
@@ -18,69 +22,196 @@ class ModelMeta:
     model_id: str
     tenant_id: str
     created_at: str
-    vectorizer_file: str
-    nn_file: str
+    vocab_file: str
+    idf_file: str
+    matrix_file: str
     vendor_list_file: str
     def to_dict(self): return asdict(self)
 
+NGRAM_RANGE=(1,2)
+# Vendor lists up to this many rows are searched with a plain inner product
+# against a quantized copy of X instead of sparse NN.
+DENSE_KNN_MAX_ROWS=20_000
+QSCALE=127
+NN_MIN_SIM=0.6
+# normalize_batch remembers results per raw name until the model changes
+NORM_CACHE_MAX=50_000
+
+def _quantize(X) -> sparse.csr_matrix:
+    """L2-normalised TF-IDF rows -> int8-range weights scaled by QSCALE.
+    Only the stored values are rounded, so X is never densified; they are kept
+    as float32 so sparse products accumulate exactly and cannot overflow."""
+    Xq=sparse.csr_matrix(X,dtype=np.float32,copy=True)
+    Xq.data=np.rint(Xq.data*QSCALE)
+    Xq.eliminate_zeros()
+    return Xq
+
+def _serialized(write) -> bytes:
+    """What write(file) would put in a file, as bytes."""
+    buf=io.BytesIO(); write(buf)
+    return buf.getvalue()
+
+def _build_vectorizer(vocab: Dict[str,int], idf: np.ndarray) -> TfidfVectorizer:
+    """Rebuild a fitted TfidfVectorizer from its vocabulary and idf weights."""
+    vec=TfidfVectorizer(ngram_range=NGRAM_RANGE, vocabulary=vocab)
+    vec.idf_=idf
+    return vec
+
 class VendorNormalizer:
     def __init__(self, tenant_id: str):
         self.tenant_id = tenant_id
         self.vectorizer = None
         self.nn = None
         self.vendor_list: List[str] = []
+        self.X = None
+        self.Xq: Optional[sparse.csr_matrix] = None
         self.meta: Optional[ModelMeta] = None
+        self._norm_cache: Dict[tuple,Dict[str,Any]] = {}
 
     def _model_base(self): return MODELS_DIR / f"vendor_{self.tenant_id}"
 
     def train(self, vendors: List[str]):
         vendors = list(dict.fromkeys([v.strip() for v in vendors if v]))
         self.vendor_list = vendors
-        self.vectorizer = TfidfVectorizer(ngram_range=(1,2)).fit(vendors)
-        X = self.vectorizer.transform(vendors)
-        self.nn = NearestNeighbors(n_neighbors=1, metric="cosine").fit(X)
+        self.vectorizer = TfidfVectorizer(ngram_range=NGRAM_RANGE).fit(vendors)
+        self.X = self.vectorizer.transform(vendors)
+        self._build_index()
+        base=str(self._model_base())
         self.meta = ModelMeta(
             model_id=str(uuid.uuid4()),
             tenant_id=self.tenant_id,
             created_at=__import__("time").ctime(),
-            vectorizer_file=str(self._model_base())+"_vec.joblib",
-            nn_file=str(self._model_base())+"_nn.joblib",
-            vendor_list_file=str(self._model_base())+"_vendors.json"
+            vocab_file=base+"_vocab.json",
+            idf_file=base+"_idf.npy",
+            matrix_file=base+"_X.npz",
+            vendor_list_file=base+"_vendors.json"
         )
         return self.meta
 
     def save(self):
+        # Persist raw arrays rather than pickled sklearn objects: loading becomes a
+        # plain read and survives scikit-learn upgrades.
         if not self.meta: raise RuntimeError("Train before save")
-        joblib.dump(self.vectorizer, self.meta.vectorizer_file)
-        joblib.dump(self.nn, self.meta.nn_file)
-        with open(self.meta.vendor_list_file,"w") as f: json.dump(self.vendor_list,f,indent=2)
-        with open(Path(self.meta.vectorizer_file).with_suffix(".meta.json"),"w") as f: json.dump(self.meta.to_dict(),f,indent=2)
+        vocab={term:int(i) for term,i in self.vectorizer.vocabulary_.items()}
+        # Each file is swapped in whole, and the vendor list goes last: other
+        # processes reload when its stamp changes, so the rest must be in place
+        atomic_write_bytes(self.meta.vocab_file, json.dumps(vocab).encode())
+        atomic_write_bytes(self.meta.idf_file, _serialized(lambda f: np.save(f, self.vectorizer.idf_.astype(np.float32))))
+        atomic_write_bytes(self.meta.matrix_file, _serialized(lambda f: sparse.save_npz(f, self.X.tocsr())))
+        atomic_write_bytes(str(self._model_base())+"_meta.json", json.dumps(self.meta.to_dict(),indent=2).encode())
+        atomic_write_bytes(self.meta.vendor_list_file, json.dumps(self.vendor_list,indent=2).encode())
         return self.meta.to_dict()
 
     def load(self):
-        base=self._model_base()
-        vec_file=str(base)+"_vec.joblib"
-        nn_file=str(base)+"_nn.joblib"
-        vendors_file=str(base)+"_vendors.json"
-        self.vectorizer=joblib.load(vec_file)
-        self.nn=joblib.load(nn_file)
-        with open(vendors_file) as f: self.vendor_list=json.load(f)
+        base=str(self._model_base())
+        with open(base+"_vendors.json") as f: self.vendor_list=json.load(f)
+        if not Path(base+"_X.npz").exists():
+            # models saved before the array format only have the pickled vectorizer
+            self.vectorizer=joblib.load(base+"_vec.joblib")
+            self.X=self.vectorizer.transform(self.vendor_list)
+            self._build_index()
+            return True
+        with open(base+"_vocab.json") as f: vocab=json.load(f)
+        idf=np.load(base+"_idf.npy", mmap_mode="r")
+        self.vectorizer=_build_vectorizer(vocab, np.asarray(idf, dtype=np.float64))
+        self.X=sparse.load_npz(base+"_X.npz")
+        if self.X.shape[0]!=len(self.vendor_list):
+            # a retrain replaced the arrays between our reads; its vendor list comes next
+            raise RuntimeError("Vendor model files are from different trainings")
+        self._build_index()
         return True
 
+    def _build_index(self):
+        self._norm_cache.clear()
+        # TfidfVectorizer rows are already L2-normalised, so cosine similarity is
+        # just an inner product; small lists use the quantized copy, large ones sparse NN.
+        if self.X.shape[0] <= DENSE_KNN_MAX_ROWS:
+            self.Xq=_quantize(self.X); self.nn=None
+        else:
+            self.Xq=None
+            self.nn=NearestNeighbors(n_neighbors=1, metric="cosine").fit(self.X)
+
+    def _nearest(self, name: str):
+        vec=self.vectorizer.transform([name])
+        if self.Xq is not None:
+            sims=(self.Xq @ _quantize(vec).T).toarray().ravel()
+            i=int(sims.argmax())
+            return min(1.0, float(sims[i])/(QSCALE*QSCALE)), i
+        dist,ind=self.nn.kneighbors(vec,n_neighbors=1)
+        return 1.0-float(dist[0][0]), int(ind[0][0])
+
+    def _has_model(self) -> bool:
+        return bool(self.vectorizer and (self.Xq is not None or self.nn) and self.vendor_list)
+
+    def _fuzzy_best(self, names: List[str], chunk: int=256):
+        """Best token-set match per name: (vendor index, integer score 0-100).
+        Scores are rounded before the argmax so ties resolve to the first
+        vendor, as fuzzywuzzy's integer token_set_ratio did."""
+        idx=np.zeros(len(names),dtype=np.int64); scores=np.zeros(len(names))
+        if not self.vendor_list: return idx, scores
+        for lo in range(0,len(names),chunk):
+            S=np.rint(process.cdist(names[lo:lo+chunk], self.vendor_list, scorer=fuzz.token_set_ratio,
+                                    processor=rf_utils.default_process, workers=-1))
+            idx[lo:lo+chunk]=S.argmax(axis=1)
+            scores[lo:lo+chunk]=S.max(axis=1)
+        return idx, scores
+
+    def _fuzzy_result(self, raw_name: str, i: int, score: float, fuzzy_threshold: int) -> Dict[str,Any]:
+        if score>0 and score>=fuzzy_threshold:
+            return {"input":raw_name,"canonical":self.vendor_list[i],"score":score/100.0,"method":"fuzzy"}
+        return {"input":raw_name,"canonical":None,"score":0.0,"method":"none"}
+
+    def _fuzzy(self, raw_name: str, name: str, fuzzy_threshold: int) -> Dict[str,Any]:
+        idx,scores=self._fuzzy_best([name])
+        return self._fuzzy_result(raw_name,int(idx[0]),float(scores[0]),fuzzy_threshold)
+
     def normalize(self, raw_name: str, *, fuzzy_threshold:int=75) -> Dict[str,Any]:
         name=(raw_name or "").strip()
         if not name: return {"input":raw_name,"canonical":None,"score":0.0,"method":"none"}
-        if self.vectorizer and self.nn and self.vendor_list:
-            vec=self.vectorizer.transform([name])
-            dist,ind=self.nn.kneighbors(vec,n_neighbors=1)
-            sim=1.0-float(dist[0][0])
-            cand=self.vendor_list[int(ind[0][0])]
-            if sim>=0.6:
+        if self._has_model():
+            sim,i=self._nearest(name)
+            cand=self.vendor_list[i]
+            if sim>=NN_MIN_SIM:
                 return {"input":raw_name,"canonical":cand,"score":sim,"method":"nn"}
-        best=None; best_score=0
-        for v in self.vendor_list:
-            s=fuzz.token_set_ratio(name,v)
-            if s>best_score: best, best_score=v, s
-        if best_score>=fuzzy_threshold:
-            return {"input":raw_name,"canonical":best,"score":best_score/100.0,"method":"fuzzy"}
-        return {"input":raw_name,"canonical":None,"score":0.0,"method":"none"}
+        return self._fuzzy(raw_name,name,fuzzy_threshold)
+
+    def _nearest_batch(self, names: List[str], chunk: int=256):
+        V=self.vectorizer.transform(names)
+        if self.Xq is None:
+            dist,ind=self.nn.kneighbors(V,n_neighbors=1)
+            return 1.0-dist[:,0], ind[:,0]
+        sims=np.empty(len(names)); idx=np.empty(len(names),dtype=np.int64)
+        for lo in range(0,len(names),chunk):
+            S=(_quantize(V[lo:lo+chunk]) @ self.Xq.T).toarray()
+            idx[lo:lo+chunk]=S.argmax(axis=1)
+            sims[lo:lo+chunk]=np.minimum(1.0, S.max(axis=1)/(QSCALE*QSCALE))
+        return sims, idx
+
+    def normalize_batch(self, raw_names, *, fuzzy_threshold:int=75) -> List[Dict[str,Any]]:
+        """normalize() over many names: each distinct name is resolved once, and
+        the nearest-neighbour search runs as one matrix product for all of them."""
+        raw_names=list(raw_names)
+        todo={}
+        for n in raw_names:
+            if isinstance(n,str) and (n,fuzzy_threshold) not in self._norm_cache:
+                todo.setdefault(n.strip(),[]).append(n)
+        todo.pop("",None)
+        if todo:
+            if len(self._norm_cache)+len(todo)>NORM_CACHE_MAX: self._norm_cache.clear()
+            names=list(todo)
+            sims=np.zeros(len(names)); idx=np.zeros(len(names),dtype=np.int64)
+            if self._has_model(): sims,idx=self._nearest_batch(names)
+            # names the nearest-neighbour search can't place share one fuzzy score matrix
+            fallback=[n for n,sim in zip(names,sims.tolist()) if sim<NN_MIN_SIM]
+            fb_idx,fb_scores=self._fuzzy_best(fallback)
+            fuzzy={n:(i,sc) for n,i,sc in zip(fallback,fb_idx.tolist(),fb_scores.tolist())}
+            for name,sim,i in zip(names,sims.tolist(),idx.tolist()):
+                for raw in todo[name]:
+                    if sim>=NN_MIN_SIM:
+                        res={"input":raw,"canonical":self.vendor_list[i],"score":sim,"method":"nn"}
+                    else:
+                        res=self._fuzzy_result(raw,*fuzzy[name],fuzzy_threshold)
+                    self._norm_cache[(raw,fuzzy_threshold)]=res
+        none=lambda n: {"input":n,"canonical":None,"score":0.0,"method":"none"}
+        return [self._norm_cache.get((n,fuzzy_threshold)) or none(n) if isinstance(n,str) else none(n)
+                for n in raw_names]
@@ -1,6 +1,8 @@
 """
 Bulk Payroll Processing with tax calculations, journal posting, and template management.
 """
+import heapq
+import numpy as np
 import pandas as pd
 from typing import Dict, List, Any, Optional
 from datetime import datetime
@@ -35,25 +37,23 @@ class PayrollBulkProcessor:
         if not employees:
             return self.get_template()
         
-        # Create template rows
-        template_rows = []
-        for emp in employees:
-            template_rows.append({
-                'employee_id': emp['employee_id'],
-                'payroll_period': payroll_period,
-                'gross_salary': emp['basic_salary'] + emp.get('house_allowance', 0) + emp.get('transport_allowance', 0) + emp.get('other_allowances', 0),
-                'basic_salary': emp['basic_salary'],
-                'house_allowance': emp.get('house_allowance', 0),
-                'transport_allowance': emp.get('transport_allowance', 0),
-                'other_allowances': emp.get('other_allowances', 0),
-                'overtime_hours': 0.0,
-                'overtime_rate': 0.0,
-                'bonus': 0.0,
-                'days_worked': 22,  # Default working days
-                'days_in_month': 30  # Default days in month
-            })
+        # Build the template column-wise from the employee records
+        allowances = ['house_allowance', 'transport_allowance', 'other_allowances']
+        df = pd.DataFrame(employees).reindex(columns=['employee_id', 'basic_salary'] + allowances)
+        df[allowances] = df[allowances].fillna(0)
+        df['payroll_period'] = payroll_period
+        df['gross_salary'] = df[['basic_salary'] + allowances].sum(axis=1)
+        df['overtime_hours'] = 0.0
+        df['overtime_rate'] = 0.0
+        df['bonus'] = 0.0
+        df['days_worked'] = 22  # Default working days
+        df['days_in_month'] = 30  # Default days in month
         
-        return pd.DataFrame(template_rows)
+        return df[[
+            'employee_id', 'payroll_period', 'gross_salary', 'basic_salary',
+            'house_allowance', 'transport_allowance', 'other_allowances',
+            'overtime_hours', 'overtime_rate', 'bonus', 'days_worked', 'days_in_month'
+        ]]
     
     def bulk_process_payroll(
         self, 
@@ -101,22 +101,30 @@ class PayrollBulkProcessor:
                             'overtime_rate', 'bonus']
             for field in numeric_fields:
                 if field in df.columns:
-                    df[field] = pd.to_numeric(df[field], errors='coerce').fillna(0)
+                    df[field] = pd.to_numeric(df[field], errors='coerce')
+                    # blank gross is recomputed from its components below
+                    if field != 'gross_salary':
+                        df[field] = df[field].fillna(0)
             
             # Set defaults
             df['days_worked'] = pd.to_numeric(df.get('days_worked', 22), errors='coerce').fillna(22)
             df['days_in_month'] = pd.to_numeric(df.get('days_in_month', 30), errors='coerce').fillna(30)
             
-            # Calculate gross salary if not provided
-            if 'gross_salary' not in df.columns or df['gross_salary'].isna().any():
-                df['gross_salary'] = (
-                    df.get('basic_salary', 0) +
-                    df.get('house_allowance', 0) +
-                    df.get('transport_allowance', 0) +
-                    df.get('other_allowances', 0) +
-                    (df.get('overtime_hours', 0) * df.get('overtime_rate', 0)) +
-                    df.get('bonus', 0)
-                )
+            # Calculate gross salary where not provided
+            def col(name):
+                return df[name] if name in df.columns else 0
+            recomputed = (
+                col('basic_salary') +
+                col('house_allowance') +
+                col('transport_allowance') +
+                col('other_allowances') +
+                (col('overtime_hours') * col('overtime_rate')) +
+                col('bonus')
+            )
+            if 'gross_salary' in df.columns:
+                df['gross_salary'] = df['gross_salary'].where(df['gross_salary'].notna(), recomputed)
+            else:
+                df['gross_salary'] = recomputed
             
             # Pro-rate salary based on days worked
             df['prorated_gross'] = df['gross_salary'] * (df['days_worked'] / df['days_in_month'])
@@ -128,7 +136,8 @@ class PayrollBulkProcessor:
             file_path=file_path,
             mappings=mappings,
             mode='upsert',  # Always upsert for payroll to handle corrections
-            transform_fn=transform_payroll_data
+            transform_fn=transform_payroll_data,
+            return_records=True
         )
         
         if not upload_result.success:
@@ -139,13 +148,8 @@ class PayrollBulkProcessor:
                 'journal_posting_result': None
             }
         
-        # Load staged data
-        staging_file = self.upload_manager.staging_dir / f"{self.tenant_id}_payroll_lines_{upload_result.batch_id}.json"
-        with open(staging_file, 'r') as f:
-            import json
-            staged_data = json.load(f)
-        
-        payroll_data = staged_data['data']
+        # Staged rows come back in memory; the staging file is only an audit copy
+        payroll_data = upload_result.staged_records
         
         # Calculate taxes and deductions if requested
         if auto_calculate:
@@ -177,40 +181,45 @@ class PayrollBulkProcessor:
     def _calculate_payroll_taxes(self, payroll_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Calculate Kenya taxes and deductions for each payroll line."""
         
-        calculated_payroll = []
+        gross = np.fromiter((float(line.get('prorated_gross', 0)) for line in payroll_data),
+                            dtype=np.float64, count=len(payroll_data))
+        breakdown = self.payroll_calculator.payroll_breakdown_vec(gross)
         
-        for line in payroll_data:
-            gross = float(line.get('prorated_gross', 0))
-            
-            if gross > 0:
-                # Calculate Kenya taxes and deductions
-                breakdown = self.payroll_calculator.payroll_breakdown(gross)
-                
-                # Add calculated fields to payroll line
-                line.update({
-                    'calculated_gross': breakdown['Gross'],
-                    'paye_tax': breakdown['PAYE'],
-                    'nssf_deduction': breakdown['NSSF'],
-                    'nhif_deduction': breakdown['NHIF'],
-                    'total_deductions': breakdown['PAYE'] + breakdown['NSSF'] + breakdown['NHIF'],
-                    'net_pay': breakdown['Net'],
-                    'calculation_date': datetime.now().isoformat()
-                })
-            else:
-                # Zero gross salary
-                line.update({
-                    'calculated_gross': 0,
-                    'paye_tax': 0,
-                    'nssf_deduction': 0,
-                    'nhif_deduction': 0,
-                    'total_deductions': 0,
-                    'net_pay': 0,
-                    'calculation_date': datetime.now().isoformat()
-                })
-            
-            calculated_payroll.append(line)
+        # Zero (or negative) gross salary lines get all-zero figures
+        paid = gross > 0
+        cols = {
+            'calculated_gross': breakdown['Gross'],
+            'paye_tax': breakdown['PAYE'],
+            'nssf_deduction': breakdown['NSSF'],
+            'nhif_deduction': breakdown['NHIF'],
+            'total_deductions': breakdown['PAYE'] + breakdown['NSSF'] + breakdown['NHIF'],
+            'net_pay': breakdown['Net'],
+        }
+        cols = {k: np.where(paid, v, 0.0).tolist() for k, v in cols.items()}
+        calculation_date = datetime.now().isoformat()
+        
+        for i, line in enumerate(payroll_data):
+            line.update({k: v[i] for k, v in cols.items()})
+            line['calculation_date'] = calculation_date
+        
+        return payroll_data
+    
+    DETAIL_COLUMNS = {
+        'calculated_gross': 'gross',
+        'paye_tax': 'paye',
+        'nssf_deduction': 'nssf',
+        'nhif_deduction': 'nhif',
+        'net_pay': 'net'
+    }
+    
+    def _payroll_amounts(self, payroll_data: List[Dict[str, Any]]) -> pd.DataFrame:
+        """Calculated payroll amounts as a float frame, missing fields read as 0.
         
-        return calculated_payroll
+        Money stays float64: float32 carries ~7 significant digits, which
+        drops cents from monthly totals above ~100k KES.
+        """
+        df = pd.DataFrame(payroll_data, columns=list(self.DETAIL_COLUMNS), dtype=np.float64)
+        return df.fillna(0.0)
     
     def _generate_payroll_summary(self, payroll_data: List[Dict[str, Any]], period: str) -> Dict[str, Any]:
         """Generate comprehensive payroll summary."""
@@ -219,24 +228,20 @@ class PayrollBulkProcessor:
             return {'period': period, 'total_employees': 0}
         
         total_employees = len(payroll_data)
-        total_gross = sum(float(line.get('calculated_gross', 0)) for line in payroll_data)
-        total_paye = sum(float(line.get('paye_tax', 0)) for line in payroll_data)
-        total_nssf = sum(float(line.get('nssf_deduction', 0)) for line in payroll_data)
-        total_nhif = sum(float(line.get('nhif_deduction', 0)) for line in payroll_data)
+        amounts = self._payroll_amounts(payroll_data)
+        totals = amounts.sum().to_dict()
+        total_gross = totals['calculated_gross']
+        total_paye = totals['paye_tax']
+        total_nssf = totals['nssf_deduction']
+        total_nhif = totals['nhif_deduction']
         total_deductions = total_paye + total_nssf + total_nhif
         total_net = total_gross - total_deductions
         
         # Employee breakdown
-        employee_details = []
-        for line in payroll_data:
-            employee_details.append({
-                'employee_id': line.get('employee_id'),
-                'gross': float(line.get('calculated_gross', 0)),
-                'paye': float(line.get('paye_tax', 0)),
-                'nssf': float(line.get('nssf_deduction', 0)),
-                'nhif': float(line.get('nhif_deduction', 0)),
-                'net': float(line.get('net_pay', 0))
-            })
+        employee_details = [
+            {'employee_id': line.get('employee_id'), **amts}
+            for line, amts in zip(payroll_data, amounts.rename(columns=self.DETAIL_COLUMNS).to_dict('records'))
+        ]
         
         return {
             'period': period,
@@ -260,62 +265,40 @@ class PayrollBulkProcessor:
         """Post payroll journal entries to ledger."""
         
         # Calculate totals for journal entries
-        total_gross = sum(float(line.get('calculated_gross', 0)) for line in payroll_data)
-        total_paye = sum(float(line.get('paye_tax', 0)) for line in payroll_data)
-        total_nssf = sum(float(line.get('nssf_deduction', 0)) for line in payroll_data)
-        total_nhif = sum(float(line.get('nhif_deduction', 0)) for line in payroll_data)
+        totals = self._payroll_amounts(payroll_data).sum().to_dict()
+        total_gross = totals['calculated_gross']
+        total_paye = totals['paye_tax']
+        total_nssf = totals['nssf_deduction']
+        total_nhif = totals['nhif_deduction']
         total_net = total_gross - total_paye - total_nssf - total_nhif
         
         entries_posted = 0
         
         try:
-            # 1. Gross Salary Expense
-            if total_gross > 0:
-                self.ledger_posting.post_entry(
-                    date=datetime.now().strftime('%Y-%m-%d'),
-                    debit_acct='5100',  # Salaries Expense
-                    credit_acct='2100',  # Accrued Salaries
-                    amount=total_gross,
-                    description=f'Payroll expense for {period}',
-                    reference=f'PAYROLL-{period}'
-                )
-                entries_posted += 1
-            
-            # 2. PAYE Tax Liability
-            if total_paye > 0:
-                self.ledger_posting.post_entry(
-                    date=datetime.now().strftime('%Y-%m-%d'),
-                    debit_acct='2100',  # Accrued Salaries
-                    credit_acct='2200',  # PAYE Tax Payable
-                    amount=total_paye,
-                    description=f'PAYE tax withholding for {period}',
-                    reference=f'PAYE-{period}'
-                )
-                entries_posted += 1
-            
-            # 3. NSSF Liability
-            if total_nssf > 0:
-                self.ledger_posting.post_entry(
-                    date=datetime.now().strftime('%Y-%m-%d'),
-                    debit_acct='2100',  # Accrued Salaries
-                    credit_acct='2300',  # NSSF Payable
-                    amount=total_nssf,
-                    description=f'NSSF deduction for {period}',
-                    reference=f'NSSF-{period}'
-                )
-                entries_posted += 1
-            
-            # 4. NHIF Liability
-            if total_nhif > 0:
-                self.ledger_posting.post_entry(
-                    date=datetime.now().strftime('%Y-%m-%d'),
-                    debit_acct='2100',  # Accrued Salaries
-                    credit_acct='2400',  # NHIF Payable
-                    amount=total_nhif,
-                    description=f'NHIF deduction for {period}',
-                    reference=f'NHIF-{period}'
-                )
-                entries_posted += 1
+            today = datetime.now().strftime('%Y-%m-%d')
+            lines = [
+                # 1. Gross Salary Expense: Salaries Expense / Accrued Salaries
+                (total_gross, '5100', '2100', f'Payroll expense for {period}', f'PAYROLL-{period}'),
+                # 2. PAYE Tax Liability: Accrued Salaries / PAYE Tax Payable
+                (total_paye, '2100', '2200', f'PAYE tax withholding for {period}', f'PAYE-{period}'),
+                # 3. NSSF Liability: Accrued Salaries / NSSF Payable
+                (total_nssf, '2100', '2300', f'NSSF deduction for {period}', f'NSSF-{period}'),
+                # 4. NHIF Liability: Accrued Salaries / NHIF Payable
+                (total_nhif, '2100', '2400', f'NHIF deduction for {period}', f'NHIF-{period}'),
+            ]
+            entries = [
+                {
+                    'date': today,
+                    'debit_acct': debit,
+                    'credit_acct': credit,
+                    'amount': amount,
+                    'description': description,
+                    'ref': ref
+                }
+                for amount, debit, credit, description, ref in lines
+                if amount > 0
+            ]
+            entries_posted = len(self.ledger_posting.post_entries_bulk(entries))
             
             # 5. Net Pay (when actually paid)
             # Note: This would typically be posted separately when payment is made
@@ -347,12 +330,9 @@ class PayrollBulkProcessor:
     
     def get_payroll_runs(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent payroll runs."""
-        runs = self.repository.load_data()
-        
-        # Sort by period (newest first)
-        runs.sort(key=lambda x: x.get('payroll_period', ''), reverse=True)
-        
-        return runs[:limit]
+        # Newest periods first; only the top `limit` runs are ordered
+        return heapq.nlargest(limit, self.repository.load_data(copy=False),
+                              key=lambda x: x.get('payroll_period', ''))
     
     def get_payroll_run(self, period: str) -> Optional[Dict[str, Any]]:
         """Get specific payroll run by period."""
@@ -1,12 +1,46 @@
 
+import bisect
+import numpy as np
 from typing import List, Dict
 from ledger.core.config import settings
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except Exception:
+    NUMBA_AVAILABLE = False
+
+def _paye_ladder(gross, lowers, widths, rates, relief):
+    # same band walk as compute_paye, over the precomputed band arrays
+    tax = 0.0
+    for i in range(lowers.size):
+        if gross <= lowers[i] + widths[i]:
+            tax += (gross - lowers[i]) * rates[i]
+            break
+        tax += widths[i] * rates[i]
+    return max(0.0, tax - relief)
+
+if NUMBA_AVAILABLE:
+    # no fastmath: the top band's width is inf
+    _paye_ladder = njit(cache=True)(_paye_ladder)
+
 class PayrollEngine:
     def __init__(self, tenant_id: str):
         self.tenant_id = tenant_id
+        # band tables as arrays for the vectorised payroll run
+        uppers = np.array([b for b, _ in settings.PAYE_BANDS], dtype=np.float64)
+        self._paye_lowers = np.concatenate(([0.0], uppers[:-1]))
+        self._paye_widths = uppers - self._paye_lowers
+        self._paye_rates = np.array([r for _, r in settings.PAYE_BANDS], dtype=np.float64)
+        sha_uppers, sha_amounts = zip(*settings.SHA_RATES)
+        self._sha_bounds, self._sha_values = sha_uppers, sha_amounts
+        self._sha_uppers = np.array(sha_uppers, dtype=np.float64)
+        self._sha_amounts = np.array(sha_amounts, dtype=np.float64)
 
     def compute_paye(self, gross: float) -> float:
+        if NUMBA_AVAILABLE:
+            return float(_paye_ladder(float(gross), self._paye_lowers, self._paye_widths,
+                                      self._paye_rates, settings.PERSONAL_RELIEF_MONTHLY))
         taxable = gross
         tax = 0.0
         prev_band = 0.0
@@ -31,10 +65,22 @@ class PayrollEngine:
         return tier1 + tier2
 
     def compute_nhif(self, gross: float) -> float:
-        for upper, amt in settings.SHA_RATES:
-            if gross <= upper:
-                return amt
-        return settings.SHA_RATES[-1][1]
+        # first band whose upper bound is >= gross; bands are sorted ascending
+        idx = bisect.bisect_left(self._sha_bounds, gross)
+        return self._sha_values[min(idx, len(self._sha_values) - 1)]
+
+    def compute_paye_vec(self, gross: np.ndarray) -> np.ndarray:
+        per_band = np.clip(gross[:, None] - self._paye_lowers, 0.0, self._paye_widths) * self._paye_rates
+        return np.maximum(per_band.sum(axis=1) - settings.PERSONAL_RELIEF_MONTHLY, 0.0)
+
+    def compute_nssf_vec(self, gross: np.ndarray) -> np.ndarray:
+        tier1 = np.minimum(gross, settings.NSSF_TIER_1_UPPER)
+        tier2 = np.clip(gross, settings.NSSF_TIER_1_UPPER, settings.NSSF_TIER_2_UPPER) - settings.NSSF_TIER_1_UPPER
+        return (tier1 + tier2) * settings.NSSF_EMPLOYEE_RATE
+
+    def compute_nhif_vec(self, gross: np.ndarray) -> np.ndarray:
+        idx = np.searchsorted(self._sha_uppers, gross, side="left")
+        return self._sha_amounts[np.minimum(idx, len(self._sha_amounts) - 1)]
 
     def compute_net_pay(self, gross: float) -> Dict[str,float]:
         paye = self.compute_paye(gross)
@@ -51,11 +97,20 @@ class PayrollEngine:
         }
 
     def run_payroll(self, employees: List[Dict]) -> List[Dict]:
-        results = []
-        for e in employees:
-            gross = e.get("salary",0.0)
-            slip = self.compute_net_pay(gross)
-            slip["employee_id"] = e.get("id")
-            slip["name"] = f"{e.get('first_name','')} {e.get('last_name','')}"
-            results.append(slip)
-        return results
+        gross = np.asarray([e.get("salary",0.0) for e in employees], dtype=np.float64)
+        paye = self.compute_paye_vec(gross)
+        nssf = self.compute_nssf_vec(gross)
+        nhif = self.compute_nhif_vec(gross)
+        net = gross - (paye + nssf + nhif)
+        return [
+            {
+                "gross": e.get("salary",0.0),
+                "paye": round(float(p),2),
+                "nssf": round(float(s),2),
+                "nhif": round(float(h),2),
+                "net": round(float(n),2),
+                "employee_id": e.get("id"),
+                "name": f"{e.get('first_name','')} {e.get('last_name','')}",
+            }
+            for e, p, s, h, n in zip(employees, paye, nssf, nhif, net)
+        ]
@@ -1,15 +1,60 @@
 
-import json
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 
+import numpy as np
+import pandas as pd
+
+from ledger.core.utils import read_json, write_ndjson, iter_ndjson
 from ledger.ml.vendor_normalizer import VendorNormalizer
 
 DATA_DIR = Path(__file__).resolve().parents[2] / "data"
 RECON_DIR = DATA_DIR / "reconcile"
 RECON_DIR.mkdir(parents=True, exist_ok=True)
 
+def _as_datetime(val):
+    """Dates arrive as ISO strings from JSON staging and as datetimes from Parquet."""
+    if not val: return None
+    if isinstance(val, datetime): return val
+    return datetime.fromisoformat(val)
+
+def _to_datetimes(vals) -> pd.Series:
+    out=[]
+    for v in vals:
+        try: out.append(_as_datetime(v))
+        except (TypeError, ValueError): out.append(None)
+    return pd.Series(pd.to_datetime(out, errors="coerce"))
+
+def _frame(records: List[Dict[str, Any]], vendors) -> pd.DataFrame:
+    return pd.DataFrame({
+        "idx":np.arange(len(records)),
+        "amount":pd.to_numeric(pd.Series([r.get("amount") or 0 for r in records],dtype=object),errors="coerce").fillna(0.0).to_numpy(),
+        "date":_to_datetimes(r.get("date") for r in records),
+        "vendor":pd.Series(vendors,dtype=object).str.lower(),
+    }).dropna(subset=["date"])
+
+def recon_path(tenant_id: str) -> Path:
+    return RECON_DIR / f"{tenant_id}_recon.ndjson"
+
+def latest_recon(tenant_id: str) -> Optional[Path]:
+    """The tenant's newest reconciliation report: NDJSON, or a legacy .json one."""
+    candidates = [f for f in (recon_path(tenant_id), RECON_DIR / f"{tenant_id}_recon.json") if f.exists()]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda p: p.stat().st_mtime_ns)
+
+def load_recon(path: Path) -> Dict[str, Any]:
+    """Read a reconciliation report: NDJSON (header line, then one result per
+    line) or a legacy single-document .json report."""
+    path = Path(path)
+    if path.suffix == ".json":
+        return read_json(path)
+    rows = iter_ndjson(path)
+    header = next(rows, {})
+    matches = list(rows)
+    return {**header, "matches": matches, "unmatched": [r for r in matches if not r["match"]]}
+
 class ReconciliationEngine:
     """
     Match ingested staging data against tenant ledger transactions.
@@ -20,53 +65,65 @@ class ReconciliationEngine:
         self.vn = VendorNormalizer(tenant_id)
 
     def load_staging(self) -> List[Dict[str, Any]]:
-        f = DATA_DIR / "staging" / f"{self.tenant_id}_staging.json"
-        if f.exists():
-            return json.load(open(f))
-        return []
+        # connectors stage Parquet, the ingestion parser JSON: use whichever is newer
+        candidates = [f for f in (DATA_DIR / "staging" / f"{self.tenant_id}_staging.parquet",
+                                  DATA_DIR / "staging" / f"{self.tenant_id}_staging.json") if f.exists()]
+        if not candidates:
+            return []
+        f = max(candidates, key=lambda p: p.stat().st_mtime_ns)
+        if f.suffix == ".parquet":
+            import pyarrow.parquet as pq
+            return pq.read_table(f).to_pylist()
+        return read_json(f)
 
     def load_transactions(self) -> List[Dict[str, Any]]:
         f = DATA_DIR / "transactions" / f"{self.tenant_id}_transactions.json"
         if f.exists():
-            return json.load(open(f))
+            return read_json(f)
         return []
 
+    def _candidate_pairs(self, staging, ledger, date_tolerance_days: int, amount_tolerance: float) -> pd.DataFrame:
+        """(staging, ledger) index pairs within tolerance, best candidates first."""
+        stg=_frame(staging,[r.get("vendor_normalized") for r in staging])
+        led=_frame(ledger,[t.get("vendor") for t in ledger])
+        # Hash-join on calendar day. A floored day difference within the
+        # tolerance always lies within one extra day of bucket offset.
+        offsets=np.arange(-date_tolerance_days-1,date_tolerance_days+2)
+        stg=stg.loc[stg.index.repeat(len(offsets))]
+        stg["day"]=stg["date"].dt.floor("D")+pd.to_timedelta(np.tile(offsets,len(stg)//len(offsets)),unit="D")
+        led["day"]=led["date"].dt.floor("D")
+        pairs=stg.merge(led,on="day",suffixes=("_s","_l"))
+        day_gap=(pairs["date_s"]-pairs["date_l"])//pd.Timedelta(days=1)
+        pairs=pairs[(day_gap.abs()<=date_tolerance_days)&((pairs["amount_s"]-pairs["amount_l"]).abs()<=amount_tolerance)]
+        pairs=pairs.assign(vendor_ok=pairs["vendor_s"].notna()&(pairs["vendor_s"]==pairs["vendor_l"]))
+        # per staging row: vendor matches first, then ledger order
+        return pairs.sort_values(["idx_s","vendor_ok","idx_l"],ascending=[True,False,True])[["idx_s","idx_l","vendor_ok"]]
+
     def reconcile(self, date_tolerance_days: int = 2, amount_tolerance: float = 5.0) -> Dict[str, Any]:
         staging = self.load_staging()
         ledger = self.load_transactions()
-        results = []
-        ledger_used=set()
-        for rec in staging:
-            match=None; reason=[]
-            # normalize vendor
-            if rec.get("vendor"):
-                try:
-                    norm=self.vn.normalize(rec["vendor"])
-                    rec["vendor_normalized"]=norm["canonical"]
-                except: rec["vendor_normalized"]=rec["vendor"]
-
-            for i,txn in enumerate(ledger):
-                if i in ledger_used: continue
-                # match amount
-                amt_ok = abs((rec.get("amount") or 0) - (txn.get("amount") or 0)) <= amount_tolerance
-                # match date
-                try:
-                    d1=datetime.fromisoformat(rec.get("date")) if rec.get("date") else None
-                    d2=datetime.fromisoformat(txn.get("date")) if txn.get("date") else None
-                except: d1=d2=None
-                date_ok = (d1 and d2 and abs((d1-d2).days) <= date_tolerance_days)
-                # match vendor
-                vendor_ok = (rec.get("vendor_normalized") and txn.get("vendor") and rec["vendor_normalized"].lower()==txn["vendor"].lower())
-                if amt_ok and date_ok and vendor_ok:
-                    match=txn; ledger_used.add(i)
-                    reason=["amount","date","vendor"]
-                    break
-                elif amt_ok and date_ok:
-                    match=txn; ledger_used.add(i)
-                    reason=["amount","date"]
-                    break
+        # normalize vendors
+        with_vendor=[rec for rec in staging if rec.get("vendor")]
+        try:
+            norms=self.vn.normalize_batch([rec["vendor"] for rec in with_vendor])
+            for rec,norm in zip(with_vendor,norms): rec["vendor_normalized"]=norm["canonical"]
+        except Exception:
+            for rec in with_vendor: rec["vendor_normalized"]=rec["vendor"]
+
+        matched: Dict[int, tuple] = {}
+        if staging and ledger:
+            ledger_used=set()
+            pairs=self._candidate_pairs(staging,ledger,date_tolerance_days,amount_tolerance)
+            for s,l,vendor_ok in zip(pairs["idx_s"].tolist(),pairs["idx_l"].tolist(),pairs["vendor_ok"].tolist()):
+                if s in matched or l in ledger_used: continue
+                ledger_used.add(l)
+                matched[s]=(ledger[l],["amount","date","vendor"] if vendor_ok else ["amount","date"])
+        results=[]
+        for i,rec in enumerate(staging):
+            match,reason=matched.get(i,(None,[]))
             results.append({"staging":rec,"match":match,"reason":reason})
         report={"tenant_id":self.tenant_id,"matches":results,"unmatched":[r for r in results if not r["match"]]}
-        out=RECON_DIR/f"{self.tenant_id}_recon.json"
-        with open(out,"w",encoding="utf-8") as f: json.dump(report,f,indent=2)
+        # header line then one result per line; see load_recon
+        header={"tenant_id":self.tenant_id,"count":len(results),"unmatched_count":len(report["unmatched"])}
+        write_ndjson(recon_path(self.tenant_id),[header,*results])
         return report
@@ -7,41 +7,62 @@ import pandas as pd
 from ledger.ledger.posting import CHART_OF_ACCOUNTS, LedgerPosting
 
 DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+JOURNAL_COLUMNS = ("date","debit_acct","credit_acct","amount")
 
 class FinancialReports:
     def __init__(self, tenant_id: str):
         self.tenant_id = tenant_id
         self.lp = LedgerPosting(tenant_id)
+        self._totals_cache=None
 
     def load_journal_df(self) -> pd.DataFrame:
         journal = self.lp.load_journal()
-        if not journal: return pd.DataFrame(columns=["date","debit_acct","credit_acct","amount"])
-        return pd.DataFrame(journal)
+        if not journal: return pd.DataFrame(columns=list(JOURNAL_COLUMNS))
+        # only the columns the reports use, built column-wise from the entries
+        df = pd.DataFrame({c:[e.get(c) for e in journal] for c in JOURNAL_COLUMNS})
+        for c in ("debit_acct","credit_acct"): df[c] = df[c].astype("category")
+        df["amount"] = pd.to_numeric(df["amount"])
+        return df
 
-    def trial_balance(self) -> pd.DataFrame:
+    def _account_totals(self) -> pd.DataFrame:
+        """Debit/Credit totals indexed by account code (as str)."""
         df=self.load_journal_df()
-        if df.empty: return pd.DataFrame(columns=["Account","Debit","Credit"])
-        tb={}
-        for _,row in df.iterrows():
-            tb.setdefault(row["debit_acct"],{"debit":0.0,"credit":0.0})
-            tb[row["debit_acct"]]["debit"]+=row["amount"]
-            tb.setdefault(row["credit_acct"],{"debit":0.0,"credit":0.0})
-            tb[row["credit_acct"]]["credit"]+=row["amount"]
-        rows=[]
-        for acct,vals in tb.items():
-            rows.append({"Account":f"{acct} {CHART_OF_ACCOUNTS.get(acct,'Unknown')}",
-                         "Debit":vals["debit"],"Credit":vals["credit"]})
-        return pd.DataFrame(rows)
+        if df.empty: return pd.DataFrame({"Debit":[],"Credit":[]},index=pd.Index([],dtype=str))
+        debit=df.groupby("debit_acct",sort=False,observed=True)["amount"].sum().rename("Debit")
+        credit=df.groupby("credit_acct",sort=False,observed=True)["amount"].sum().rename("Credit")
+        tb=pd.concat([debit,credit],axis=1).fillna(0.0)
+        tb.index=tb.index.astype(str)
+        return tb
+
+    def trial_balance(self) -> pd.DataFrame:
+        tb=self._account_totals()
+        if tb.empty: return pd.DataFrame(columns=["Account","Debit","Credit"])
+        acct=tb.index.to_series()
+        tb["Account"]=acct+" "+acct.map(CHART_OF_ACCOUNTS).fillna("Unknown")
+        return tb[["Account","Debit","Credit"]].reset_index(drop=True)
+
+    def _account_net(self) -> pd.Series:
+        """Net debit balance per account code, cached on journal mtime."""
+        st=self.lp.file.stat()
+        key=(st.st_mtime_ns,st.st_size)
+        if self._totals_cache is None or self._totals_cache[0]!=key:
+            tb=self._account_totals()
+            self._totals_cache=(key,tb["Debit"]-tb["Credit"])
+        return self._totals_cache[1]
+
+    def _net(self, prefix: str) -> float:
+        """Net debit balance over the accounts whose code starts with prefix."""
+        net=self._account_net()
+        return float(net[net.index.str.startswith(prefix)].sum())
 
     def balance_sheet(self) -> Dict[str,Any]:
-        tb=self.trial_balance()
-        assets=tb[tb["Account"].str.startswith("1000")]["Debit"].sum()-tb[tb["Account"].str.startswith("1000")]["Credit"].sum()
-        liabs=tb[tb["Account"].str.startswith("2")]["Credit"].sum()-tb[tb["Account"].str.startswith("2")]["Debit"].sum()
-        equity=tb[tb["Account"].str.startswith("3")]["Credit"].sum()-tb[tb["Account"].str.startswith("3")]["Debit"].sum()
+        # Assets is the cash/bank account (1000...), not the whole 1xxx class
+        assets=self._net("1000")
+        liabs=0.0-self._net("2")
+        equity=0.0-self._net("3")
         return {"Assets":assets,"Liabilities":liabs,"Equity":equity,"Balanced":round(assets,2)==round(liabs+equity,2)}
 
     def profit_and_loss(self) -> Dict[str,float]:
-        tb=self.trial_balance()
-        revenue=tb[tb["Account"].str.startswith("4")]["Credit"].sum()-tb[tb["Account"].str.startswith("4")]["Debit"].sum()
-        expenses=tb[tb["Account"].str.startswith("5")]["Debit"].sum()-tb[tb["Account"].str.startswith("5")]["Credit"].sum()
+        revenue=0.0-self._net("4")
+        expenses=self._net("5")
         return {"Revenue":revenue,"Expenses":expenses,"NetIncome":revenue-expenses}
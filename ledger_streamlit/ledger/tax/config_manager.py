@@ -2,10 +2,12 @@
 Tax Configuration Management with bulk upload and versioning.
 """
 import pandas as pd
-from typing import Dict, List, Any, Optional
+from bisect import bisect_right
+from collections import Counter
+from typing import Dict, List, Any, Optional, Iterable
 from datetime import datetime
 
-from ..core.upload_manager import UploadManager, ColumnMapping, UploadResult
+from ..core.upload_manager import UploadManager, ColumnMapping, UploadResult, UPLOAD_BATCH_ROWS
 from ..core.repositories import BaseRepository
 
 class TaxConfigRepository(BaseRepository):
@@ -13,39 +15,60 @@ class TaxConfigRepository(BaseRepository):
     
     def __init__(self, tenant_id: str):
         super().__init__(tenant_id, "tax_configs")
+        # key_field -> {key_value: (sorted effective dates, records)}, tied to the file stamp
+        self._key_index: Dict[str, Dict[Any, tuple]] = {}
+        self._key_index_stamp = None
     
-    def bulk_upsert(self, records: List[Dict[str, Any]], key_field: str = "config_key") -> Dict[str, int]:
+    def save_data(self, data: List[Dict[str, Any]], create_backup: bool = True) -> bool:
+        self._key_index.clear()
+        return super().save_data(data, create_backup)
+    
+    def _index_for(self, key_field: str) -> Dict[Any, tuple]:
+        """Per-key configs sorted by effective_date, rebuilt when the data file changes."""
+        stamp = self.file_stamp()
+        if stamp != self._key_index_stamp:
+            self._key_index.clear()
+            self._key_index_stamp = stamp
+        index = self._key_index.get(key_field)
+        if index is None:
+            grouped: Dict[Any, List[Dict[str, Any]]] = {}
+            # Reversed so that, after a stable sort, the first record on a tied date sorts last
+            for r in reversed(self.load_data(copy=False)):
+                grouped.setdefault(r.get(key_field), []).append(r)
+            index = {}
+            for key_value, configs in grouped.items():
+                configs.sort(key=lambda x: x.get('effective_date', ''))
+                index[key_value] = ([c.get('effective_date', '') for c in configs], configs)
+            self._key_index[key_field] = index
+        return index
+    
+    def bulk_upsert(self, records: Iterable[Dict[str, Any]], key_field: str = "config_key") -> Dict[str, int]:
         """Bulk upsert tax configs with versioning."""
+        # Matching configs are updated in place below, so work on copies
         current_data = self.load_data()
         
-        # Group existing by config_key
-        existing_map = {}
-        for record in current_data:
-            key = record.get(key_field)
-            if key:
-                if key not in existing_map:
-                    existing_map[key] = []
-                existing_map[key].append(record)
+        # Index existing configs by (config_key, effective_date); first one wins
+        existing_configs = [r for r in current_data if r.get(key_field)]
+        existing_index = {}
+        for config in existing_configs:
+            existing_index.setdefault((config.get(key_field), config.get('effective_date')), config)
+        versions_count = Counter(config.get(key_field) for config in existing_configs)
         
         created = updated = 0
-        new_configs = []
+        now = datetime.now()
+        now_iso = now.isoformat()
+        today = now.strftime('%Y-%m-%d')
         
         for record in records:
             key_value = record.get(key_field)
             if not key_value:
                 continue
             
-            record['last_updated'] = datetime.now().isoformat()
-            effective_date = record.get('effective_date', datetime.now().strftime('%Y-%m-%d'))
+            record['last_updated'] = now_iso
+            effective_date = record.get('effective_date', today)
             
             # Check if this exact config already exists
-            existing_configs = existing_map.get(key_value, [])
-            existing_config = None
-            
-            for config in existing_configs:
-                if config.get('effective_date') == effective_date:
-                    existing_config = config
-                    break
+            existing_config = existing_index.get((key_value, effective_date))
             
             if existing_config:
                 # Update existing config
@@ -53,38 +76,33 @@ class TaxConfigRepository(BaseRepository):
                 updated += 1
             else:
                 # Create new version
-                record['created_at'] = datetime.now().isoformat()
-                record['version'] = len(existing_configs) + 1
-                new_configs.append(record)
+                record['created_at'] = now_iso
+                record['version'] = versions_count[key_value] + 1
+                # New versions go on the end of the list being saved; the index
+                # and version counts above only cover what was already stored
+                existing_configs.append(record)
                 created += 1
         
-        # Combine existing and new configs
-        all_configs = []
-        for configs_list in existing_map.values():
-            all_configs.extend(configs_list)
-        all_configs.extend(new_configs)
-        
         # Save updated data
-        self.save_data(all_configs)
+        self.save_data(existing_configs)
         
-        return {"created": created, "updated": updated, "total": len(all_configs)}
+        return {"created": created, "updated": updated, "total": len(existing_configs)}
     
     def find_by_key(self, key_field: str, key_value: Any, effective_date: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Find tax config by key field and effective date."""
-        data = self.load_data()
-        configs = [r for r in data if r.get(key_field) == key_value]
-        
-        if not configs:
+        entry = self._index_for(key_field).get(key_value)
+        if not entry:
             return None
+        dates, configs = entry
         
         if effective_date:
             # Find config effective for specific date
-            valid_configs = [c for c in configs if c.get('effective_date', '') <= effective_date]
-            if valid_configs:
-                return max(valid_configs, key=lambda x: x.get('effective_date', ''))
+            i = bisect_right(dates, effective_date) - 1
+            if i >= 0:
+                return configs[i]
         
         # Return latest config
-        return max(configs, key=lambda x: x.get('effective_date', ''))
+        return configs[-1]
 
 class TaxConfigManager:
     """Tax configuration management with bulk operations and versioning."""
@@ -173,7 +191,8 @@ class TaxConfigManager:
             file_path=file_path,
             mappings=mappings,
             mode=mode,
-            transform_fn=transform_tax_config_data
+            transform_fn=transform_tax_config_data,
+            batch_size=UPLOAD_BATCH_ROWS
         )
         
         if not upload_result.success:
@@ -183,16 +202,10 @@ class TaxConfigManager:
                 'config_stats': None
             }
         
-        # Load staged data and commit to repository
-        staging_file = self.upload_manager.staging_dir / f"{self.tenant_id}_tax_configs_{upload_result.batch_id}.json"
-        with open(staging_file, 'r') as f:
-            import json
-            staged_data = json.load(f)
-        
-        configs_data = staged_data['data']
-        
-        # Bulk upsert to repository
-        repo_result = self.repository.bulk_upsert(configs_data)
+        # Stream staged data into the repository
+        repo_result = self.repository.bulk_upsert(
+            self.upload_manager.iter_staged_records(upload_result.batch_id)
+        )
         
         return {
             'success': True,
@@ -203,7 +216,7 @@ class TaxConfigManager:
     
     def get_config_stats(self) -> Dict[str, Any]:
         """Get tax configuration statistics."""
-        configs = self.repository.load_data()
+        configs = self.repository.load_data(copy=False)
         
         if not configs:
             return {
@@ -213,13 +226,14 @@ class TaxConfigManager:
                 'latest_version': {}
             }
         
-        active_configs = [c for c in configs if c.get('is_active', True)]
-        
-        # Group by config key
+        # Active count, per-key counts and latest version in one pass
+        active_count = 0
         by_key = {}
         latest_version = {}
         
         for config in configs:
+            if config.get('is_active', True):
+                active_count += 1
             key = config.get('config_key', 'unknown')
             by_key[key] = by_key.get(key, 0) + 1
             
@@ -229,7 +243,7 @@ class TaxConfigManager:
         
         return {
             'total_configs': len(configs),
-            'active_configs': len(active_configs),
+            'active_configs': active_count,
             'by_key': by_key,
             'latest_version': latest_version,
             'unique_keys': len(by_key)
@@ -244,7 +258,7 @@ class TaxConfigManager:
     
     def export_configs(self, file_path: str, active_only: bool = False) -> bool:
         """Export tax configurations to Excel file."""
-        configs = self.repository.load_data()
+        configs = self.repository.load_data(copy=False)
         
         if active_only:
             configs = [c for c in configs if c.get('is_active', True)]
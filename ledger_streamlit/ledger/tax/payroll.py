@@ -1,5 +1,14 @@
 
-from typing import Dict
+import bisect
+import numpy as np
+from functools import lru_cache
+from typing import Dict, Tuple
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE=True
+except Exception:
+    NUMBA_AVAILABLE=False
 
 # PAYE Bands (Kenya 2025 monthly, KES)
 PAYE_BANDS = [
@@ -38,7 +47,48 @@ NHIF_BANDS = [
 
 VAT_RATE = 0.16
 
+# Band tables as arrays for the *_batch methods
+_PAYE_LIMITS = np.array([l for l,_ in PAYE_BANDS])
+_PAYE_LOWERS = np.concatenate(([0.0], _PAYE_LIMITS[:-1]))
+_PAYE_WIDTHS = _PAYE_LIMITS - _PAYE_LOWERS
+_PAYE_RATES = np.array([r for _,r in PAYE_BANDS])
+# finite upper bounds; bisect past the last one lands on the open top band
+_NHIF_BOUNDS = tuple(l for l,_ in NHIF_BANDS[:-1])
+_NHIF_AMOUNTS = tuple(c for _,c in NHIF_BANDS)
+_NHIF_LIMITS = np.array([l for l,_ in NHIF_BANDS])
+_NHIF_CONTRIBS = np.array([c for _,c in NHIF_BANDS], dtype=np.float64)
+
+def _round_cents(x: np.ndarray) -> np.ndarray:
+    # np.round scales by 100 before rounding, so values at a half cent can land
+    # on the other side of Python's round(x, 2); settle those few the scalar way
+    out=np.round(x,2)
+    scaled=x*100
+    tie=np.abs(scaled-np.floor(scaled)-0.5)<1e-6
+    if tie.any():
+        out[tie]=[round(v,2) for v in x[tie].tolist()]
+    return out
+
+def _paye_kernel(gross, lowers, widths, rates):
+    # per-employee band walk; unrounded, compute_paye_batch rounds
+    out=np.empty(gross.size)
+    for i in prange(gross.size):
+        tax=0.0
+        for b in range(lowers.size):
+            band=min(gross[i]-lowers[b],widths[b])
+            if band<=0.0: break
+            tax+=band*rates[b]
+        out[i]=tax
+    return out
+
+if NUMBA_AVAILABLE:
+    # no fastmath: the top band's width is inf
+    _paye_kernel=njit(cache=True,parallel=True)(_paye_kernel)
+
 class KenyanPayroll:
+    def __init__(self):
+        # a payroll run repeats the same few pay grades; memoise per gross
+        self._deductions=lru_cache(maxsize=8192)(self._compute_deductions)
+
     def compute_paye(self, gross: float) -> float:
         tax=0; remaining=gross
         prev_limit=0
@@ -58,18 +108,48 @@ class KenyanPayroll:
         return round(tier1+tier2,2)
 
     def compute_nhif(self, gross: float) -> float:
-        for limit,contrib in NHIF_BANDS:
-            if gross<=limit: return contrib
-        return NHIF_BANDS[-1][1]
+        return _NHIF_AMOUNTS[bisect.bisect_left(_NHIF_BOUNDS,gross)]
+
+    def _compute_deductions(self, gross: float) -> Tuple[float,float,float]:
+        return self.compute_paye(gross),self.compute_nssf(gross),self.compute_nhif(gross)
 
     def payroll_breakdown(self, gross: float) -> Dict[str,float]:
-        paye=self.compute_paye(gross)
-        nssf=self.compute_nssf(gross)
-        nhif=self.compute_nhif(gross)
+        paye,nssf,nhif=self._deductions(gross)
         deductions=paye+nssf+nhif
         net=gross-deductions
         return {"Gross":gross,"PAYE":paye,"NSSF":nssf,"NHIF":nhif,"Net":net}
 
+    def payroll_breakdown_vec(self, gross: np.ndarray) -> Dict[str,np.ndarray]:
+        """Column-wise payroll_breakdown for an array of gross salaries."""
+        gross=np.asarray(gross,dtype=np.float64)
+        # evaluate each distinct salary once and scatter back
+        uniq,inverse=np.unique(gross,return_inverse=True)
+        if len(uniq)<len(gross):
+            out=self.payroll_breakdown_vec(uniq)
+            return {k:(gross if k=="Gross" else v[inverse]) for k,v in out.items()}
+        paye=self.compute_paye_batch(gross)
+        nssf=self.compute_nssf_batch(gross)
+        nhif=self.compute_nhif_batch(gross)
+        return {"Gross":gross,"PAYE":paye,"NSSF":nssf,"NHIF":nhif,"Net":gross-(paye+nssf+nhif)}
+
+    def compute_paye_batch(self, gross: np.ndarray) -> np.ndarray:
+        gross=np.asarray(gross,dtype=np.float64)
+        if NUMBA_AVAILABLE:
+            return _round_cents(_paye_kernel(np.ascontiguousarray(gross.ravel()),_PAYE_LOWERS,_PAYE_WIDTHS,_PAYE_RATES)).reshape(gross.shape)
+        return _round_cents((np.clip(gross[:,None]-_PAYE_LOWERS,0.0,_PAYE_WIDTHS)*_PAYE_RATES).sum(axis=1))
+
+    def compute_nssf_batch(self, gross: np.ndarray) -> np.ndarray:
+        gross=np.asarray(gross,dtype=np.float64)
+        # each tier is charged before summing, as in compute_nssf, so the
+        # float sums match the scalar path
+        tier1=np.minimum(gross,NSSF_TIER1_LIMIT)*NSSF_RATE
+        tier2=np.clip(gross-NSSF_TIER1_LIMIT,0.0,NSSF_TIER2_LIMIT-NSSF_TIER1_LIMIT)*NSSF_RATE
+        return _round_cents(tier1+tier2)
+
+    def compute_nhif_batch(self, gross: np.ndarray) -> np.ndarray:
+        idx=np.searchsorted(_NHIF_LIMITS,np.asarray(gross,dtype=np.float64),side="left")
+        return _NHIF_CONTRIBS[np.minimum(idx,len(_NHIF_CONTRIBS)-1)]
+
 class KenyanVAT:
     def compute_vat(self, amount: float, rate: float=VAT_RATE) -> float:
         return round(amount*rate,2)
@@ -1,15 +1,40 @@
 """
 Transaction Management with bulk upload, reconciliation integration, and journal posting.
 """
+import heapq
 import pandas as pd
+from collections import Counter
+from pathlib import Path
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
-from ..core.upload_manager import UploadManager, ColumnMapping, UploadResult
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE=True
+except ImportError:
+    PARQUET_AVAILABLE=False
+
+from ..core.upload_manager import UploadManager, ColumnMapping, UploadResult, UPLOAD_BATCH_ROWS
 from ..core.repositories import TransactionsRepository
 from ..reconcile.engine import ReconciliationEngine
 from ..ledger.posting import LedgerPosting
 
+# (category keyword, description keyword, (debit, credit)), checked in order
+_ACCOUNT_RULES = (
+    ('office', 'office', ('5200', '1000')),    # Office Expenses -> Cash
+    ('travel', 'travel', ('5300', '1000')),    # Travel Expenses -> Cash
+    ('salary', 'payroll', ('5100', '1000')),   # Salaries -> Cash
+    ('rent', 'rent', ('5400', '1000')),        # Rent -> Cash
+    ('sale', 'revenue', ('1000', '4000')),     # Cash -> Sales Revenue
+)
+
+# Fields matched by the search_transactions text query
+_SEARCH_FIELDS = ('description', 'vendor', 'reference', 'transaction_id')
+
+EXPORT_ROW_GROUP_SIZE = 50_000
+
 class TransactionManager:
     """Comprehensive transaction management with bulk operations and reconciliation."""
     
@@ -19,6 +44,9 @@ class TransactionManager:
         self.upload_manager = UploadManager(tenant_id, 'transactions')
         self.reconcile_engine = ReconciliationEngine(tenant_id)
         self.ledger_posting = LedgerPosting(tenant_id)
+        # Lower-cased search text per stored transaction, tied to the repository file stamp
+        self._search_blobs: List[str] = []
+        self._search_blobs_stamp = None
     
     def get_template(self) -> pd.DataFrame:
         """Get transaction upload template."""
@@ -70,9 +98,14 @@ class TransactionManager:
             
             if 'net_amount' in df.columns:
                 df['net_amount'] = pd.to_numeric(df['net_amount'], errors='coerce')
-            else:
+            elif 'amount' in df.columns:
                 # Calculate net amount if not provided
-                df['net_amount'] = df.get('amount', 0) - df.get('tax_amount', 0)
+                net = df['amount'].to_numpy(dtype=float)
+                if 'tax_amount' in df.columns:
+                    net = net - df['tax_amount'].to_numpy(dtype=float)
+                df['net_amount'] = net
+            else:
+                df['net_amount'] = 0 - df['tax_amount'] if 'tax_amount' in df.columns else 0
             
             # Standardize dates
             if 'date' in df.columns:
@@ -80,9 +113,14 @@ class TransactionManager:
                 df['date'] = df['date'].dt.strftime('%Y-%m-%d')
             
             # Set defaults
-            df['currency'] = df.get('currency', 'KES')
-            df['exchange_rate'] = pd.to_numeric(df.get('exchange_rate', 1.0), errors='coerce').fillna(1.0)
-            df['status'] = df.get('status', 'pending')
+            if 'currency' not in df.columns:
+                df['currency'] = 'KES'
+            if 'exchange_rate' in df.columns:
+                df['exchange_rate'] = pd.to_numeric(df['exchange_rate'], errors='coerce').fillna(1.0)
+            else:
+                df['exchange_rate'] = 1.0
+            if 'status' not in df.columns:
+                df['status'] = 'pending'
             
             # Clean description
             if 'description' in df.columns:
@@ -95,7 +133,8 @@ class TransactionManager:
             file_path=file_path,
             mappings=mappings,
             mode=mode,
-            transform_fn=transform_transaction_data
+            transform_fn=transform_transaction_data,
+            batch_size=UPLOAD_BATCH_ROWS
         )
         
         if not upload_result.success:
@@ -107,13 +146,10 @@ class TransactionManager:
                 'posting_result': None
             }
         
-        # Load staged data and commit to repository
-        staging_file = self.upload_manager.staging_dir / f"{self.tenant_id}_transactions_{upload_result.batch_id}.json"
-        with open(staging_file, 'r') as f:
-            import json
-            staged_data = json.load(f)
-        
-        transactions_data = staged_data['data']
+        # Stream staged data into the repository; auto-post needs the rows again
+        transactions_data = self.upload_manager.iter_staged_records(upload_result.batch_id)
+        if auto_post:
+            transactions_data = list(transactions_data)
         
         # Bulk upsert to repository
         repo_result = self.repository.bulk_upsert(transactions_data)
@@ -150,6 +186,7 @@ class TransactionManager:
         posted_count = 0
         failed_count = 0
         errors = []
+        entries = []
         
         for txn in transactions:
             try:
@@ -157,16 +194,14 @@ class TransactionManager:
                 debit_acct, credit_acct = self._determine_accounts(txn)
                 
                 if debit_acct and credit_acct:
-                    # Post to ledger
-                    self.ledger_posting.post_entry(
-                        date=txn.get('date'),
-                        debit_acct=debit_acct,
-                        credit_acct=credit_acct,
-                        amount=float(txn.get('amount', 0)),
-                        description=txn.get('description', ''),
-                        reference=txn.get('reference', '')
-                    )
-                    posted_count += 1
+                    entries.append({
+                        'date': txn.get('date'),
+                        'debit_acct': debit_acct,
+                        'credit_acct': credit_acct,
+                        'amount': float(txn.get('amount', 0)),
+                        'description': txn.get('description', ''),
+                        'ref': txn.get('reference', '')
+                    })
                 else:
                     failed_count += 1
                     errors.append(f"Could not determine accounts for transaction: {txn.get('description', 'Unknown')}")
@@ -175,6 +210,15 @@ class TransactionManager:
                 failed_count += 1
                 errors.append(f"Error posting transaction {txn.get('transaction_id', 'Unknown')}: {str(e)}")
         
+        # Post to ledger: one journal write for the batch (the journal is a single JSON file)
+        if entries:
+            try:
+                self.ledger_posting.post_entries_bulk(entries)
+                posted_count = len(entries)
+            except Exception as e:
+                failed_count += len(entries)
+                errors.append(f"Error writing journal: {str(e)}")
+        
         return {
             'posted_count': posted_count,
             'failed_count': failed_count,
@@ -200,15 +244,11 @@ class TransactionManager:
                 return account_code, '1000'  # Revenue/Asset -> Cash
         
         # Smart mapping based on category and description
-        if 'office' in category or 'office' in description:
-            return '5200', '1000'  # Office Expenses -> Cash
-        elif 'travel' in category or 'travel' in description:
-            return '5300', '1000'  # Travel Expenses -> Cash
-        elif 'salary' in category or 'payroll' in description:
-            return '5100', '1000'  # Salaries -> Cash
-        elif 'rent' in category or 'rent' in description:
-            return '5400', '1000'  # Rent -> Cash
-        elif 'sale' in category or 'revenue' in description or amount > 0:
+        for category_kw, description_kw, accounts in _ACCOUNT_RULES:
+            if category_kw in category or description_kw in description:
+                return accounts
+        
+        if amount > 0:
             return '1000', '4000'  # Cash -> Sales Revenue
         elif amount < 0:  # General expense
             return '5000', '1000'  # General Expenses -> Cash
@@ -217,9 +257,12 @@ class TransactionManager:
     
     def get_transaction_stats(self) -> Dict[str, Any]:
         """Get transaction statistics and analytics."""
-        transactions = self.repository.load_data()
+        columns = self.repository.load_columns(
+            {'status': 'unknown', 'category': 'uncategorized', 'currency': 'KES', 'amount': None}
+        )
+        currencies = columns['currency']
         
-        if not transactions:
+        if not currencies:
             return {
                 'total_transactions': 0,
                 'by_status': {},
@@ -229,40 +272,17 @@ class TransactionManager:
                 'average_amount': 0
             }
         
-        # Status breakdown
-        status_counts = {}
-        for txn in transactions:
-            status = txn.get('status', 'unknown')
-            status_counts[status] = status_counts.get(status, 0) + 1
-        
-        # Category breakdown
-        category_counts = {}
-        for txn in transactions:
-            category = txn.get('category', 'uncategorized')
-            if category:
-                category_counts[category] = category_counts.get(category, 0) + 1
-        
-        # Currency breakdown
-        currency_counts = {}
-        for txn in transactions:
-            currency = txn.get('currency', 'KES')
-            currency_counts[currency] = currency_counts.get(currency, 0) + 1
-        
         # Amount analysis (KES only)
-        kes_amounts = [
-            float(txn.get('amount', 0)) 
-            for txn in transactions 
-            if txn.get('currency', 'KES') == 'KES' and txn.get('amount')
-        ]
-        
+        kes_amounts = [float(amount) for currency, amount in zip(currencies, columns['amount'])
+                       if currency == 'KES' and amount]
         total_amount = sum(kes_amounts)
         avg_amount = total_amount / len(kes_amounts) if kes_amounts else 0
         
         return {
-            'total_transactions': len(transactions),
-            'by_status': status_counts,
-            'by_category': category_counts,
-            'by_currency': currency_counts,
+            'total_transactions': len(currencies),
+            'by_status': dict(Counter(columns['status'])),
+            'by_category': dict(Counter(filter(None, columns['category']))),
+            'by_currency': dict(Counter(currencies)),
             'total_amount': round(total_amount, 2),
             'average_amount': round(avg_amount, 2)
         }
@@ -276,44 +296,68 @@ class TransactionManager:
         limit: int = 100
     ) -> List[Dict[str, Any]]:
         """Search transactions with filters."""
-        transactions = self.repository.load_data()
-        
-        # Apply filters
-        if status:
-            transactions = [t for t in transactions if t.get('status') == status]
-        
-        if start_date:
-            transactions = [t for t in transactions if t.get('date', '') >= start_date]
+        # Stamp taken before the read: a save in between only forces a rebuild
+        stamp = self.repository.file_stamp()
+        transactions = self.repository.load_data(copy=False)
         
-        if end_date:
-            transactions = [t for t in transactions if t.get('date', '') <= end_date]
-        
-        # Apply text search
         if query:
             query_lower = query.lower()
-            filtered = []
-            for txn in transactions:
-                if (query_lower in txn.get('description', '').lower() or
-                    query_lower in txn.get('vendor', '').lower() or
-                    query_lower in txn.get('reference', '').lower() or
-                    query_lower in txn.get('transaction_id', '').lower()):
-                    filtered.append(txn)
-            transactions = filtered
-        
-        # Sort by date (newest first)
-        transactions.sort(key=lambda x: x.get('date', ''), reverse=True)
-        
-        return transactions[:limit]
+            blobs = self._get_search_blobs(transactions, stamp)
+            transactions = [t for t, blob in zip(transactions, blobs) if query_lower in blob]
+        
+        # Status and date range checked together in a single pass
+        def matches(txn: Dict[str, Any]) -> bool:
+            if status and txn.get('status') != status:
+                return False
+            if start_date and txn.get('date', '') < start_date:
+                return False
+            if end_date and txn.get('date', '') > end_date:
+                return False
+            return True
+        
+        # Newest first
+        return heapq.nlargest(limit, filter(matches, transactions), key=lambda x: x.get('date', ''))
+    
+    def _get_search_blobs(self, transactions: List[Dict[str, Any]], stamp) -> List[str]:
+        """Searchable fields joined and lower-cased once per record, rebuilt when the file stamp changes."""
+        if stamp != self._search_blobs_stamp or len(self._search_blobs) != len(transactions):
+            # newline-joined: a single-line query can't match across two fields
+            self._search_blobs = [
+                '\n'.join(str(t.get(field) or '') for field in _SEARCH_FIELDS).lower()
+                for t in transactions
+            ]
+            self._search_blobs_stamp = stamp
+        return self._search_blobs
     
     def export_transactions(self, file_path: str, **filters) -> bool:
-        """Export transactions to Excel file with optional filters."""
+        """Export transactions with optional filters; .parquet and .csv go through pyarrow, anything else to Excel."""
         transactions = self.search_transactions(**filters)
         
         if not transactions:
             return False
         
-        df = pd.DataFrame(transactions)
-        df.to_excel(file_path, index=False)
+        # Union of keys in first-seen order: rows from different uploads don't share every field
+        columns = list(dict.fromkeys(k for txn in transactions for k in txn))
+        suffix = Path(file_path).suffix.lower()
+        
+        if PARQUET_AVAILABLE and suffix in ('.parquet', '.csv'):
+            try:
+                table = pa.table({c: pa.array([txn.get(c) for txn in transactions]) for c in columns})
+                if suffix == '.parquet':
+                    pq.write_table(table, file_path, row_group_size=EXPORT_ROW_GROUP_SIZE)
+                else:
+                    pacsv.write_csv(table, file_path)
+                return True
+            except (pa.ArrowException, TypeError):
+                pass  # mixed-type or nested columns: let pandas handle them
+        
+        df = pd.DataFrame.from_records(transactions, columns=columns)
+        if suffix == '.csv':
+            df.to_csv(file_path, index=False)
+        elif suffix == '.parquet':
+            df.astype({c: str for c in df.columns[df.dtypes == object]}).to_parquet(file_path, index=False)
+        else:
+            df.to_excel(file_path, index=False)
         return True
     
     def get_upload_history(self) -> List[Dict[str, Any]]:
@@ -5,11 +5,117 @@ Provides consistent upload interface across all modules.
 import streamlit as st
 import pandas as pd
 import json
+from io import BytesIO
+from itertools import islice
 from typing import Dict, List, Any, Optional, Callable
 from datetime import datetime
 import tempfile
 import os
 
+from ledger.core.utils import EXCEL_ENGINE
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Rows parsed for the preview/mapping UI; the full parse happens in process_upload_fn
+PREVIEW_ROWS = 200
+
+def _norm_field(name: Any) -> str:
+    return str(name).lower().replace('_', ' ').strip()
+
+def _csv_head(buf: BytesIO) -> pd.DataFrame:
+    # Arrow's streaming reader stops after the first block(s), and Arrow-backed
+    # columns hand over to st.dataframe without conversion
+    if PYARROW_AVAILABLE:
+        try:
+            reader = pacsv.open_csv(buf)
+            batches, rows = [], 0
+            for batch in reader:
+                batches.append(batch)
+                rows += batch.num_rows
+                if rows >= PREVIEW_ROWS:
+                    break
+            table = pa.Table.from_batches(batches, schema=reader.schema).slice(0, PREVIEW_ROWS)
+            return table.to_pandas(types_mapper=pd.ArrowDtype)
+        except pa.ArrowException:
+            buf.seek(0)  # ragged rows, odd quoting: the C engine copes
+    return pd.read_csv(buf, nrows=PREVIEW_ROWS, low_memory=False)
+
+def _arrow_backed(df: pd.DataFrame) -> pd.DataFrame:
+    # object columns (JSON/Excel sources) make st.dataframe convert cell by
+    # cell on every rerun; Arrow-typed columns hand over directly
+    if not PYARROW_AVAILABLE:
+        return df
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False).to_pandas(types_mapper=pd.ArrowDtype)
+    except (pa.ArrowException, TypeError, ValueError):
+        return df  # mixed-type columns: leave them to Streamlit's own fallback
+
+def _json_head(buf: BytesIO) -> tuple[pd.DataFrame, Optional[int]]:
+    if IJSON_AVAILABLE and buf.getvalue().lstrip()[:1] == b'[':
+        df = pd.DataFrame(list(islice(ijson.items(buf, 'item', use_float=True), PREVIEW_ROWS)))
+        return _arrow_backed(df), (len(df) if len(df) < PREVIEW_ROWS else None)
+    # without ijson the whole document is parsed anyway, so the count is known
+    data = json.load(buf)
+    if not isinstance(data, list):
+        data = [data]
+    return _arrow_backed(pd.DataFrame(data[:PREVIEW_ROWS])), len(data)
+
+@st.cache_data(show_spinner=False)
+def _load_preview(file_bytes: bytes, suffix: str) -> tuple[Optional[pd.DataFrame], Optional[int]]:
+    """
+    Parse the first PREVIEW_ROWS rows of an uploaded file, cached on its bytes
+    across reruns. Returns (preview, total row count or None when unknown).
+    """
+    buf = BytesIO(file_bytes)
+    if suffix == '.csv':
+        df = _csv_head(buf)
+        # line count, less the header (quoted multi-line fields count extra)
+        lines = file_bytes.count(b'\n') + (0 if file_bytes.endswith(b'\n') else 1)
+        return df, max(lines - 1, len(df))
+    if suffix in ('.xlsx', '.xls'):
+        # calamine reads cells without building openpyxl's per-cell object model
+        df = _arrow_backed(pd.read_excel(buf, nrows=PREVIEW_ROWS, engine=EXCEL_ENGINE))
+        return df, (len(df) if len(df) < PREVIEW_ROWS else None)
+    if suffix == '.json':
+        return _json_head(buf)
+    return None, None
+
+@st.cache_data(show_spinner=False)
+def _auto_match(uploaded: tuple, required: tuple) -> Dict[str, Optional[str]]:
+    """Suggested template field per uploaded column: exact match first, then containment."""
+    # Normalised template names, built once rather than per comparison
+    req_index = {}
+    for req_field in required:
+        req_index.setdefault(_norm_field(req_field), req_field)
+    
+    matches = {}
+    for uploaded_col in uploaded:
+        col_key = _norm_field(uploaded_col)
+        match = req_index.get(col_key)
+        if match is None:
+            match = next((f for k, f in req_index.items() if col_key in k or k in col_key), None)
+        matches[uploaded_col] = match
+    return matches
+
+@st.cache_data(show_spinner=False)
+def _load_template(entity_type: str, _get_template_fn: Callable) -> pd.DataFrame:
+    """
+    Upload template per entity type, built once and shared across reruns and
+    sessions. Templates come from the static schemas, so entity_type is the key.
+    """
+    return _get_template_fn()
+
 def render_upload_widget(
     title: str,
     entity_type: str,
@@ -24,7 +130,8 @@ def render_upload_widget(
     Args:
         title: Widget title (e.g., "Vendor Upload")
         entity_type: Type of entity being uploaded
-        get_template_fn: Function to get upload template
+        get_template_fn: Function to get upload template; its result is cached
+            per entity_type, so it must not depend on tenant or session state
         process_upload_fn: Function to process the upload
         column_help: Optional help text for columns
         extra_options: Additional upload options
@@ -38,11 +145,19 @@ def render_upload_widget(
     # Create tabs for different upload actions
     template_tab, upload_tab, history_tab = st.tabs(["📋 Template", "⬆️ Upload", "📊 History"])
     
+    # One template build per render, shared by the template and upload tabs
+    try:
+        template_df = _load_template(entity_type, get_template_fn)
+        template_error = None
+    except Exception as e:
+        template_df, template_error = None, e
+    
     with template_tab:
         st.write(f"Download the {entity_type} template to see the required format and sample data.")
         
         try:
-            template_df = get_template_fn()
+            if template_error is not None:
+                raise template_error
             
             col1, col2 = st.columns([1, 1])
             
@@ -87,26 +202,15 @@ def render_upload_widget(
         if uploaded_file is not None:
             preview_df = None
             try:
-                # Save uploaded file temporarily
-                with tempfile.NamedTemporaryFile(delete=False, suffix=f".{uploaded_file.name.split('.')[-1]}") as tmp_file:
-                    tmp_file.write(uploaded_file.getvalue())
-                    tmp_file_path = tmp_file.name
-                
-                # Load and preview data
-                if uploaded_file.name.endswith('.csv'):
-                    preview_df = pd.read_csv(tmp_file_path)
-                elif uploaded_file.name.endswith(('.xlsx', '.xls')):
-                    preview_df = pd.read_excel(tmp_file_path)
-                elif uploaded_file.name.endswith('.json'):
-                    with open(tmp_file_path, 'r') as f:
-                        data = json.load(f)
-                        if isinstance(data, list):
-                            preview_df = pd.DataFrame(data)
-                        else:
-                            preview_df = pd.DataFrame([data])
+                # Load and preview data (parsed once per file, not on every widget rerun)
+                suffix = f".{uploaded_file.name.split('.')[-1]}"
+                preview_df, total_rows = _load_preview(uploaded_file.getvalue(), suffix.lower())
                 
                 if preview_df is not None:
-                    st.success(f"✅ File loaded: {len(preview_df)} rows, {len(preview_df.columns)} columns")
+                    if total_rows is not None:
+                        st.success(f"✅ File loaded: {total_rows} rows, {len(preview_df.columns)} columns")
+                    else:
+                        st.success(f"✅ File loaded: {len(preview_df.columns)} columns (previewing the first {len(preview_df)} rows)")
                 
                     # Show data preview
                     with st.expander("👀 Data Preview", expanded=True):
@@ -115,9 +219,11 @@ def render_upload_widget(
                     # Column mapping interface
                     st.write("**Map your columns to the required fields:**")
                     
-                    template_df = get_template_fn()
+                    if template_error is not None:
+                        raise template_error
                     required_fields = list(template_df.columns)
                     uploaded_columns = list(preview_df.columns)
+                    matches = _auto_match(tuple(uploaded_columns), tuple(required_fields))
                 
                 col_mappings = []
                 mapping_cols = st.columns(3)
@@ -134,14 +240,8 @@ def render_upload_widget(
                         st.text(uploaded_col)
                     
                     with mapping_cols[1]:
-                        # Auto-match similar column names
-                        auto_match = None
-                        for req_field in required_fields:
-                            if (uploaded_col.lower().replace('_', ' ') == req_field.lower().replace('_', ' ') or
-                                uploaded_col.lower() in req_field.lower() or
-                                req_field.lower() in uploaded_col.lower()):
-                                auto_match = req_field
-                                break
+                        # Auto-match similar column names (cached per upload/template pair)
+                        auto_match = matches.get(uploaded_col)
                         
                         selected_field = st.selectbox(
                             "Field",
@@ -203,17 +303,23 @@ def render_upload_widget(
                         st.error("Please map at least one column to proceed.")
                     else:
                         with st.spinner(f"Processing {entity_type} upload..."):
+                            # The upload pipeline reads from a path; only write the file out now
+                            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+                                tmp_file.write(uploaded_file.getbuffer())
+                                tmp_file_path = tmp_file.name
+                            
                             try:
-                                # Call the processing function
-                                result = process_upload_fn(
-                                    file_path=tmp_file_path,
-                                    column_mappings=col_mappings,
-                                    mode=upload_mode,
-                                    **extra_upload_options
-                                )
-                                
-                                # Clean up temp file
-                                os.unlink(tmp_file_path)
+                                # Call the processing function; the temp file goes away however
+                                # it ends, including Streamlit's stop/rerun (BaseException) signals
+                                try:
+                                    result = process_upload_fn(
+                                        file_path=tmp_file_path,
+                                        column_mappings=col_mappings,
+                                        mode=upload_mode,
+                                        **extra_upload_options
+                                    )
+                                finally:
+                                    os.unlink(tmp_file_path)
                                 
                                 # Display results
                                 if result.get('success'):
@@ -285,9 +391,6 @@ def render_upload_widget(
                                     return result
                                     
                             except Exception as e:
-                                # Clean up temp file on error
-                                if os.path.exists(tmp_file_path):
-                                    os.unlink(tmp_file_path)
                                 st.error(f"Error processing upload: {str(e)}")
                                 return None
                         
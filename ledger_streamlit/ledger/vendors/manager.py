@@ -3,6 +3,12 @@ Vendor Management with bulk upload, deduplication, and master data management.
 Integrates with VendorNormalizer for smart vendor matching.
 """
 import pandas as pd
+import os
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
@@ -10,6 +16,64 @@ from ..core.upload_manager import UploadManager, ColumnMapping, UploadResult
 from ..core.repositories import VendorsRepository
 from ..ml.vendor_normalizer import VendorNormalizer
 
+# Normalizer score (0-1) above which an incoming vendor is merged into an existing one
+DEDUP_MIN_SCORE = 0.85
+
+# Fields a merge keeps from the existing vendor: the code is the upsert key,
+# so taking the incoming (possibly just generated) one would add a new vendor
+DEDUP_KEEP_FIELDS = ('vendor_code', 'vendor_name', 'created_at')
+
+# Retrain the normalizer only once untrained names reach this share of the
+# trained list; smaller uploads are matched against the current model
+RETRAIN_MIN_DELTA = 0.10
+
+# Normalizer retraining runs in one worker process so an upload doesn't wait on
+# the TF-IDF fit; managers built on the next rerun load the saved model.
+_NORM_POOL: Optional[ProcessPoolExecutor] = None
+_NORM_FUTURES: Dict[str, Future] = {}
+
+def _norm_pool() -> ProcessPoolExecutor:
+    global _NORM_POOL
+    if _NORM_POOL is None:
+        # spawn: forking the threaded Streamlit server can deadlock the child
+        _NORM_POOL = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+    return _NORM_POOL
+
+def _train_and_save(tenant_id: str, vendor_names: List[str]) -> None:
+    normalizer = VendorNormalizer(tenant_id)
+    normalizer.train(vendor_names)
+    normalizer.save()
+
+def _report_training_error(future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Warning: Could not update vendor normalizer: {future.exception()}")
+
+# Loaded normalizers per tenant, shared across reruns and tied to the saved
+# model's file stamp so a retrain (here or in the worker) is picked up
+_NORMALIZERS: Dict[str, tuple] = {}
+_NORMALIZERS_LOCK = threading.Lock()
+
+def _get_normalizer(tenant_id: str) -> VendorNormalizer:
+    normalizer = VendorNormalizer(tenant_id)
+    try:
+        stat = os.stat(f"{normalizer._model_base()}_vendors.json")
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        stamp = None
+    with _NORMALIZERS_LOCK:
+        cached = _NORMALIZERS.get(tenant_id)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        if stamp is not None:
+            try:
+                normalizer.load()
+            except Exception:
+                # unreadable model, or one caught mid-retrain: not cached, so
+                # the next call loads again
+                return VendorNormalizer(tenant_id)
+        _NORMALIZERS[tenant_id] = (stamp, normalizer)
+        return normalizer
+
 class VendorManager:
     """Comprehensive vendor management with bulk operations."""
     
@@ -17,14 +81,14 @@ class VendorManager:
         self.tenant_id = tenant_id
         self.repository = VendorsRepository(tenant_id)
         self.upload_manager = UploadManager(tenant_id, 'vendors')
-        self.normalizer = VendorNormalizer(tenant_id)
-        
-        # Load existing normalizer model if available
-        try:
-            self.normalizer.load()
-        except:
-            # No existing model, will train on first upload
-            pass
+        # Lower-cased name/code text per stored vendor, tied to the repository file stamp
+        self._search_blobs: List[str] = []
+        self._search_blobs_stamp = None
+    
+    @property
+    def normalizer(self) -> VendorNormalizer:
+        """Tenant's vendor normalizer, loaded on first use and reused across reruns."""
+        return _get_normalizer(self.tenant_id)
     
     def get_template(self) -> pd.DataFrame:
         """Get vendor upload template."""
@@ -78,19 +142,28 @@ class VendorManager:
             # Auto-generate vendor codes if missing
             if 'vendor_code' in df.columns:
                 missing_codes = df['vendor_code'].isna() | (df['vendor_code'] == '')
-                if missing_codes.any():
-                    for idx in df[missing_codes].index:
-                        vendor_name = df.loc[idx, 'vendor_name']
-                        if vendor_name:
-                            # Generate code from name: first 3 chars + 3 digits
-                            base_code = ''.join(c for c in vendor_name.upper()[:3] if c.isalpha())
-                            counter = 1
-                            while True:
-                                code = f"{base_code}{counter:03d}"
-                                if not self.repository.find_by_key('vendor_code', code):
-                                    df.loc[idx, 'vendor_code'] = code
-                                    break
-                                counter += 1
+                if missing_codes.any() and 'vendor_name' in df.columns:
+                    # Codes already taken, in the repository or elsewhere in this upload
+                    taken = set(self.repository.load_columns({'vendor_code': None})['vendor_code'])
+                    taken.update(df.loc[~missing_codes, 'vendor_code'])
+                    
+                    # Generate code from name: letters of the first 3 chars + 3 digits
+                    names = df.loc[missing_codes, 'vendor_name']
+                    bases = names.astype('string').str.upper().str[:3].str.replace(r'[\W\d_]', '', regex=True)
+                    next_counter = {}
+                    generated = {}
+                    for idx, name, base_code in zip(names.index, names, bases):
+                        if not isinstance(name, str) or not name:
+                            continue
+                        counter = next_counter.get(base_code, 1)
+                        while f"{base_code}{counter:03d}" in taken:
+                            counter += 1
+                        code = f"{base_code}{counter:03d}"
+                        generated[idx] = code
+                        taken.add(code)
+                        next_counter[base_code] = counter + 1
+                    if generated:
+                        df.loc[list(generated), 'vendor_code'] = list(generated.values())
             
             return df
         
@@ -99,7 +172,8 @@ class VendorManager:
             file_path=file_path,
             mappings=mappings,
             mode=mode,
-            transform_fn=transform_vendor_data
+            transform_fn=transform_vendor_data,
+            return_records=True
         )
         
         if not upload_result.success:
@@ -110,13 +184,8 @@ class VendorManager:
                 'deduplication_report': None
             }
         
-        # Load staged data and commit to repository
-        staging_file = self.upload_manager.staging_dir / f"{self.tenant_id}_vendors_{upload_result.batch_id}.json"
-        with open(staging_file, 'r') as f:
-            import json
-            staged_data = json.load(f)
-        
-        vendors_data = staged_data['data']
+        # Staged rows come back with the result; the staging file is only the audit copy
+        vendors_data = upload_result.staged_records
         
         # Apply deduplication if requested
         deduplication_report = None
@@ -146,60 +215,58 @@ class VendorManager:
         if not vendors:
             return vendors, {'duplicates_found': 0, 'duplicates_merged': 0}
         
-        # Load existing vendors for comparison
-        existing_vendors = self.repository.load_data()
-        all_vendor_names = [v.get('vendor_name', '') for v in existing_vendors]
+        # Load existing vendors for comparison, indexed by name (first record wins)
+        existing_vendors = self.repository.load_data(copy=False)
+        existing_by_name = {}
+        for v in existing_vendors:
+            existing_by_name.setdefault(v.get('vendor_name'), v)
+        
+        # Resolve every distinct incoming name against the normalizer in one batch
+        matches = {}
+        if self.normalizer.vectorizer and existing_vendors:
+            names = list(dict.fromkeys(filter(None, (v.get('vendor_name', '').strip() for v in vendors))))
+            try:
+                matches = dict(zip(names, self.normalizer.normalize_batch(names, fuzzy_threshold=85)))
+            except Exception:
+                # If normalization fails, vendors are added as-is
+                matches = {}
         
         duplicates_found = 0
         duplicates_merged = 0
         deduplicated = []
         processed_names = set()
+        now = datetime.now().isoformat()
         
         for vendor in vendors:
             vendor_name = vendor.get('vendor_name', '').strip()
             
             if not vendor_name or vendor_name in processed_names:
                 continue
+            processed_names.add(vendor_name)
             
-            # Check for similar names in existing data
-            if self.normalizer.vectorizer and all_vendor_names:
-                try:
-                    norm_result = self.normalizer.normalize(vendor_name, fuzzy_threshold=85)
-                    canonical_name = norm_result.get('canonical')
-                    similarity_score = norm_result.get('score', 0)
-                    
-                    if canonical_name and similarity_score > 85:
-                        # Found potential duplicate
-                        duplicates_found += 1
-                        
-                        # Find existing vendor record
-                        existing_vendor = next(
-                            (v for v in existing_vendors if v.get('vendor_name') == canonical_name),
-                            None
-                        )
-                        
-                        if existing_vendor:
-                            # Merge data (new data takes precedence for non-empty fields)
-                            merged_vendor = existing_vendor.copy()
-                            for key, value in vendor.items():
-                                if value and str(value).strip():
-                                    merged_vendor[key] = value
-                            
-                            merged_vendor['last_updated'] = datetime.now().isoformat()
-                            deduplicated.append(merged_vendor)
-                            duplicates_merged += 1
-                        else:
-                            deduplicated.append(vendor)
-                    else:
-                        deduplicated.append(vendor)
-                        
-                except Exception:
-                    # If normalization fails, add vendor as-is
-                    deduplicated.append(vendor)
-            else:
+            norm_result = matches.get(vendor_name, {})
+            canonical_name = norm_result.get('canonical')
+            if not canonical_name or norm_result.get('score', 0) <= DEDUP_MIN_SCORE:
                 deduplicated.append(vendor)
+                continue
             
-            processed_names.add(vendor_name)
+            # Found potential duplicate
+            duplicates_found += 1
+            existing_vendor = existing_by_name.get(canonical_name)
+            
+            if existing_vendor:
+                # Merge data (new data takes precedence for non-empty fields,
+                # except the existing vendor's identity)
+                merged_vendor = existing_vendor.copy()
+                for key, value in vendor.items():
+                    if key not in DEDUP_KEEP_FIELDS and value and str(value).strip():
+                        merged_vendor[key] = value
+                
+                merged_vendor['last_updated'] = now
+                deduplicated.append(merged_vendor)
+                duplicates_merged += 1
+            else:
+                deduplicated.append(vendor)
         
         return deduplicated, {
             'duplicates_found': duplicates_found,
@@ -212,51 +279,73 @@ class VendorManager:
         """Update vendor normalizer with new vendor names."""
         
         # Get all vendor names (existing + new)
-        existing_vendors = self.repository.load_data()
+        existing_names = self.repository.load_columns({'vendor_name': None})['vendor_name']
         all_vendor_names = []
         
-        for vendor in existing_vendors + vendors:
-            name = vendor.get('vendor_name')
+        for name in existing_names + [vendor.get('vendor_name') for vendor in vendors]:
             if name and name.strip():
                 all_vendor_names.append(name.strip())
         
         # Remove duplicates while preserving order
         unique_names = list(dict.fromkeys(all_vendor_names))
         
+        trained = self.normalizer.vendor_list
+        if len(trained) >= 3:
+            trained_set = set(trained)
+            untrained = sum(1 for name in unique_names if name not in trained_set)
+            if untrained < RETRAIN_MIN_DELTA * len(trained):
+                return
+        
         if len(unique_names) >= 3:  # Need minimum vendors to train
             try:
-                self.normalizer.train(unique_names)
-                self.normalizer.save()
+                future = _norm_pool().submit(_train_and_save, self.tenant_id, unique_names)
+            except Exception:
+                future = None  # no worker process available: train here instead
+            if future is not None:
+                future.add_done_callback(_report_training_error)
+                _NORM_FUTURES[self.tenant_id] = future
+                return
+            try:
+                _train_and_save(self.tenant_id, unique_names)
             except Exception as e:
                 print(f"Warning: Could not update vendor normalizer: {e}")
     
     def search_vendors(self, query: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Search vendors by name or code."""
-        vendors = self.repository.load_data()
+        # Stamp taken before the read: a save in between only forces a rebuild
+        stamp = self.repository.file_stamp()
+        vendors = self.repository.load_data(copy=False)
         
         if not query:
             return vendors[:limit]
         
         query_lower = query.lower().strip()
-        matches = []
+        blobs = self._get_search_blobs(vendors, stamp)
         
-        for vendor in vendors:
-            name = vendor.get('vendor_name', '').lower()
-            code = vendor.get('vendor_code', '').lower()
-            
-            if (query_lower in name or 
-                query_lower in code or
-                name.startswith(query_lower) or
-                code.startswith(query_lower)):
-                matches.append(vendor)
-        
-        return matches[:limit]
+        # Name or code contains the query; stop once the page is full
+        matches = (vendor for vendor, blob in zip(vendors, blobs) if query_lower in blob)
+        return list(islice(matches, limit))
+    
+    def _get_search_blobs(self, vendors: List[Dict[str, Any]], stamp) -> List[str]:
+        """Vendor name and code joined and lower-cased once per record, rebuilt when the file stamp changes."""
+        if stamp != self._search_blobs_stamp or len(self._search_blobs) != len(vendors):
+            # newline-joined: a single-line query can't match across the two fields
+            self._search_blobs = [
+                f"{v.get('vendor_name') or ''}\n{v.get('vendor_code') or ''}".lower()
+                for v in vendors
+            ]
+            self._search_blobs_stamp = stamp
+        return self._search_blobs
     
     def get_vendor_stats(self) -> Dict[str, Any]:
         """Get vendor statistics and analytics."""
-        vendors = self.repository.load_data()
+        columns = self.repository.load_columns({
+            'is_active': True, 'tax_status': 'unknown', 'category': 'uncategorized',
+            'credit_limit': 0, 'payment_terms': 0
+        })
+        total_vendors = len(columns['is_active'])
         
-        if not vendors:
+        if not total_vendors:
             return {
                 'total_vendors': 0,
                 'active_vendors': 0,
@@ -266,31 +355,22 @@ class VendorManager:
                 'average_payment_terms': 0
             }
         
-        active_vendors = [v for v in vendors if v.get('is_active', True)]
-        
         # Tax status breakdown
-        tax_status_counts = {}
-        for vendor in vendors:
-            status = vendor.get('tax_status', 'unknown')
-            tax_status_counts[status] = tax_status_counts.get(status, 0) + 1
+        tax_status_counts = dict(Counter(columns['tax_status']))
         
         # Category breakdown
-        category_counts = {}
-        for vendor in vendors:
-            category = vendor.get('category', 'uncategorized')
-            if category:
-                category_counts[category] = category_counts.get(category, 0) + 1
+        category_counts = dict(Counter(filter(None, columns['category'])))
         
         # Financial metrics
-        credit_limits = [v.get('credit_limit', 0) for v in vendors if v.get('credit_limit')]
-        payment_terms = [v.get('payment_terms', 0) for v in vendors if v.get('payment_terms')]
+        credit_limits = list(filter(None, columns['credit_limit']))
+        payment_terms = list(filter(None, columns['payment_terms']))
         
         avg_credit_limit = sum(credit_limits) / len(credit_limits) if credit_limits else 0
         avg_payment_terms = sum(payment_terms) / len(payment_terms) if payment_terms else 0
         
         return {
-            'total_vendors': len(vendors),
-            'active_vendors': len(active_vendors),
+            'total_vendors': total_vendors,
+            'active_vendors': sum(map(bool, columns['is_active'])),
             'by_tax_status': tax_status_counts,
             'by_category': category_counts,
             'average_credit_limit': round(avg_credit_limit, 2),
@@ -299,7 +379,7 @@ class VendorManager:
     
     def export_vendors(self, file_path: str, active_only: bool = False) -> bool:
         """Export vendors to Excel file."""
-        vendors = self.repository.load_data()
+        vendors = self.repository.load_data(copy=False)
         
         if active_only:
             vendors = [v for v in vendors if v.get('is_active', True)]
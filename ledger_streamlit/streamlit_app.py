@@ -1,28 +1,22 @@
 
 import streamlit as st
 import hashlib
+import hmac
 from pathlib import Path
 import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import json
 import numpy as np
 
 from ledger.auth.roles import RoleManager, _verify_password
 from ledger.ingest.engine import IngestionEngine
-from ledger.reconcile.engine import ReconciliationEngine
+from ledger.reconcile.engine import ReconciliationEngine, latest_recon
 from ledger.ledger.posting import LedgerPosting
 from ledger.reports.financials import FinancialReports
 from ledger.tax.payroll import KenyanPayroll, KenyanVAT
-from ledger.ml.forecast import ForecastEngine
-from ledger.ml.fraud import FraudDetector
-from ledger.integrations.connectors import QuickBooksConnector, ExcelConnector, APIConnector
 from ledger.vendors.manager import VendorManager
 from ledger.employees.manager import EmployeeManager
 from ledger.transactions.manager import TransactionManager
-from ledger.payroll.bulk_processor import PayrollBulkProcessor
 from ledger.ui.upload_components import render_upload_widget, render_bulk_operations_sidebar
 
 st.set_page_config(
@@ -37,8 +31,9 @@ st.set_page_config(
     }
 )
 
-# Custom CSS for enhanced styling
-st.markdown("""
+# Custom CSS for enhanced styling. Re-emitted on every run: Streamlit drops any
+# element a rerun doesn't produce, so it can't be sent once per session.
+_CSS = """
 <style>
     .main-header { 
         background: linear-gradient(90deg, #1e3a8a, #3b82f6);
@@ -69,24 +64,30 @@ st.markdown("""
         margin: 0.5rem 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(_CSS, unsafe_allow_html=True)
 
 # Removed insecure hash function - now using secure verification from roles module
 
+@st.cache_resource
+def get_role_manager():
+    """Users/tenants/roles loaded once and shared across reruns; clear() after writes."""
+    return RoleManager()
+
+_WELCOME_METRICS = (
+    ("🏢 Companies", "3", "Active tenants"),
+    ("👥 Users", "4", "Registered"),
+    ("📊 Features", "12+", "Core modules"),
+    ("🤖 AI Models", "5", "ML engines"),
+)
+
 def show_welcome():
     # Enhanced header with gradient background
     st.markdown('<div class="main-header"><h1>🇰🇪 LedgerOne-3</h1><h3>AI-Powered Financial Management for Kenyan Businesses</h3><p>Comprehensive accounting, payroll, tax compliance, and ML-powered insights</p></div>', unsafe_allow_html=True)
     
     # Statistics overview
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        st.metric("🏢 Companies", "3", "Active tenants")
-    with col2:
-        st.metric("👥 Users", "4", "Registered")
-    with col3:
-        st.metric("📊 Features", "12+", "Core modules")
-    with col4:
-        st.metric("🤖 AI Models", "5", "ML engines")
+    for col, (label, value, delta) in zip(st.columns(len(_WELCOME_METRICS)), _WELCOME_METRICS):
+        col.metric(label, value, delta)
     
     st.markdown("---")
     
@@ -120,6 +121,27 @@ def show_welcome():
         • **Integrations** - QuickBooks, Excel, REST APIs
         """)
 
+def _parse_roles(user):
+    """Role names without their tenant prefix ("<tenant_id>:ceo" -> "ceo")."""
+    return tuple(r.rsplit(":", 1)[-1] for r in user.get("roles", []))
+
+_ROLE_ICONS = {"ceo": "👑", "finance_manager": "💰", "account_manager": "📋", "hr_manager": "👥"}
+
+def _role_badge(roles):
+    """Sidebar label for the primary role, e.g. "👑 Ceo"."""
+    primary_role = roles[0] if roles else "user"
+    return f"{_ROLE_ICONS.get(primary_role, '👤')} {primary_role.replace('_', ' ').title()}"
+
+def _session_user(user):
+    """Copy of a RoleManager user for st.session_state, with its role names and
+    badge worked out once.
+
+    A copy, because the RoleManager is shared (and saved) across sessions."""
+    user = dict(user)
+    user["_parsed_roles"] = _parse_roles(user)
+    user["_role_badge"] = _role_badge(user["_parsed_roles"])
+    return user
+
 def login_form():
     show_welcome()
     
@@ -130,8 +152,8 @@ def login_form():
         email=st.text_input("Email", key="login_email")
         pw=st.text_input("Password", type="password", key="login_password")
         if st.button("Login", key="login_btn"):
-            rm=RoleManager()
-            user=next((u for u in rm.users.values() if u["email"]==email),None)
+            rm=get_role_manager()
+            user=rm.find_user_by_email(email)
             # Secure authentication with proper legacy hash handling
             if user:
                 stored_hash = user["password_hash"]
@@ -139,26 +161,26 @@ def login_form():
                 # Check if it's a new PBKDF2 hash (contains ':' and is longer than 64 chars)
                 if ':' in stored_hash and len(stored_hash) > 64:
                     if _verify_password(stored_hash, pw):
-                        st.session_state["user"] = user
+                        st.session_state["user"] = _session_user(user)
                         st.success(f"Welcome back, {email}!")
                         st.rerun()
                     else:
                         st.error("Invalid credentials")
                 
                 # Handle legacy SHA-256 hashes SECURELY
-                elif len(stored_hash) == 64 and all(c in '0123456789abcdef' for c in stored_hash):
+                elif len(stored_hash) == 64 and not stored_hash.strip('0123456789abcdef'):
                     # Legacy SHA-256 hash - verify against the actual hash
-                    import hashlib
                     legacy_hash = hashlib.sha256(pw.encode()).hexdigest()
-                    if legacy_hash == stored_hash:
+                    if hmac.compare_digest(legacy_hash, stored_hash):
                         # Successful login with legacy hash - upgrade to secure hash
                         from ledger.auth.roles import _hash_password
                         new_hash = _hash_password(pw)
-                        rm = RoleManager()
                         rm.users[user["id"]]["password_hash"] = new_hash
-                        rm.save()
+                        # The shared RoleManager already holds the new hash; only
+                        # users.json needs writing, and login doesn't wait for it
+                        rm.save_users_in_background()
                         
-                        st.session_state["user"] = user
+                        st.session_state["user"] = _session_user(user)
                         st.success(f"Welcome back, {email}! Your password has been upgraded to a more secure format.")
                         st.rerun()
                     else:
@@ -187,16 +209,17 @@ def login_form():
                 elif not reg_email or not company_name:
                     st.error("Please fill in all fields!")
                 else:
-                    rm = RoleManager()
+                    rm = get_role_manager()
                     # Check if email already exists
-                    if any(u["email"] == reg_email for u in rm.users.values()):
+                    if rm.find_user_by_email(reg_email) is not None:
                         st.error("Email already registered!")
                     else:
                         # Create new tenant with admin
                         result = rm.create_tenant_with_admin(company_name, reg_email, reg_password, industry)
                         # Get the newly created user for autologin
                         new_user = rm.users[result["user_id"]]
-                        st.session_state["user"] = new_user
+                        get_role_manager.clear()
+                        st.session_state["user"] = _session_user(new_user)
                         st.success(f"Account created successfully! Welcome to {company_name}!")
                         st.rerun()
 
@@ -206,34 +229,53 @@ def logout_button():
         st.success("You have been logged out successfully!")
         st.rerun()
 
+# Sample dashboard data for demo, built once per process
+_DEMO_METRICS = (
+    ("💰 Cash Balance", "KES 1.2M", "5.2%", "Current cash and bank balance"),
+    ("📈 Monthly Revenue", "KES 2.4M", "15%", "This month's total revenue"),
+    ("📋 Pending Items", "12", "-3", "Items pending reconciliation"),
+    ("🔍 ML Insights", "3", "1", "New AI-generated insights"),
+)
+_DEMO_MONTHS = np.array(['Apr 2025', 'May 2025', 'Jun 2025', 'Jul 2025', 'Aug 2025', 'Sep 2025'])
+_DEMO_REVENUE = np.array([1800000, 2100000, 1950000, 2200000, 2350000, 2400000], dtype=np.int64)
+_DEMO_EXPENSE_CATEGORIES = np.array(['Payroll', 'Operations', 'Fleet', 'Admin', 'Other'])
+_DEMO_EXPENSE_AMOUNTS = np.array([800000, 450000, 320000, 180000, 120000], dtype=np.int64)
+_DEMO_ACTIVITY = pd.DataFrame({
+    'Time': ['2 min ago', '15 min ago', '1 hour ago', '3 hours ago'],
+    'Activity': [
+        '💸 Payment processed: KES 45,000',
+        '📄 Invoice uploaded via OCR',
+        '🔄 Reconciliation completed',
+        '📈 Monthly report generated'
+    ],
+    'Status': ['✅ Complete', '🔄 Processing', '✅ Complete', '✅ Complete']
+}).convert_dtypes(dtype_backend="pyarrow")
+
 def show_user_dashboard(user):
     """Enhanced personalized dashboard with rich analytics"""
+    import plotly.graph_objects as go
+    
     # Enhanced Sidebar
     st.sidebar.markdown('<div class="sidebar-section">', unsafe_allow_html=True)
     st.sidebar.markdown(f"### 👤 {user['email']}")
     
     if user.get('tenant_id'):
-        rm = RoleManager()
+        rm = get_role_manager()
         tenant = rm.tenants.get(user['tenant_id'], {})
         st.sidebar.markdown(f"**🏢 Company:** {tenant.get('name', 'Unknown')}")
         st.sidebar.markdown(f"**🏭 Industry:** {tenant.get('industry', 'Unknown').title()}")
         
         # Enhanced role display with badges
-        roles = [r.split(":")[1] if ":" in r else r for r in user.get("roles", [])]
-        role_icons = {"ceo": "👑", "finance_manager": "💰", "account_manager": "📋", "hr_manager": "👥"}
-        primary_role = roles[0] if roles else "user"
-        icon = role_icons.get(primary_role, "👤")
-        st.sidebar.markdown(f"**🎯 Role:** {icon} {primary_role.replace('_', ' ').title()}")
+        roles = user.get("_parsed_roles") or _parse_roles(user)
+        st.sidebar.markdown(f"**🎯 Role:** {user.get('_role_badge') or _role_badge(roles)}")
         
         # Quick access buttons
         st.sidebar.markdown("---")
         st.sidebar.markdown("### ⚡ Quick Actions")
-        if st.sidebar.button("📈 View Reports", use_container_width=True):
-            st.session_state.selected_page = "Reports"
-            st.rerun()
-        if st.sidebar.button("🔄 Run Reconciliation", use_container_width=True):
-            st.session_state.selected_page = "Reconciliation"
-            st.rerun()
+        pages = _nav_pages(roles)
+        for label, page in (("📈 View Reports", "📈 Reports"), ("🔄 Run Reconciliation", "🔄 Reconciliation")):
+            if page in pages:
+                st.sidebar.button(label, use_container_width=True, on_click=_go_to_page, args=(page,))
     else:
         st.sidebar.markdown("**🔧 Role:** System Administrator")
         st.sidebar.markdown("**⚡ Access:** Full System Control")
@@ -243,73 +285,45 @@ def show_user_dashboard(user):
     
     # Enhanced Main Dashboard
     if user.get('tenant_id'):
-        rm = RoleManager()
+        rm = get_role_manager()
         tenant = rm.tenants.get(user['tenant_id'], {})
         
         # Company header with stats
         st.markdown(f'<div class="main-header"><h2>🏢 {tenant.get("name", "Your Company")}</h2><p>Financial Management Dashboard</p></div>', unsafe_allow_html=True)
         
-        # Role-specific dashboard content
-        user_roles = [r.split(":")[1] if ":" in r else r for r in user.get("roles", [])]
-        
         # Enhanced metrics with real-time style display
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric("💰 Cash Balance", "KES 1.2M", "5.2%", help="Current cash and bank balance")
-        with col2:
-            st.metric("📈 Monthly Revenue", "KES 2.4M", "15%", help="This month's total revenue")
-        with col3:
-            st.metric("📋 Pending Items", "12", "-3", help="Items pending reconciliation")
-        with col4:
-            st.metric("🔍 ML Insights", "3", "1", help="New AI-generated insights")
+        for col, (label, value, delta, help_text) in zip(st.columns(len(_DEMO_METRICS)), _DEMO_METRICS):
+            col.metric(label, value, delta, help=help_text)
         
         # Interactive charts section
         st.markdown("---")
         chart_col1, chart_col2 = st.columns(2)
         
+        # the demo series are NumPy arrays, so Plotly takes its array fast path
+        # instead of serialising them element by element
         with chart_col1:
             st.markdown("### 📈 Revenue Trend (Last 6 Months)")
-            # Sample data for demo
-            months = ['Apr 2025', 'May 2025', 'Jun 2025', 'Jul 2025', 'Aug 2025', 'Sep 2025']
-            revenue = [1800000, 2100000, 1950000, 2200000, 2350000, 2400000]
-            
-            fig = px.line(x=months, y=revenue, title="Revenue Growth")
-            fig.update_layout(height=300, showlegend=False)
-            fig.update_traces(line_color='#3b82f6', line_width=3)
+            fig = go.Figure(go.Scatter(x=_DEMO_MONTHS, y=_DEMO_REVENUE, mode="lines", line=dict(color='#3b82f6', width=3)))
+            fig.update_layout(height=300, showlegend=False, title="Revenue Growth")
             st.plotly_chart(fig, use_container_width=True)
             
         with chart_col2:
             st.markdown("### 📊 Expense Breakdown")
-            # Sample expense data
-            categories = ['Payroll', 'Operations', 'Fleet', 'Admin', 'Other']
-            amounts = [800000, 450000, 320000, 180000, 120000]
-            
-            fig = px.pie(values=amounts, names=categories, title="Current Month Expenses")
-            fig.update_layout(height=300, showlegend=True)
+            fig = go.Figure(go.Pie(values=_DEMO_EXPENSE_AMOUNTS, labels=_DEMO_EXPENSE_CATEGORIES))
+            fig.update_layout(height=300, showlegend=True, title="Current Month Expenses")
             st.plotly_chart(fig, use_container_width=True)
         
         # Recent activity section
         st.markdown("---")
         st.markdown("### 🕰️ Recent Activity")
         
-        activity_data = {
-            'Time': ['2 min ago', '15 min ago', '1 hour ago', '3 hours ago'],
-            'Activity': [
-                '💸 Payment processed: KES 45,000',
-                '📄 Invoice uploaded via OCR',
-                '🔄 Reconciliation completed',
-                '📈 Monthly report generated'
-            ],
-            'Status': ['✅ Complete', '🔄 Processing', '✅ Complete', '✅ Complete']
-        }
-        
-        st.dataframe(pd.DataFrame(activity_data), use_container_width=True, hide_index=True)
+        st.table(_DEMO_ACTIVITY, hide_index=True)
         
     else:
         # Enhanced superadmin dashboard
         st.markdown('<div class="main-header"><h2>🔧 System Administration</h2><p>Enterprise-wide Management Console</p></div>', unsafe_allow_html=True)
         
-        rm = RoleManager()
+        rm = get_role_manager()
         total_tenants = len(rm.tenants)
         total_users = len(rm.users)
         
@@ -323,6 +337,151 @@ def show_user_dashboard(user):
         with col4:
             st.metric("🔒 Security Score", "A+", help="Security compliance rating")
 
+# Entity statistics cached per tenant and data-file stamp: an upload (or any other
+# write) changes the stamp, so nothing has to clear these by hand
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def _vendor_stats(tenant_id, stamp):
+    return VendorManager(tenant_id).get_vendor_stats()
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def _employee_stats(tenant_id, stamp):
+    return EmployeeManager(tenant_id).get_employee_stats()
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def _transaction_stats(tenant_id, stamp):
+    return TransactionManager(tenant_id).get_transaction_stats()
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def _payroll_runs(tenant_id, stamp, limit):
+    from ledger.payroll.bulk_processor import PayrollBulkProcessor
+    return PayrollBulkProcessor(tenant_id).get_payroll_runs(limit=limit)
+
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def _payroll_template(tenant_id, payroll_period, employees_stamp):
+    """Pre-filled payroll template and its CSV bytes, rebuilt when the employee file changes."""
+    from ledger.payroll.bulk_processor import PayrollBulkProcessor
+    template_df = PayrollBulkProcessor(tenant_id).generate_payroll_template(payroll_period)
+    return template_df, template_df.to_csv(index=False).encode('utf-8')
+
+@st.fragment
+def _vendor_stats_panel(vendor_manager):
+    """Vendor statistics on demand; reruns only this panel."""
+    import plotly.graph_objects as go
+    if st.button("📊 Show Vendor Statistics", key="vendor_stats"):
+        stats = _vendor_stats(vendor_manager.tenant_id, vendor_manager.repository.file_stamp())
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Total Vendors", stats['total_vendors'])
+        with col2:
+            st.metric("Active Vendors", stats['active_vendors'])
+        with col3:
+            st.metric("Avg Credit Limit", f"KES {stats['average_credit_limit']:,.0f}")
+        with col4:
+            st.metric("Avg Payment Terms", f"{stats['average_payment_terms']:.0f} days")
+
+        if stats['by_tax_status']:
+            fig = go.Figure(go.Pie(
+                values=list(stats['by_tax_status'].values()),
+                labels=list(stats['by_tax_status'].keys())
+            ))
+            fig.update_layout(title="Vendors by Tax Status")
+            st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def _employee_stats_panel(employee_manager):
+    """Employee statistics on demand; reruns only this panel."""
+    if st.button("📊 Show Employee Statistics", key="employee_stats"):
+        stats = _employee_stats(employee_manager.tenant_id, employee_manager.repository.file_stamp())
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Total Employees", stats['total_employees'])
+        with col2:
+            st.metric("Active Employees", stats['active_employees'])
+        with col3:
+            st.metric("Departments", len(stats['by_department']))
+        with col4:
+            st.metric("Avg Salary", f"KES {stats['average_salary']:,.0f}")
+
+        # Department breakdown
+        if stats['by_department']:
+            st.markdown("**Employees by Department**")
+            st.bar_chart(pd.Series(stats['by_department'], name="Employees"), sort=False)
+
+        # Salary ranges
+        if stats['salary_ranges']:
+            st.markdown("**Salary Distribution**")
+            st.bar_chart(pd.Series(stats['salary_ranges'], name="Employees"), sort=False)
+
+@st.fragment
+def _transaction_stats_panel(transaction_manager):
+    """Transaction statistics on demand; reruns only this panel."""
+    import plotly.graph_objects as go
+    if st.button("📊 Show Transaction Statistics", key="transaction_stats"):
+        stats = _transaction_stats(transaction_manager.tenant_id, transaction_manager.repository.file_stamp())
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Total Transactions", stats['total_transactions'])
+        with col2:
+            st.metric("Total Amount", f"KES {stats['total_amount']:,.0f}")
+        with col3:
+            st.metric("Average Amount", f"KES {stats['average_amount']:,.0f}")
+        with col4:
+            pending_count = stats['by_status'].get('pending', 0)
+            st.metric("Pending", pending_count)
+
+        # Status breakdown
+        if stats['by_status']:
+            fig = go.Figure(go.Pie(
+                values=list(stats['by_status'].values()),
+                labels=list(stats['by_status'].keys())
+            ))
+            fig.update_layout(title="Transactions by Status")
+            st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def _payroll_history_panel(payroll_processor):
+    """Recent payroll runs on demand; reruns only this panel."""
+    if st.button("📊 Show Payroll History", key="payroll_history"):
+        runs = _payroll_runs(payroll_processor.tenant_id, payroll_processor.repository.file_stamp(), 5)
+        if runs:
+            st.markdown("### Recent Payroll Runs")
+            runs_data = []
+            for run in runs:
+                total_employees = len(run.get('employees', []))
+                runs_data.append({
+                    'Period': run.get('payroll_period'),
+                    'Employees': total_employees,
+                    'Status': run.get('status', 'Unknown'),
+                    'Created': run.get('created_at', '')[:10] if run.get('created_at') else 'Unknown'
+                })
+
+            st.table(pd.DataFrame(runs_data).convert_dtypes(dtype_backend="pyarrow"), hide_index=True)
+        else:
+            st.info("No payroll runs found")
+
+def _tenant_managers(tenant_id):
+    """
+    Vendor, employee, transaction and payroll managers for the tenant, built once
+    per session. Their repository caches are checked against the data-file stamps,
+    so they stay correct across reruns; session-scoped rather than cache_resource
+    because a session runs one script at a time, while shared instances would not.
+    """
+    key = f"_managers_{tenant_id}"
+    managers = st.session_state.get(key)
+    if managers is None:
+        from ledger.payroll.bulk_processor import PayrollBulkProcessor
+        managers = (
+            VendorManager(tenant_id),
+            EmployeeManager(tenant_id),
+            TransactionManager(tenant_id),
+            PayrollBulkProcessor(tenant_id),
+        )
+        st.session_state[key] = managers
+    return managers
+
 def show_bulk_data_management(user):
     """Comprehensive bulk data management with upload functionality for all modules."""
     
@@ -333,11 +492,8 @@ def show_bulk_data_management(user):
     
     tenant_id = user["tenant_id"]
     
-    # Initialize managers
-    vendor_manager = VendorManager(tenant_id)
-    employee_manager = EmployeeManager(tenant_id)
-    transaction_manager = TransactionManager(tenant_id)
-    payroll_processor = PayrollBulkProcessor(tenant_id)
+    # Managers kept for the session (see _tenant_managers)
+    vendor_manager, employee_manager, transaction_manager, payroll_processor = _tenant_managers(tenant_id)
     
     # Create tabs for different entity types
     entity_tabs = st.tabs([
@@ -382,26 +538,7 @@ def show_bulk_data_management(user):
         )
         
         # Show vendor stats
-        if st.button("📊 Show Vendor Statistics", key="vendor_stats"):
-            stats = vendor_manager.get_vendor_stats()
-            
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Total Vendors", stats['total_vendors'])
-            with col2:
-                st.metric("Active Vendors", stats['active_vendors'])
-            with col3:
-                st.metric("Avg Credit Limit", f"KES {stats['average_credit_limit']:,.0f}")
-            with col4:
-                st.metric("Avg Payment Terms", f"{stats['average_payment_terms']:.0f} days")
-            
-            if stats['by_tax_status']:
-                fig = px.pie(
-                    values=list(stats['by_tax_status'].values()),
-                    names=list(stats['by_tax_status'].keys()),
-                    title="Vendors by Tax Status"
-                )
-                st.plotly_chart(fig, use_container_width=True)
+        _vendor_stats_panel(vendor_manager)
     
     with entity_tabs[1]:  # Employees
         st.markdown("### 🏢 Employee Master Data Management")
@@ -428,36 +565,7 @@ def show_bulk_data_management(user):
         )
         
         # Show employee stats
-        if st.button("📊 Show Employee Statistics", key="employee_stats"):
-            stats = employee_manager.get_employee_stats()
-            
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Total Employees", stats['total_employees'])
-            with col2:
-                st.metric("Active Employees", stats['active_employees'])
-            with col3:
-                st.metric("Departments", len(stats['by_department']))
-            with col4:
-                st.metric("Avg Salary", f"KES {stats['average_salary']:,.0f}")
-            
-            # Department breakdown
-            if stats['by_department']:
-                fig = px.bar(
-                    x=list(stats['by_department'].keys()),
-                    y=list(stats['by_department'].values()),
-                    title="Employees by Department"
-                )
-                st.plotly_chart(fig, use_container_width=True)
-            
-            # Salary ranges
-            if stats['salary_ranges']:
-                fig = px.bar(
-                    x=list(stats['salary_ranges'].keys()),
-                    y=list(stats['salary_ranges'].values()),
-                    title="Salary Distribution"
-                )
-                st.plotly_chart(fig, use_container_width=True)
+        _employee_stats_panel(employee_manager)
     
     with entity_tabs[2]:  # Transactions
         st.markdown("### 💳 Transaction Data Management")
@@ -498,28 +606,7 @@ def show_bulk_data_management(user):
         )
         
         # Show transaction stats
-        if st.button("📊 Show Transaction Statistics", key="transaction_stats"):
-            stats = transaction_manager.get_transaction_stats()
-            
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Total Transactions", stats['total_transactions'])
-            with col2:
-                st.metric("Total Amount", f"KES {stats['total_amount']:,.0f}")
-            with col3:
-                st.metric("Average Amount", f"KES {stats['average_amount']:,.0f}")
-            with col4:
-                pending_count = stats['by_status'].get('pending', 0)
-                st.metric("Pending", pending_count)
-            
-            # Status breakdown
-            if stats['by_status']:
-                fig = px.pie(
-                    values=list(stats['by_status'].values()),
-                    names=list(stats['by_status'].keys()),
-                    title="Transactions by Status"
-                )
-                st.plotly_chart(fig, use_container_width=True)
+        _transaction_stats_panel(transaction_manager)
     
     with entity_tabs[3]:  # Payroll
         st.markdown("### 💰 Payroll Bulk Processing")
@@ -536,11 +623,13 @@ def show_bulk_data_management(user):
         # Generate pre-filled template
         if st.button("📋 Generate Payroll Template", key="generate_payroll_template"):
             with st.spinner("Generating payroll template..."):
-                template_df = payroll_processor.generate_payroll_template(payroll_period)
+                template_df, csv = _payroll_template(
+                    tenant_id, payroll_period,
+                    payroll_processor.employee_manager.repository.file_stamp()
+                )
                 st.success(f"✅ Generated template for {len(template_df)} employees")
                 
                 # Download template
-                csv = template_df.to_csv(index=False)
                 st.download_button(
                     label="💾 Download Pre-filled Template",
                     data=csv,
@@ -601,23 +690,7 @@ def show_bulk_data_management(user):
         )
         
         # Show recent payroll runs
-        if st.button("📊 Show Payroll History", key="payroll_history"):
-            runs = payroll_processor.get_payroll_runs(limit=5)
-            if runs:
-                st.markdown("### Recent Payroll Runs")
-                runs_data = []
-                for run in runs:
-                    total_employees = len(run.get('employees', []))
-                    runs_data.append({
-                        'Period': run.get('payroll_period'),
-                        'Employees': total_employees,
-                        'Status': run.get('status', 'Unknown'),
-                        'Created': run.get('created_at', '')[:10] if run.get('created_at') else 'Unknown'
-                    })
-                
-                st.dataframe(pd.DataFrame(runs_data), use_container_width=True)
-            else:
-                st.info("No payroll runs found")
+        _payroll_history_panel(payroll_processor)
     
     with entity_tabs[4]:  # Analytics
         st.markdown("### 📊 Upload Analytics & Audit Trail")
@@ -632,7 +705,7 @@ def show_bulk_data_management(user):
         with col3:
             st.metric("Transactions", transaction_manager.repository.get_count())
         with col4:
-            payroll_runs = len(payroll_processor.get_payroll_runs(limit=100))
+            payroll_runs = len(_payroll_runs(payroll_processor.tenant_id, payroll_processor.repository.file_stamp(), 100))
             st.metric("Payroll Runs", payroll_runs)
         
         # Recent upload activity (placeholder - would be implemented with audit logger)
@@ -659,19 +732,20 @@ def show_bulk_data_management(user):
             # Company distribution by industry
             industries = ['Manufacturing', 'Logistics', 'Waste Management']
             counts = [1, 1, 1]
-            fig = px.bar(x=industries, y=counts, title="Companies by Industry")
-            fig.update_layout(height=300)
-            st.plotly_chart(fig, use_container_width=True)
+            st.markdown("**Companies by Industry**")
+            st.bar_chart(pd.Series(counts, index=industries, name="Companies"), sort=False, height=300)
             
         with sys_col2:
             # System usage metrics
             metrics = ['Active Sessions', 'API Calls', 'Data Processing', 'Reports Generated']
             values = [8, 342, 156, 23]
-            fig = px.bar(x=metrics, y=values, title="Today's System Usage")
-            fig.update_layout(height=300)
-            st.plotly_chart(fig, use_container_width=True)
+            st.markdown("**Today's System Usage**")
+            st.bar_chart(pd.Series(values, index=metrics, name="Count"), sort=False, height=300)
 
 def show_integrations(user):
+    from ledger.integrations.connectors import QuickBooksConnector, ExcelConnector, APIConnector
+    from ledger.core.utils import dumps_json
+    
     st.markdown('<div class="main-header"><h3>🔗 External Integrations</h3><p>Connect with QuickBooks, Excel, APIs, and other financial systems</p></div>', unsafe_allow_html=True)
     
     tid = user["tenant_id"]
@@ -740,24 +814,23 @@ def show_integrations(user):
                         f.write(uploaded_file.getbuffer())
                     
                     ex = ExcelConnector(tid)
-                    records = ex.load_excel(str(tmp))
+                    df = ex.load_frame(str(tmp))
                     
-                    st.success(f"✅ Successfully processed {len(records)} records")
+                    st.success(f"✅ Successfully processed {len(df)} records")
                     
-                    if records:
+                    if len(df):
                         st.markdown("#### Data Preview")
-                        df = pd.DataFrame(records)
                         st.dataframe(df.head(10), use_container_width=True)
                         
                         # Data quality insights
                         st.markdown("#### Data Quality Report")
                         qual_col1, qual_col2, qual_col3 = st.columns(3)
                         with qual_col1:
-                            st.metric("Total Records", len(records))
+                            st.metric("Total Records", len(df))
                         with qual_col2:
-                            st.metric("Columns", len(df.columns) if len(records) > 0 else 0)
+                            st.metric("Columns", len(df.columns))
                         with qual_col3:
-                            missing_pct = (df.isnull().sum().sum() / (len(df) * len(df.columns)) * 100) if len(records) > 0 else 0
+                            missing_pct = df.isna().to_numpy().sum() / df.size * 100 if df.size else 0
                             st.metric("Data Completeness", f"{100-missing_pct:.1f}%")
     
     with tab3:
@@ -765,7 +838,8 @@ def show_integrations(user):
         
         api_col1, api_col2 = st.columns(2)
         with api_col1:
-            api_url = st.text_input("🌐 API Endpoint", placeholder="https://api.example.com/data")
+            api_url = st.text_input("🌐 API Endpoint", placeholder="https://api.example.com/data",
+                                    help="Separate several endpoints (e.g. result pages) with spaces to fetch them together")
             auth_type = st.selectbox("Authentication", ["None", "API Key", "Bearer Token", "Basic Auth"])
         
         with api_col2:
@@ -781,16 +855,17 @@ def show_integrations(user):
             else:
                 st.error("⚠️ Please provide an API URL")
         
-        if st.button("📥 Fetch Data", type="primary") and api_url:
+        if st.button("📥 Fetch Data", type="primary") and api_url.strip():
             with st.spinner("Fetching data from API..."):
                 api = APIConnector(tid)
                 try:
-                    records = api.fetch_from_api(api_url)
+                    urls = api_url.split()
+                    records = api.fetch_pages(urls) if len(urls) > 1 else api.fetch_from_api(urls[0])
                     st.success(f"✅ Successfully fetched {len(records)} records from API")
                     
                     if records:
                         st.markdown("#### API Response Preview")
-                        st.json(records[:3])  # Show first 3 records
+                        st.code(dumps_json(records[:3]), language="json")  # Show first 3 records
                         
                 except Exception as e:
                     st.error(f"❌ API fetch failed: {str(e)}")
@@ -811,6 +886,58 @@ def show_integrations(user):
         if st.button("💾 Save Settings"):
             st.success("✅ Integration settings saved successfully!")
 
+def _staging_preview(path, rows: int = 20):
+    """(records, fields, null cells, first rows) of a staged JSON file.
+
+    The staging file is a JSON array, which pyarrow.json cannot read, so it is
+    parsed with read_json and counted on an Arrow table; only the preview rows
+    are converted to pandas.
+    """
+    import pyarrow as pa
+    from ledger.core.utils import read_json
+    records = read_json(path)
+    try:
+        # a struct array takes the union of keys over all rows; from_pandas maps NaN to null
+        tbl = pa.Table.from_struct_array(pa.array(records, from_pandas=True))
+    except (pa.ArrowException, TypeError, ValueError):
+        df = pd.DataFrame(records)  # mixed-type fields: count in pandas instead
+        return len(df), len(df.columns), int(df.isna().to_numpy().sum()), df.head(rows)
+    nulls = sum(col.null_count for col in tbl.columns)
+    return tbl.num_rows, tbl.num_columns, nulls, tbl.slice(0, rows).to_pandas(types_mapper=pd.ArrowDtype)
+
+def _ingest_batch(tid, files):
+    """Ingest several uploads in one go: parse/OCR in parallel, stage together."""
+    import os, tempfile
+    paths = []
+    with st.spinner(f"Processing {len(files)} files..."):
+        try:
+            for file in files:
+                with tempfile.NamedTemporaryFile(delete=False, suffix="." + file.name.split(".")[-1]) as tmp:
+                    tmp.write(file.getbuffer())
+                    paths.append(tmp.name)
+            results = IngestionEngine(tid).ingest_many(paths)
+        finally:
+            for path in paths:
+                os.unlink(path)
+    
+    staged = None
+    for file, res in zip(files, results):
+        if res["mode"] == "structured":
+            st.success(f"✅ {file.name}: {res['count']} records extracted")
+            staged = res["file"]
+        elif res["mode"] == "ocr":
+            st.success(f"✅ {file.name}: OCR processing completed")
+            with st.expander(f"📝 Extracted Information: {file.name}"):
+                st.json(res["parsed"])
+        else:
+            st.error(f"❌ {file.name}: ingestion failed: {res['error']}")
+    
+    if staged:
+        n_rows, n_cols, n_nulls, head = _staging_preview(staged)
+        completeness = (1 - n_nulls / (n_rows * n_cols)) * 100 if n_rows and n_cols else 100.0
+        st.markdown(f"#### Staged Data ({n_rows} records, {completeness:.1f}% complete)")
+        st.dataframe(head, use_container_width=True)
+
 def show_ingestion(user):
     st.markdown('<div class="main-header"><h3>📥 Unified Data Ingestion</h3><p>AI-powered document processing with OCR, structured data parsing, and intelligent extraction</p></div>', unsafe_allow_html=True)
     
@@ -847,8 +974,12 @@ def show_ingestion(user):
         extract_mode = st.selectbox("Extraction Mode", ["Smart AI", "Template-based", "Manual Review"])
         confidence_threshold = st.slider("Confidence Threshold", 0.5, 1.0, 0.8)
     
+    files = uploaded if isinstance(uploaded, list) else [uploaded] if uploaded else []
+    if len(files) > 1 and st.button(f"🚀 Process all {len(files)} files", key="process_all", type="primary"):
+        _ingest_batch(tid, files)
+    
     if uploaded:
-        for file in uploaded if isinstance(uploaded, list) else [uploaded]:
+        for file in files:
             st.markdown(f"---")
             st.markdown(f"### Processing: {file.name}")
             
@@ -879,20 +1010,20 @@ def show_ingestion(user):
                                 st.success(f"✅ Structured file processed: {res['count']} records extracted")
                                 
                                 # Load and display data with enhanced formatting
-                                df = pd.read_json(res["file"])
+                                n_rows, n_cols, n_nulls, head = _staging_preview(res["file"])
                                 
                                 # Data quality metrics
                                 qual_col1, qual_col2, qual_col3 = st.columns(3)
                                 with qual_col1:
-                                    st.metric("Records", len(df))
+                                    st.metric("Records", n_rows)
                                 with qual_col2:
-                                    st.metric("Fields", len(df.columns))
+                                    st.metric("Fields", n_cols)
                                 with qual_col3:
-                                    completeness = (1 - df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100
+                                    completeness = (1 - n_nulls / (n_rows * n_cols)) * 100 if n_rows and n_cols else 100.0
                                     st.metric("Completeness", f"{completeness:.1f}%")
                                 
                                 st.markdown("#### Extracted Data")
-                                st.dataframe(df.head(20), use_container_width=True)
+                                st.dataframe(head, use_container_width=True)
                                 
                             else:
                                 st.success("✅ OCR processing completed successfully")
@@ -943,6 +1074,14 @@ def show_ingestion(user):
     
     st.dataframe(pd.DataFrame(history_data), use_container_width=True, hide_index=True)
 
+def _recon_frame(results, with_reason=False):
+    """Staging date/amount/vendor (and match reason) of reconciliation results,
+    built column by column rather than from one dict per row."""
+    staging=[r["staging"] for r in results]
+    cols={k:[rec.get(k) for rec in staging] for k in ("date","amount","vendor")}
+    if with_reason: cols["reason"]=[",".join(r["reason"]) for r in results]
+    return pd.DataFrame(cols)
+
 def show_reconciliation(user):
     st.subheader("Reconciliation")
     tid=user["tenant_id"]
@@ -955,44 +1094,59 @@ def show_reconciliation(user):
         unmatched=[r for r in report["matches"] if not r["match"]]
         st.markdown("### Matches")
         if matches: 
-            st.dataframe(pd.DataFrame([{"date":m["staging"].get("date"),"amount":m["staging"].get("amount"),"vendor":m["staging"].get("vendor"),"reason":",".join(m["reason"])} for m in matches]))
+            st.dataframe(_recon_frame(matches, with_reason=True))
         else: st.info("No matches")
         st.markdown("### Unmatched")
         if unmatched: 
-            st.dataframe(pd.DataFrame([{"date":m["staging"].get("date"),"amount":m["staging"].get("amount"),"vendor":m["staging"].get("vendor")} for m in unmatched]))
+            st.dataframe(_recon_frame(unmatched))
         else: st.info("No unmatched records")
 
 def show_posting(user):
     st.subheader("Ledger Posting")
     tid=user["tenant_id"]
-    recon_file=Path("data/reconcile")/f"{tid}_recon.json"
+    recon_file=latest_recon(tid)
     lp=LedgerPosting(tid)
-    if recon_file.exists():
+    if recon_file is not None:
         if st.button("Post reconciled transactions"):
             posted=lp.post_from_reconciliation(recon_file)
             st.success(f"Posted {len(posted)} entries to journal")
     journal=lp.load_journal()
     if journal:
         st.markdown("### Journal Entries")
-        st.dataframe(pd.DataFrame(journal).tail(20))
+        # only the tail is shown: frame just those rows, keeping their journal positions
+        tail=journal[-20:]
+        st.dataframe(pd.DataFrame(tail,index=range(len(journal)-len(tail),len(journal))))
+
+def _journal_stamp(lp):
+    stat=lp.file.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+# Journal-derived reports cached per tenant and journal stamp, like the entity
+# statistics: posting an entry changes the stamp and the next run recomputes
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def _financial_reports(tenant_id, stamp):
+    fr=FinancialReports(tenant_id)
+    return fr.trial_balance(), fr.balance_sheet(), fr.profit_and_loss()
+
+@st.cache_data(ttl=300, max_entries=16, show_spinner=False)
+def _fraud_scores(tenant_id, stamp):
+    from ledger.ml.fraud import FraudDetector
+    return FraudDetector(tenant_id).detect()
 
 def show_reports(user):
     st.subheader("Financial Reports")
     tid=user["tenant_id"]
-    fr=FinancialReports(tid)
+    tb,bs,pl=_financial_reports(tid,_journal_stamp(LedgerPosting(tid)))
 
     st.markdown("### Trial Balance")
-    tb=fr.trial_balance()
     if not tb.empty:
         st.dataframe(tb)
     else: st.info("No journal entries yet")
 
     st.markdown("### Balance Sheet")
-    bs=fr.balance_sheet()
     st.json(bs)
 
     st.markdown("### Profit & Loss")
-    pl=fr.profit_and_loss()
     st.json(pl)
 
 def show_payroll(user):
@@ -1009,7 +1163,62 @@ def show_payroll(user):
         vat=KenyanVAT().compute_vat(amt)
         st.success(f"VAT (16%) on {amt} = {vat} KES")
 
+_FORECAST_COLUMNS = {"ds": "Date", "yhat": "Forecast", "yhat_lower": "Lower Bound", "yhat_upper": "Upper Bound"}
+_FORECAST_COLUMN_CONFIG = {
+    "Date": st.column_config.DateColumn(format="YYYY-MM-DD"),
+    **{label: st.column_config.NumberColumn(format="KES %,.0f")
+       for label in ("Forecast", "Lower Bound", "Upper Bound")},
+}
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _forecast_figure(k, df, forecast_periods, show_confidence):
+    """Plotly chart for one forecast series, cached on the frame and chart options."""
+    import plotly.graph_objects as go
+    fig = go.Figure()
+
+    # Main forecast line
+    fig.add_trace(go.Scatter(
+        x=df["ds"],
+        y=df["yhat"],
+        mode='lines+markers',
+        name=f'{k} Forecast',
+        line=dict(color='#3b82f6', width=3),
+        marker=dict(size=6)
+    ))
+
+    # Confidence intervals if available and requested
+    if show_confidence and "yhat_lower" in df.columns:
+        fig.add_trace(go.Scatter(
+            x=df["ds"],
+            y=df["yhat_upper"],
+            fill=None,
+            mode='lines',
+            line_color='rgba(0,0,0,0)',
+            showlegend=False
+        ))
+
+        fig.add_trace(go.Scatter(
+            x=df["ds"],
+            y=df["yhat_lower"],
+            fill='tonexty',
+            mode='lines',
+            line_color='rgba(0,0,0,0)',
+            name='Confidence Interval',
+            fillcolor='rgba(59, 130, 246, 0.2)'
+        ))
+
+    fig.update_layout(
+        title=f"{k} Forecast - Next {forecast_periods} Periods",
+        xaxis_title="Date",
+        yaxis_title="Amount (KES)",
+        height=400,
+        hovermode='x unified'
+    )
+    return fig
+
 def show_forecast(user):
+    from ledger.ml.forecast import ForecastEngine
+    
     st.markdown('<div class="main-header"><h3>🔮 AI-Powered Financial Forecasting</h3><p>Machine Learning predictions for revenue, expenses, and cash flow</p></div>', unsafe_allow_html=True)
     
     tid = user["tenant_id"]
@@ -1037,9 +1246,9 @@ def show_forecast(user):
                 with tabs[i]:
                     # Enhanced metrics for each forecast
                     if len(df) > 0:
-                        current_value = df["yhat"].iloc[0] if len(df) > 0 else 0
-                        avg_forecast = df["yhat"].mean()
-                        trend = "Increasing" if df["yhat"].iloc[-1] > df["yhat"].iloc[0] else "Decreasing"
+                        yhat = df["yhat"].to_numpy(dtype=float)
+                        current_value, avg_forecast = yhat[0], np.nanmean(yhat)  # skips NaN like Series.mean
+                        trend = "Increasing" if yhat[-1] > yhat[0] else "Decreasing"
                         
                         metric_col1, metric_col2, metric_col3 = st.columns(3)
                         with metric_col1:
@@ -1050,62 +1259,18 @@ def show_forecast(user):
                             st.metric("🔄 Trend", trend)
                         
                         # Enhanced interactive chart
-                        fig = go.Figure()
-                        
-                        # Main forecast line
-                        fig.add_trace(go.Scatter(
-                            x=df["ds"],
-                            y=df["yhat"],
-                            mode='lines+markers',
-                            name=f'{k} Forecast',
-                            line=dict(color='#3b82f6', width=3),
-                            marker=dict(size=6)
-                        ))
-                        
-                        # Confidence intervals if available and requested
-                        if show_confidence and "yhat_lower" in df.columns:
-                            fig.add_trace(go.Scatter(
-                                x=df["ds"],
-                                y=df["yhat_upper"],
-                                fill=None,
-                                mode='lines',
-                                line_color='rgba(0,0,0,0)',
-                                showlegend=False
-                            ))
-                            
-                            fig.add_trace(go.Scatter(
-                                x=df["ds"],
-                                y=df["yhat_lower"],
-                                fill='tonexty',
-                                mode='lines',
-                                line_color='rgba(0,0,0,0)',
-                                name='Confidence Interval',
-                                fillcolor='rgba(59, 130, 246, 0.2)'
-                            ))
-                        
-                        fig.update_layout(
-                            title=f"{k} Forecast - Next {forecast_periods} Periods",
-                            xaxis_title="Date",
-                            yaxis_title="Amount (KES)",
-                            height=400,
-                            hovermode='x unified'
-                        )
+                        fig = _forecast_figure(k, df, forecast_periods, show_confidence)
                         
                         st.plotly_chart(fig, use_container_width=True)
                         
                         # Detailed forecast table
                         st.markdown(f"### 📁 {k} Forecast Details")
-                        display_df = df.copy()
-                        display_df["ds"] = pd.to_datetime(display_df["ds"]).dt.strftime("%Y-%m-%d")
-                        display_df["yhat"] = display_df["yhat"].apply(lambda x: f"KES {x:,.0f}")
-                        if "yhat_lower" in display_df.columns:
-                            display_df["yhat_lower"] = display_df["yhat_lower"].apply(lambda x: f"KES {x:,.0f}")
-                            display_df["yhat_upper"] = display_df["yhat_upper"].apply(lambda x: f"KES {x:,.0f}")
-                            display_df.columns = ["Date", "Forecast", "Lower Bound", "Upper Bound"]
-                        else:
-                            display_df.columns = ["Date", "Forecast"]
+                        # dates and amounts stay typed; the frontend renders both formats
+                        display_df = df.head(12).rename(columns=_FORECAST_COLUMNS)
+                        display_df["Date"] = pd.to_datetime(display_df["Date"])
                         
-                        st.dataframe(display_df.head(12), use_container_width=True, hide_index=True)
+                        st.dataframe(display_df, use_container_width=True, hide_index=True,
+                                     column_config=_FORECAST_COLUMN_CONFIG)
     
     # Additional forecast tools
     st.markdown("---")
@@ -1128,53 +1293,59 @@ def show_forecast(user):
 def show_fraud(user):
     st.subheader("Fraud Detection & Anomaly Alerts")
     tid=user["tenant_id"]
-    fd=FraudDetector(tid)
     if st.button("Run Fraud Detection"):
-        df=fd.detect()
+        df=_fraud_scores(tid,_journal_stamp(LedgerPosting(tid)))
         if not df.empty:
             st.dataframe(df[["date","amount","vendor","anomaly"]].tail(50))
             st.success("Fraud detection complete")
         else:
             st.info("No transactions to analyze")
 
-def main():
-    if "user" not in st.session_state:
-        login_form()
-        return
-    
-    user = st.session_state["user"]
-    
-    # Show user dashboard with welcome message
-    show_user_dashboard(user)
-    
-    # Determine user access level
-    roles = [r.split(":")[1] if ":" in r else r for r in user.get("roles", [])]
-    
-    # Create navigation based on user permissions
+def _nav_pages(roles):
+    """Navigation entries available to the given role names."""
     if "superadmin" in roles:
         # Superadmin has access to everything plus system management
-        tab = st.sidebar.radio("🧭 Navigation", [
+        return [
             "📊 Dashboard", "📁 Bulk Data", "📥 Ingestion", "🔄 Reconciliation", "📋 Posting", 
             "📈 Reports", "💰 Payroll/Tax", "🔮 Forecasting", "🚨 Fraud Detection", 
             "🔌 Integrations", "⚙️ System Admin"
-        ])
+        ]
     elif "ceo" in roles or "finance_manager" in roles:
         # CEO and Finance Manager have access to all business functions
-        tab = st.sidebar.radio("🧭 Navigation", [
+        return [
             "📊 Dashboard", "📁 Bulk Data", "📥 Ingestion", "🔄 Reconciliation", "📋 Posting", 
             "📈 Reports", "💰 Payroll/Tax", "🔮 Forecasting", "🚨 Fraud Detection", 
             "🔌 Integrations"
-        ])
+        ]
     elif "account_manager" in roles:
         # Account Manager has limited access
-        tab = st.sidebar.radio("🧭 Navigation", [
+        return [
             "📊 Dashboard", "📁 Bulk Data", "📥 Ingestion", "🔄 Reconciliation", "📋 Posting", "📈 Reports"
-        ])
+        ]
     else:
         # Default limited access
-        tab = st.sidebar.radio("🧭 Navigation", [
-            "📊 Dashboard", "📈 Reports"
-        ])
+        return ["📊 Dashboard", "📈 Reports"]
+
+def _go_to_page(page):
+    # Runs as a widget callback, before the script, so the navigation radio
+    # picks the page up in the same rerun
+    st.session_state["nav_page"] = page
+
+def main():
+    if "user" not in st.session_state:
+        login_form()
+        return
+    
+    user = st.session_state["user"]
+    
+    # Show user dashboard with welcome message
+    show_user_dashboard(user)
+    
+    # Determine user access level
+    roles = user.get("_parsed_roles") or _parse_roles(user)
+    
+    # Create navigation based on user permissions
+    tab = st.sidebar.radio("🧭 Navigation", _nav_pages(roles), key="nav_page")
     
     # Route to appropriate function based on selection
     if tab == "📊 Dashboard":
@@ -1202,41 +1373,38 @@ def main():
 
 def show_system_admin(user):
     """System administration panel for superadmin"""
-    if "superadmin" not in [r.split(":")[1] if ":" in r else r for r in user.get("roles", [])]:
+    if "superadmin" not in (user.get("_parsed_roles") or _parse_roles(user)):
         st.error("🚫 Access Denied: Superadmin privileges required")
         return
         
     st.subheader("⚙️ System Administration")
     
-    rm = RoleManager()
+    rm = get_role_manager()
     
     tab1, tab2, tab3 = st.tabs(["👥 Users", "🏢 Companies", "📊 System Stats"])
     
     with tab1:
         st.markdown("### 👥 User Management")
-        users_df = pd.DataFrame([
-            {
-                "Email": user["email"],
-                "Company": rm.tenants.get(user.get("tenant_id", ""), {}).get("name", "System"),
-                "Roles": ", ".join([r.split(":")[1] if ":" in r else r for r in user.get("roles", [])]),
-                "Created": user.get("created_at", "Unknown")[:10]
-            }
-            for user in rm.users.values()
-        ])
+        users = list(rm.users.values())
+        tenant_names = {tid: tenant.get("name", "System") for tid, tenant in rm.tenants.items()}
+        users_df = pd.DataFrame({
+            "Email": [u["email"] for u in users],
+            "Company": [tenant_names.get(u.get("tenant_id", ""), "System") for u in users],
+            "Roles": [", ".join(_parse_roles(u)) for u in users],
+            "Created": [u.get("created_at", "Unknown")[:10] for u in users],
+        })
         st.dataframe(users_df, use_container_width=True)
     
     with tab2:
         st.markdown("### 🏢 Company Management") 
         if rm.tenants:
-            tenants_df = pd.DataFrame([
-                {
-                    "Company Name": tenant["name"],
-                    "Industry": tenant["industry"].title(),
-                    "Created": tenant.get("created_at", "Unknown")[:10],
-                    "ID": tid
-                }
-                for tid, tenant in rm.tenants.items()
-            ])
+            tenants = rm.tenants
+            tenants_df = pd.DataFrame({
+                "Company Name": [t["name"] for t in tenants.values()],
+                "Industry": [t["industry"].title() for t in tenants.values()],
+                "Created": [t.get("created_at", "Unknown")[:10] for t in tenants.values()],
+                "ID": list(tenants),
+            })
             st.dataframe(tenants_df, use_container_width=True)
         else:
             st.info("No companies registered yet")
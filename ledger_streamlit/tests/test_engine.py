@@ -1,6 +1,7 @@
 
 from ledger.ingest.engine import IngestionEngine
-import pandas as pd, json
+from ledger.core.utils import read_json
+import pandas as pd
 
 def test_engine_structured(tmp_path):
     df=pd.DataFrame([{"Date":"12/09/2025","Amount":"5000","Vendor":"Safaricom"}])
@@ -8,7 +9,7 @@ def test_engine_structured(tmp_path):
     eng=IngestionEngine("demo-tenant")
     res=eng.ingest(str(file))
     assert res["mode"]=="structured"
-    data=json.load(open(res["file"]))
+    data=read_json(res["file"])
     assert data[0]["vendor"]=="Safaricom"
 
 def test_engine_ocr(tmp_path):
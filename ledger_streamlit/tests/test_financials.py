@@ -16,3 +16,14 @@ def test_trial_balance_and_reports(tmp_path):
     pl=fr.profit_and_loss()
     assert abs(pl["Revenue"]-5000.0)<0.01
     assert abs(pl["Expenses"]-2000.0)<0.01
+
+def test_balance_sheet_assets_are_the_1000_accounts():
+    import uuid
+    tid=f"fin-{uuid.uuid4().hex[:8]}"
+    lp=LedgerPosting(tid)
+    lp.post_entry("2025-09-12","Sale","1000","4000",5000.0,"TX001")
+    lp.post_entry("2025-09-12","Deposit","1200","3000",700.0,"TX002")
+    bs=FinancialReports(tid).balance_sheet()
+    assert abs(bs["Assets"]-5000.0)<0.01
+    assert abs(bs["Equity"]-700.0)<0.01
+
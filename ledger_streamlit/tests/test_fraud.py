@@ -11,3 +11,34 @@ def test_fraud_detection_flags_outliers():
     df=fd.detect(contamination=0.5)
     assert "anomaly" in df.columns
     assert any(df["anomaly"]=="Suspicious")
+
+def test_fraud_model_reused_for_small_appends():
+    from ledger.ml import fraud
+    tid="fraud-refit-tenant"
+    lp=LedgerPosting(tid)
+    lp.file.write_text("[]")
+    for i in range(20): lp.post_entry("2025-01-01","Txn","5000","1000",1000.0+i)
+    fd=FraudDetector(tid)
+    fd.detect()
+    first=fraud._MODELS[(tid,0.05)][2]
+    lp.post_entry("2025-01-03","Txn","5000","1000",1010.0)
+    df=fd.detect()
+    assert len(df)==21 and fraud._MODELS[(tid,0.05)][2] is first
+    for i in range(5): lp.post_entry("2025-01-04","Txn","5000","1000",1000.0)
+    fd.detect()
+    assert fraud._MODELS[(tid,0.05)][2] is not first
+
+def test_fraud_models_evicted_least_recently_used(monkeypatch):
+    from collections import OrderedDict
+    from ledger.ml import fraud
+    monkeypatch.setattr(fraud,"_MODELS",OrderedDict())
+    monkeypatch.setattr(fraud,"_MODELS_SIZE",2)
+    tid="fraud-lru-tenant"
+    lp=LedgerPosting(tid)
+    lp.file.write_text("[]")
+    for i in range(20): lp.post_entry("2025-01-01","Txn","5000","1000",1000.0+i)
+    fd=FraudDetector(tid)
+    fd.detect(contamination=0.05); fd.detect(contamination=0.1)
+    fd.detect(contamination=0.05)  # reuse moves it to the back
+    fd.detect(contamination=0.2)
+    assert list(fraud._MODELS)==[(tid,0.05),(tid,0.2)]
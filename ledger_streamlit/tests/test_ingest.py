@@ -1,7 +1,8 @@
 
 from ledger.ingest.parser import IngestionParser
+from ledger.core.utils import read_json
 import pandas as pd
-import tempfile, json
+import tempfile
 
 def test_parser_csv(tmp_path):
     df=pd.DataFrame([
@@ -14,5 +15,41 @@ def test_parser_csv(tmp_path):
     assert len(recs)==2
     assert recs[0]["amount"]==10000.0
     path=parser.save_to_staging(recs)
-    saved=json.load(open(path))
+    saved=read_json(path)
     assert saved[0]["vendor"]=="Eco Waste"
+
+def test_parser_reuses_parse_for_identical_file(tmp_path, monkeypatch):
+    from ledger.ingest import parser as parser_mod
+    monkeypatch.setattr(parser_mod,"PARSE_CACHE_DIR",tmp_path/"cache")
+    calls=[]
+    real=IngestionParser._parse_table
+    monkeypatch.setattr(IngestionParser,"_parse_table",lambda self,path,ext: calls.append(path) or real(self,path,ext))
+    parser=IngestionParser("demo-tenant")
+    a=tmp_path/"a.csv"; a.write_text("Date,Amount,Vendor\n12/09/2025,\"10,000\",Eco Waste\n")
+    b=tmp_path/"b.csv"; b.write_bytes(a.read_bytes())
+    assert parser.parse_file(str(a))==parser.parse_file(str(b))
+    assert parser.parse_file(str(b))[0]["amount"]==10000.0
+    assert len(calls)==1
+
+def test_engine_ingest_many(tmp_path):
+    from ledger.ingest.engine import IngestionEngine
+    a=tmp_path/"a.csv"; pd.DataFrame([{"Date":"12/09/2025","Amount":"100","Vendor":"A"}]).to_csv(a,index=False)
+    b=tmp_path/"b.csv"; pd.DataFrame([{"Date":"13/09/2025","Amount":"200","Vendor":"B"}]*2).to_csv(b,index=False)
+    bad=tmp_path/"c.doc"; bad.write_text("x")
+    res=IngestionEngine("demo-tenant").ingest_many([str(a),str(bad),str(b)])
+    assert [r["mode"] for r in res]==["structured","error","structured"]
+    assert res[0]["count"]==1 and res[2]["count"]==2
+    saved=read_json(res[0]["file"])
+    assert [r["vendor"] for r in saved]==["A","B","B"]
+
+def test_engine_ingest_many_duplicate_files(tmp_path, monkeypatch):
+    from ledger.ingest import parser as parser_mod
+    from ledger.ingest.engine import IngestionEngine
+    a=tmp_path/"a.csv"; pd.DataFrame([{"Date":"12/09/2025","Amount":"100","Vendor":"A"}]).to_csv(a,index=False)
+    for run in range(5):
+        # a cold cache each run, so every worker parses and writes the same entry
+        monkeypatch.setattr(parser_mod,"PARSE_CACHE_DIR",tmp_path/f"cache{run}")
+        res=IngestionEngine("demo-tenant").ingest_many([str(a)]*8)
+        assert [r["mode"] for r in res]==["structured"]*8
+        assert not list((tmp_path/f"cache{run}").rglob("*.tmp"))
+
@@ -15,9 +15,31 @@ def test_excel_connector(tmp_path):
     records=ex.load_excel(str(path))
     assert records and records[0]["vendor"]=="Excel Vendor"
 
+def test_excel_connector_reads_csv(tmp_path):
+    path=tmp_path/"test.csv"
+    path.write_text("date,amount,vendor\n2025-09-12,5000,CSV Vendor\n2025-09-13,,CSV Vendor\n")
+    df=ExcelConnector("demo-tenant").load_frame(str(path))
+    assert len(df)==2 and df["vendor"].iloc[0]=="CSV Vendor"
+    assert df["amount"].isna().sum()==1
+
 def test_api_connector(requests_mock):
     url="http://fakeapi.com/data"
     requests_mock.get(url,json=[{"date":"2025-09-12","amount":7500,"vendor":"API Vendor"}])
     api=APIConnector("demo-tenant")
     records=api.fetch_from_api(url)
     assert records and records[0]["vendor"]=="API Vendor"
+
+def test_api_connector_fetch_pages(requests_mock):
+    for page in (1,2,3):
+        requests_mock.get(f"http://fakeapi.com/data?page={page}",json=[{"amount":page*100,"vendor":f"Vendor {page}"}])
+    api=APIConnector("demo-tenant")
+    records=api.fetch_pages([f"http://fakeapi.com/data?page={p}" for p in (1,2,3)])
+    assert [r["vendor"] for r in records]==["Vendor 1","Vendor 2","Vendor 3"]
+
+def test_quickbooks_staging_roundtrip():
+    from ledger.reconcile.engine import ReconciliationEngine
+    qb=QuickBooksConnector("demo-tenant")
+    path=qb.save_to_staging(qb.fetch_invoices())
+    assert path.suffix==".parquet"
+    staged=ReconciliationEngine("demo-tenant").load_staging()
+    assert staged[0]["reference"]=="QB123"
@@ -1,18 +1,31 @@
 
-import json, numpy as np
+import numpy as np
 from pathlib import Path
 from ledger.ml.anomaly import AnomalyDetector
 from ledger.ml.classifier import ClassifierWrapper
+from ledger.core.utils import read_json
 
 def test_anomaly_detects_outliers():
     f=next(Path(__file__).resolve().parents[2].glob("data/transactions/*_transactions.json"))
     tid=f.stem.split("_")[0]
-    txs=json.load(open(f))
+    txs=read_json(f)
     ad=AnomalyDetector(tid)
     ad.train(txs,contamination=0.02)
     res=ad.score(txs)
     assert any(r["is_anomaly"] for r in res)
 
+def test_anomaly_train_reuses_saved_forest(monkeypatch):
+    from ledger.ml import anomaly
+    txs=[{"id":i,"amount":100+i,"date_dom":1+i%28,"vendor":"V"} for i in range(50)]
+    ad=AnomalyDetector("reuse-tenant")
+    ad.train(txs,contamination=0.02)
+    fits=[]
+    monkeypatch.setattr(anomaly.IsolationForest,"fit",lambda self,X: fits.append(X) or self)
+    AnomalyDetector("reuse-tenant").train(txs,contamination=0.02)
+    assert not fits
+    AnomalyDetector("reuse-tenant").train(txs,contamination=0.05)
+    assert len(fits)==1
+
 def test_classifier_basic():
     X=np.array([[1,2],[2,3],[100,5]])
     y=np.array([0,0,1])
@@ -20,3 +33,9 @@ def test_classifier_basic():
     cw.train(X,y)
     out=cw.predict(np.array([[1.5,2.5],[150,6]]))
     assert "predictions" in out and len(out["predictions"])==2
+
+def test_classifier_proba_on_request():
+    cw=ClassifierWrapper("testtenant")
+    cw.train(np.array([[1,2],[2,3],[100,5],[120,6]]),np.array([0,0,1,1]))
+    assert cw.predict(np.array([[1.5,2.5]]))["probabilities"] is None
+    assert cw.predict(np.array([[1.5,2.5]]),with_proba=True)["probabilities"].shape==(1,2)
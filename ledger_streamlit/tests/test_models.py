@@ -1,6 +1,6 @@
 
 import uuid
-from ledger.db.session import init_db, SessionLocal
+from ledger.db.session import init_db, SessionLocal, bulk_create
 from ledger.db.models import Tenant, User, Role, JournalEntry
 import pytest
 
@@ -25,19 +25,17 @@ def test_tenant_and_user_crud(tmp_path):
 
 def test_role_assignment_and_isolation():
     db = SessionLocal()
-    # create two tenants
-    t1 = Tenant(id=str(uuid.uuid4()), name="A", industry="x"); db.add(t1)
-    t2 = Tenant(id=str(uuid.uuid4()), name="B", industry="y"); db.add(t2)
-    db.commit()
-    # roles for tenant A
+    # two tenants, a role for tenant A, one user per tenant: one transaction
+    t1 = Tenant(id=str(uuid.uuid4()), name="A", industry="x")
+    t2 = Tenant(id=str(uuid.uuid4()), name="B", industry="y")
     r1 = Role(id=str(uuid.uuid4()), tenant_id=t1.id, name="finance", permissions=["ledger.*"])
-    db.add(r1); db.commit()
-    # user in tenant A
-    u1 = User(id=str(uuid.uuid4()), tenant_id=t1.id, email="u1@a.local", password_hash="x"); db.add(u1); db.commit()
+    u1 = User(id=str(uuid.uuid4()), tenant_id=t1.id, email="u1@a.local", password_hash="x")
+    u2 = User(id=str(uuid.uuid4()), tenant_id=t2.id, email="u2@b.local", password_hash="x")
     # assign role via association
-    u1.roles.append(r1); db.commit()
+    u1.roles.append(r1)
+    bulk_create([t1, t2, r1, u1, u2], session=db)
+    assert db.query(User).filter_by(id=u1.id).one().roles == [r1]
     # ensure user in tenant B cannot get tenant A role accidentally
-    u2 = User(id=str(uuid.uuid4()), tenant_id=t2.id, email="u2@b.local", password_hash="x"); db.add(u2); db.commit()
     assert r1 not in u2.roles
     db.close()
 
@@ -13,3 +13,37 @@ Total: 15,500.00 KES
     assert parsed["vendor"]=="EcoWaste Ltd"
     assert parsed["invoice_no"]=="INV123"
     assert parsed["total"]==15500.00
+
+def test_parse_invoice_text_returns_independent_copies():
+    ocr=OCRIngestion("demo-tenant")
+    first=ocr.parse_invoice_text("Invoice From: KPLC\nTotal: 100")
+    first["vendor"]="changed"
+    assert ocr.parse_invoice_text("Invoice From: KPLC\nTotal: 100")["vendor"]=="KPLC"
+
+def test_extract_text_cached_by_file_content(tmp_path, monkeypatch):
+    from ledger.ingest import ocr as ocr_mod
+    monkeypatch.setattr(ocr_mod,"OCR_AVAILABLE",True)
+    monkeypatch.setattr(ocr_mod,"OCR_CACHE_DIR",tmp_path/"cache")
+    calls=[]
+    monkeypatch.setattr(OCRIngestion,"_run_ocr",lambda self,path: calls.append(path) or "Invoice From: KPLC")
+    scan=tmp_path/"scan.png"; scan.write_bytes(b"fake image bytes")
+    ocr=OCRIngestion("demo-tenant")
+    assert ocr.extract_text(str(scan))=="Invoice From: KPLC"
+    copy=tmp_path/"copy.png"; copy.write_bytes(b"fake image bytes")
+    assert ocr.extract_text(str(copy))=="Invoice From: KPLC"
+    assert len(calls)==1
+
+def test_extract_text_cache_concurrent_duplicates(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from ledger.ingest import ocr as ocr_mod
+    monkeypatch.setattr(ocr_mod,"OCR_AVAILABLE",True)
+    monkeypatch.setattr(OCRIngestion,"_run_ocr",lambda self,path: "Invoice From: KPLC")
+    scan=tmp_path/"scan.png"; scan.write_bytes(b"fake image bytes")
+    for run in range(5):
+        monkeypatch.setattr(ocr_mod,"OCR_CACHE_DIR",tmp_path/f"cache{run}")
+        ocr=OCRIngestion("demo-tenant")
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            texts=list(pool.map(ocr.extract_text,[str(scan)]*8))
+        assert texts==["Invoice From: KPLC"]*8
+        assert not list((tmp_path/f"cache{run}").glob("*.tmp"))
+
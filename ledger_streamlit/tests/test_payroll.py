@@ -19,3 +19,20 @@ def test_payroll_breakdown():
 def test_vat():
     v=KenyanVAT()
     assert v.compute_vat(1000)==160.0
+
+def test_payroll_breakdown_vec_matches_scalar():
+    p=KenyanPayroll()
+    gross=[0,5999,7000,15000,24000,32333,50000,900000]
+    vec=p.payroll_breakdown_vec(gross)
+    for i,g in enumerate(gross):
+        b=p.payroll_breakdown(g)
+        assert all(abs(vec[k][i]-b[k])<0.01 for k in b)
+
+def test_batch_deductions_equal_scalar_to_the_cent():
+    import numpy as np
+    p=KenyanPayroll(); rng=np.random.default_rng(0)
+    gross=np.concatenate([[16916.25,229.25],np.round(rng.uniform(0,1_000_000,20000),2),np.arange(0,60000,0.25)[::7]])
+    for name in ("paye","nssf","nhif"):
+        batch=getattr(p,f"compute_{name}_batch")(gross)
+        scalar=[getattr(p,f"compute_{name}")(g) for g in gross.tolist()]
+        assert batch.tolist()==scalar, name
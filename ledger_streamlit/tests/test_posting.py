@@ -18,3 +18,31 @@ def test_post_from_reconciliation(tmp_path):
     lp=LedgerPosting(tid)
     posted=lp.post_from_reconciliation(recon_file)
     assert posted and posted[0]["amount"]==1000.0
+
+def test_trial_balance_nets_debits_and_credits():
+    lp=LedgerPosting("tb-tenant")
+    lp.post_entry("2025-09-12","Sale","1000","4000",500.0)
+    lp.post_entry("2025-09-13","Expense","5000","1000",200.0)
+    tb=lp.get_trial_balance()
+    assert tb["1000"]==300.0 and tb["4000"]==-500.0 and tb["5000"]==200.0
+
+def test_post_entries_bulk_single_write():
+    lp=LedgerPosting("bulk-tenant")
+    before=len(lp.load_journal())
+    posted=lp.post_entries_bulk([
+        {"date":"2025-09-30","description":"Payroll","debit_acct":"5100","credit_acct":"2100","amount":100.0,"ref":"P1"},
+        {"date":"2025-09-30","description":"PAYE","debit_acct":"2100","credit_acct":"2200","amount":20.0,"ref":"P2"},
+    ])
+    assert [e["ref"] for e in posted]==["P1","P2"]
+    assert len(lp.load_journal())==before+2
+
+def test_load_journal_reuses_parse_until_written():
+    lp=LedgerPosting("journal-cache-tenant")
+    lp.file.write_text("[]")
+    lp.post_entry("2025-09-12","One","5000","1000",10.0)
+    first=lp.load_journal()
+    first.append({"ref":"local only"})
+    second=LedgerPosting("journal-cache-tenant").load_journal()
+    assert len(second)==1 and second[0] is first[0]
+    lp.post_entry("2025-09-13","Two","5000","1000",20.0)
+    assert [e["description"] for e in lp.load_journal()]==["One","Two"]
@@ -20,3 +20,15 @@ def test_reconcile_matches(tmp_path):
     eng.DATA_DIR=data_dir
     report=eng.reconcile()
     assert any(r["match"] for r in report["matches"])
+
+def test_latest_recon_includes_legacy_json(tmp_path, monkeypatch):
+    import os
+    from ledger.reconcile import engine as recon_mod
+    monkeypatch.setattr(recon_mod,"RECON_DIR",tmp_path)
+    assert recon_mod.latest_recon("demo-tenant") is None
+    legacy=tmp_path/"demo-tenant_recon.json"
+    legacy.write_text(json.dumps({"tenant_id":"demo-tenant","matches":[],"unmatched":[]}))
+    assert recon_mod.latest_recon("demo-tenant")==legacy
+    nd=tmp_path/"demo-tenant_recon.ndjson"; nd.write_text('{"tenant_id":"demo-tenant"}\n')
+    os.utime(legacy,ns=(1,1))
+    assert recon_mod.latest_recon("demo-tenant")==nd
@@ -0,0 +1,23 @@
+from ledger.core.repositories import EmployeesRepository, PayrollRunsRepository
+from ledger.core.repositories import PayrollRunsRepository
+
+def test_load_data_copies_nested_records(tmp_path):
+    repo=PayrollRunsRepository("repo-copy-tenant")
+    repo.entity_dir=tmp_path
+    repo.save_data([{"payroll_period":"2025-09","employees":[{"id":"E1","gross":50000}]}],create_backup=False)
+    run=repo.load_data()[0]
+    run["employees"].append({"id":"E2"})
+    run["employees"][0]["gross"]=1
+    assert repo.load_data()[0]["employees"]==[{"id":"E1","gross":50000}]
+    repo.load_columns({"employees":[]})["employees"][0].clear()
+    assert repo.find_by_key("payroll_period","2025-09")["employees"]==[{"id":"E1","gross":50000}]
+
+def test_read_only_loads_share_the_cache_and_upserts_replace_records(tmp_path):
+    repo=EmployeesRepository("repo-share-tenant")
+    repo.entity_dir=tmp_path
+    repo.save_data([{"employee_id":"E1","basic_salary":50000}],create_backup=False)
+    seen=repo.load_data(copy=False)
+    assert seen[0] is repo.load_data(copy=False)[0]
+    repo.bulk_upsert([{"employee_id":"E1","basic_salary":60000}])
+    assert seen[0]["basic_salary"]==50000
+    assert repo.find_by_key("employee_id","E1")["basic_salary"]==60000
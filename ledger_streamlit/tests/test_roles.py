@@ -18,3 +18,16 @@ def test_default_roles_exist():
     tenant_roles=[v["name"] for k,v in rm.roles.items() if v.get("tenant_id")==tid]
     expected={"ceo","finance_manager","account_manager","hr_manager","fleet_manager","payroll_officer","approver_lvl1","approver_lvl2","viewer"}
     assert expected.issubset(set(tenant_roles))
+
+def test_find_user_by_email_sees_new_signups():
+    rm=RoleManager()
+    assert rm.find_user_by_email("lookup@newco.local") is None
+    res=rm.create_tenant_with_admin("NewCo","lookup@newco.local","pw")
+    assert rm.find_user_by_email("lookup@newco.local")["id"]==res["user_id"]
+
+def test_background_user_save_persists():
+    rm=RoleManager()
+    res=rm.create_tenant_with_admin("BgCo","bg@bgco.local","pw")
+    rm.users[res["user_id"]]["password_hash"]="upgraded"
+    rm.save_users_in_background().join()
+    assert RoleManager().users[res["user_id"]]["password_hash"]=="upgraded"
@@ -0,0 +1,30 @@
+
+import pandas as pd
+from ledger.core.upload_manager import UploadManager
+
+def test_read_csv_keeps_iso_dates_as_text(tmp_path):
+    path=tmp_path/"upload.csv"
+    path.write_text("date,posted_at,amount,vendor\n2025-09-12,2025-09-12T10:00:00,10.5,A\n2025-09-13,,,B\n")
+    df=UploadManager._read_csv(path)
+    expected=pd.read_csv(path,low_memory=False)
+    assert df["date"].tolist()==["2025-09-12","2025-09-13"]
+    assert df["posted_at"].iloc[0]=="2025-09-12T10:00:00" and pd.isna(df["posted_at"].iloc[1])
+    assert df["amount"].dtype==expected["amount"].dtype
+
+def test_background_staging_failure_is_reported(tmp_path, monkeypatch):
+    import json, uuid
+    import pytest
+    import ledger.core.upload_manager as um
+    monkeypatch.setattr(um,"_STAGING_POOL",None)  # a pool of our own, joined below
+    mgr=UploadManager(f"staging-{uuid.uuid4().hex[:8]}","vendors")
+    def fail(staging_file, staging_data): raise OSError("disk full")
+    monkeypatch.setattr(mgr,"_write_staging",fail)
+    path=tmp_path/"vendors.csv"
+    pd.DataFrame([{"vendor_code":"A001","vendor_name":"Acme"}]).to_csv(path,index=False)
+    res=mgr.process_upload(str(path),[],return_records=True)
+    assert res.success and res.staged_records
+    with pytest.raises(OSError):
+        list(mgr.iter_staged_records(res.batch_id))
+    um._STAGING_POOL.shutdown(wait=True)  # done callbacks run on the worker
+    changes=[json.loads(l) for l in mgr.audit_logger.changes_log.read_text().splitlines()]
+    assert changes[-1]["operation"]=="staging_failed" and changes[-1]["entity_id"]==res.batch_id
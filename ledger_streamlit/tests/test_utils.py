@@ -1,6 +1,6 @@
 
 import logging
-from ledger.core.utils import setup_logging, hash_password, verify_password
+from ledger.core.utils import setup_logging, hash_password, verify_password, dumps_json
 
 def test_setup_logging_idempotent(tmp_path):
     tenant = "tmptest"
@@ -17,3 +17,10 @@ def test_password_hash_and_verify():
     assert stored.startswith("pbkdf2_sha256$")
     assert verify_password(pw, stored) is True
     assert verify_password("wrongpass", stored) is False
+
+def test_dumps_json_indents_and_stringifies():
+    from datetime import date
+    out = dumps_json([{"amount": 1.5, "date": date(2025, 9, 12)}])
+    assert out.startswith("[\n  {") and '"date": "2025-09-12"' in out
+    # orjson and the json fallback differ only in separator spacing
+    assert dumps_json({"a": 1}, indent=False) in ('{"a":1}', '{"a": 1}')
@@ -1,12 +1,12 @@
 
-import json
 from pathlib import Path
 from ledger.ml.vendor_normalizer import VendorNormalizer, VENDORS_DIR
+from ledger.core.utils import read_json
 
 def test_train_and_normalize():
     vf = next(Path(VENDORS_DIR).glob("*_vendors.json"))
     tid = vf.stem.split("_")[0]
-    vendors=json.load(open(vf))
+    vendors=read_json(vf)
     vn=VendorNormalizer(tenant_id=tid)
     vn.train(vendors); vn.save()
     vn2=VendorNormalizer(tenant_id=tid); vn2.load()
@@ -15,3 +15,51 @@ def test_train_and_normalize():
     assert res["canonical"] is not None or res["method"] in ("fuzzy","none")
     res2=vn2.normalize("Completely Unknown Vendor XYZ")
     assert res2["canonical"] is None
+
+def test_save_load_roundtrip_without_pickle():
+    vendors=["Kenya Power","Safaricom PLC","Eco Waste Ltd","Nairobi Water"]
+    vn=VendorNormalizer(tenant_id="roundtrip-tenant")
+    vn.train(vendors); meta=vn.save()
+    assert meta["matrix_file"].endswith("_X.npz")
+    vn2=VendorNormalizer(tenant_id="roundtrip-tenant"); vn2.load()
+    assert vn2.vendor_list==vendors
+    for q in ["SAFARICOM PLC","kenya power ltd"]:
+        assert vn2.normalize(q)["canonical"]==vn.normalize(q)["canonical"]
+
+def test_normalize_batch_matches_normalize():
+    vn=VendorNormalizer(tenant_id="batch-tenant")
+    vn.train(["Kenya Power","Safaricom PLC","Naivas Supermarket"])
+    names=["kenya power ltd","SAFARICOM","Unknown Vendor XYZ","kenya power ltd",None,""]
+    batch=vn.normalize_batch(names)
+    assert [r["canonical"] for r in batch]==[vn.normalize(n)["canonical"] for n in names]
+
+def test_fuzzy_fallback_without_model():
+    vn=VendorNormalizer(tenant_id="fuzzy-only")
+    vn.vendor_list=["Kenya Power Ltd","Safaricom PLC","Naivas Supermarket"]
+    assert vn.normalize("SAFARICOM plc.")["canonical"]=="Safaricom PLC"
+    res=vn.normalize_batch(["kenya power","Unknown Traders"],fuzzy_threshold=85)
+    assert res[0]["canonical"]=="Kenya Power Ltd" and res[0]["method"]=="fuzzy"
+    assert res[1]["method"]=="none"
+
+def test_quantized_search_matches_sparse_nn(monkeypatch):
+    import ledger.ml.vendor_normalizer as vnm
+    vendors=["Kenya Power","Safaricom PLC","Naivas Supermarket","Eco Waste Ltd","Nairobi Water"]
+    names=["kenya power ltd","SAFARICOM","naivas","nairobi water co"]
+    small=VendorNormalizer(tenant_id="quant-tenant"); small.train(vendors)
+    assert small.Xq is not None and small.nn is None
+    monkeypatch.setattr(vnm,"DENSE_KNN_MAX_ROWS",0)
+    big=VendorNormalizer(tenant_id="quant-tenant"); big.train(vendors)
+    assert big.Xq is None and big.nn is not None
+    for (s1,i1),(s2,i2) in zip(zip(*small._nearest_batch(names)),zip(*big._nearest_batch(names))):
+        assert i1==i2 and abs(s1-s2)<0.02
+
+def test_save_replaces_files_whole_with_vendor_list_last(monkeypatch):
+    import ledger.ml.vendor_normalizer as vnm
+    written=[]
+    real=vnm.atomic_write_bytes
+    monkeypatch.setattr(vnm,"atomic_write_bytes",lambda path,data: written.append(str(path)) or real(path,data))
+    vn=VendorNormalizer(tenant_id="atomic-tenant")
+    vn.train(["Kenya Power","Safaricom PLC","Naivas Supermarket"]); vn.save()
+    assert len(written)==5 and written[-1].endswith("_vendors.json")
+    vn2=VendorNormalizer(tenant_id="atomic-tenant"); vn2.load()
+    assert vn2.normalize("SAFARICOM")["canonical"]=="Safaricom PLC"
@@ -0,0 +1,28 @@
+import uuid
+import pandas as pd
+import ledger.vendors.manager as vendors_mod
+from ledger.vendors.manager import VendorManager
+from ledger.ml.vendor_normalizer import VendorNormalizer
+
+NAMES=["Safaricom Plc","Kenya Power","Naivas Supermarket","Eco Waste Ltd","Nairobi Water"]
+
+def test_dedup_merge_updates_existing_vendor(tmp_path, monkeypatch):
+    tid=f"dedup-{uuid.uuid4().hex[:8]}"  # upload hashes are remembered per tenant
+    vm=VendorManager(tid)
+    vm.repository.entity_dir=tmp_path
+    vm.repository.save_data([{"vendor_code":f"V{i:03d}","vendor_name":n,"created_at":"2025-01-01"}
+                             for i,n in enumerate(NAMES)],create_backup=False)
+    nz=VendorNormalizer(tid); nz.train(NAMES)
+    monkeypatch.setattr(vendors_mod,"_get_normalizer",lambda tid: nz)
+    monkeypatch.setattr(VendorManager,"_update_normalizer",lambda self,vendors: None)
+    upload=tmp_path/"vendors.csv"
+    pd.DataFrame([{"Name":"Safaricom Plc.","Code":"","Email":"ap@safaricom.co.ke","Terms":30,"Limit":0},
+                  {"Name":"Java House","Code":"JAV001","Email":"","Terms":30,"Limit":0}]).to_csv(upload,index=False)
+    res=vm.bulk_upload(str(upload),[{"source":s,"target":t} for s,t in [("Name","vendor_name"),("Code","vendor_code"),
+                       ("Email","email"),("Terms","payment_terms"),("Limit","credit_limit")]])
+    assert res["success"], res["upload_result"]["errors"]+res["upload_result"]["row_errors"]
+    assert res["deduplication_report"]["duplicates_merged"]==1
+    assert res["total_vendors"]==len(NAMES)+1  # only Java House is new
+    merged=vm.repository.find_by_key("vendor_code","V000")
+    assert merged["vendor_name"]=="Safaricom Plc" and merged["created_at"]=="2025-01-01"
+    assert merged["email"]=="ap@safaricom.co.ke"